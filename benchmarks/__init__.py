@@ -0,0 +1 @@
+"""Micro-benchmarks for the document generation pipeline."""
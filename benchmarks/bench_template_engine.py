@@ -0,0 +1,78 @@
+"""Compare the compiled template engine against the previous replace-based renderer.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_template_engine
+"""
+
+import re
+import timeit
+from typing import Any, Dict
+from bot.handlers.document_generator import DocumentGenerator
+from config.config import DOCUMENT_TYPES
+
+SAMPLE_VARIABLES = {
+    "server_name": "Benchmark Server",
+    "contact_info": "admin@example.com",
+    "contact_email": "privacy@example.com",
+    "rules": [f"Rule number {i}" for i in range(20)],
+    "consequences": "Warning → Mute → Ban",
+    "data_collected": ["Discord username", "Messages", "User IDs"],
+    "data_usage": "Moderation and server statistics.",
+    "prohibited_activities": ["Harassment", "Spam", "NSFW content"],
+    "user_obligations": "Follow the rules and Discord's Terms of Service.",
+    "expected_behavior": ["Be respectful", "Be inclusive"],
+    "reporting_process": "Open a ticket in #support.",
+    "staff_roles": ["Administrator", "Moderator"],
+    "procedures": ["Handling reports", "Escalation process"],
+    "escalation_path": "Moderator → Administrator → Owner",
+    "moderation_actions": ["Warning", "Mute", "Kick", "Ban"],
+    "warning_system": "Three warnings before a ban.",
+    "ban_criteria": "Repeated or severe violations.",
+    "appeal_requirements": "Your user ID and the reason for the ban.",
+    "review_process": "Reviewed by two staff members.",
+    "timelines": "Appeals are answered within 7 days.",
+}
+
+
+def legacy_generate(template: str, variables: Dict[str, Any]) -> str:
+    """The replace-then-regex renderer the compiled engine replaced."""
+    document = template
+    for key, value in variables.items():
+        placeholder = f"{{{key}}}"
+        if placeholder in document:
+            if value is None:
+                str_value = "N/A"
+            elif isinstance(value, list):
+                str_value = "\n".join(f"- {item}" for item in value) if value else "None"
+            else:
+                str_value = str(value)
+            document = document.replace(placeholder, str_value)
+    return re.sub(r'\{[^}]+\}', 'N/A', document)
+
+
+def main(number: int = 20000):
+    """Time both renderers on every template and print the speedup."""
+    generator = DocumentGenerator()
+    print(f"{'document type':<24}{'legacy µs':>12}{'compiled µs':>14}{'speedup':>10}{'bytes µs':>12}")
+    
+    for document_type in DOCUMENT_TYPES:
+        source = generator.load_template(document_type)
+        compiled = generator.get_template(document_type)
+        assert compiled.render(SAMPLE_VARIABLES) == legacy_generate(source, SAMPLE_VARIABLES)
+        assert compiled.render_bytes(SAMPLE_VARIABLES) == legacy_generate(source, SAMPLE_VARIABLES).encode("utf-8")
+        
+        legacy = min(timeit.repeat(
+            lambda: legacy_generate(source, SAMPLE_VARIABLES), number=number, repeat=3
+        )) / number * 1e6
+        current = min(timeit.repeat(
+            lambda: compiled.render(SAMPLE_VARIABLES), number=number, repeat=3
+        )) / number * 1e6
+        encoded = min(timeit.repeat(
+            lambda: compiled.render_bytes(SAMPLE_VARIABLES), number=number, repeat=3
+        )) / number * 1e6
+        print(f"{document_type:<24}{legacy:>12.2f}{current:>14.2f}{legacy / current:>9.1f}x{encoded:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
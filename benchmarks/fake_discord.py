@@ -0,0 +1,327 @@
+"""A local stand-in for the parts of the Discord HTTP API the bot calls.
+
+The server runs on its own event loop in a background thread so that its work
+doesn't count against the bot's event loop. Interaction callbacks are parsed
+(JSON or multipart), timestamped on arrival and handed to whoever is waiting
+for that interaction id.
+
+Channel messages can be posted, edited and deleted. Those routes share a
+fixed-window rate limit per channel, reported with Discord's X-RateLimit-*
+headers; requests over the limit get a 429 and are counted in `rate_limited`.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+from aiohttp import web
+
+APPLICATION_ID = 100000000000000001
+BOT_USER = {
+    "id": str(APPLICATION_ID),
+    "username": "compliance-sentinel",
+    "discriminator": "0",
+    "global_name": None,
+    "avatar": None,
+    "bot": True,
+}
+
+
+# X-RateLimit-Bucket of the message routes
+MESSAGES_BUCKET = "fake-messages"
+
+
+class Callback:
+    """An interaction callback received by the fake API."""
+    
+    __slots__ = ("interaction_id", "type", "data", "files", "bytes_received", "received_at")
+    
+    def __init__(self, interaction_id: int, type: int, data: Dict[str, Any], files: int, bytes_received: int):
+        self.interaction_id = interaction_id
+        self.type = type
+        self.data = data
+        self.files = files
+        self.bytes_received = bytes_received
+        self.received_at = time.perf_counter()
+
+
+def message_payload(message_id: int, channel_id: int, attachments=()) -> Dict[str, Any]:
+    """A minimal message object as returned by Discord."""
+    return {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "author": BOT_USER,
+        "content": "",
+        "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": list(attachments),
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+        "flags": 64,
+    }
+
+
+class FakeDiscordAPI:
+    """Serves users/@me, application info, command sync, interaction callbacks, followups and channel messages."""
+    
+    def __init__(self, latency: float = 0.0, message_limit: int = 5, message_period: float = 5.0,
+                 global_limit: int = 0):
+        self.latency = latency  # Seconds added to every response
+        self.message_limit = message_limit  # Message requests per channel per period
+        self.message_period = message_period
+        self.global_limit = global_limit  # Requests per second across everything; 0 for none
+        self.base_url: Optional[str] = None
+        self.requests = 0
+        self.bytes_received = 0
+        self.rate_limited = 0
+        self.channels: Dict[int, Dict[int, str]] = {}  # channel id -> message id -> content, in posting order
+        self.forbidden_channels: Set[int] = set()  # Channels the bot may not post in
+        self._windows: Dict[Any, Tuple[float, int]] = {}  # bucket -> (window start, requests in it)
+        self._ids = itertools.count(200000000000000000)
+        self._waiters: Dict[int, "asyncio.Future[Callback]"] = {}
+        self._waiter_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def _app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/api/v10/users/@me", self._users_me)
+        app.router.add_get("/api/v10/oauth2/applications/@me", self._application)
+        app.router.add_put("/api/v10/applications/{application_id}/commands", self._sync_commands)
+        app.router.add_put("/api/v10/applications/{application_id}/guilds/{guild_id}/commands", self._sync_commands)
+        app.router.add_post("/api/v10/interactions/{interaction_id}/{token}/callback", self._interaction_callback)
+        app.router.add_post("/api/v10/webhooks/{application_id}/{token}", self._followup)
+        app.router.add_post("/api/v10/channels/{channel_id}/messages", self._create_message)
+        app.router.add_patch("/api/v10/channels/{channel_id}/messages/{message_id}", self._edit_message)
+        app.router.add_delete("/api/v10/channels/{channel_id}/messages/{message_id}", self._delete_message)
+        return app
+    
+    async def _respond(self, data: Any) -> web.Response:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # discord.py only parses JSON when the content type has no charset parameter
+        return web.Response(body=json.dumps(data).encode("utf-8"), content_type="application/json")
+    
+    def _take(self, bucket: Any, limit: int, period: float) -> Tuple[int, float]:
+        """Count a request against a fixed window. Returns (requests left, seconds until the window resets)."""
+        now = time.monotonic()
+        start, used = self._windows.get(bucket, (now, 0))
+        if now - start >= period:
+            start, used = now, 0
+        self._windows[bucket] = (start, used + 1)
+        return limit - used - 1, start + period - now
+    
+    def _rate_limit(self, channel_id: int) -> Tuple[Optional[web.Response], Dict[str, str]]:
+        """Apply the global and per-channel limits. Returns (429 response or None, rate-limit headers)."""
+        if self.global_limit:
+            remaining, reset_after = self._take("global", self.global_limit, 1.0)
+            if remaining < 0:
+                return self._too_many(reset_after, True, {"X-RateLimit-Global": "true"}), {}
+        
+        remaining, reset_after = self._take((MESSAGES_BUCKET, channel_id), self.message_limit, self.message_period)
+        headers = {
+            "X-RateLimit-Limit": str(self.message_limit),
+            "X-RateLimit-Remaining": str(max(0, remaining)),
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": MESSAGES_BUCKET,
+        }
+        if remaining < 0:
+            return self._too_many(reset_after, False, headers), headers
+        return None, headers
+    
+    def _too_many(self, retry_after: float, is_global: bool, headers: Dict[str, str]) -> web.Response:
+        self.requests += 1
+        self.rate_limited += 1
+        body = {"message": "You are being rate limited.", "retry_after": retry_after, "global": is_global}
+        return web.Response(
+            status=429, body=json.dumps(body).encode("utf-8"), content_type="application/json",
+            # discord.py takes a 429 without Discord's Via header for a Cloudflare ban
+            headers={**headers, "Retry-After": f"{retry_after:.3f}", "Via": "1.1 google"}
+        )
+    
+    async def _error(self, status: int, code: int, message: str, headers: Dict[str, str]) -> web.Response:
+        response = await self._respond({"message": message, "code": code})
+        response.set_status(status)
+        response.headers.update(headers)
+        return response
+    
+    async def _message_request(self, request: web.Request):
+        """Common checks for the message routes. Returns (error response or None, channel id, headers)."""
+        channel_id = int(request.match_info["channel_id"])
+        limited, headers = self._rate_limit(channel_id)
+        if limited is not None:
+            return limited, channel_id, headers
+        if channel_id in self.forbidden_channels:
+            return await self._error(403, 50013, "Missing Permissions", headers), channel_id, headers
+        return None, channel_id, headers
+    
+    async def _create_message(self, request: web.Request) -> web.Response:
+        error, channel_id, headers = await self._message_request(request)
+        if error is not None:
+            return error
+        payload, _, size = await self._read_payload(request)
+        self.bytes_received += size
+        
+        message_id = next(self._ids)
+        self.channels.setdefault(channel_id, {})[message_id] = payload.get("content", "")
+        response = await self._respond(message_payload(message_id, channel_id))
+        response.headers.update(headers)
+        return response
+    
+    async def _edit_message(self, request: web.Request) -> web.Response:
+        error, channel_id, headers = await self._message_request(request)
+        if error is not None:
+            return error
+        payload, _, size = await self._read_payload(request)
+        self.bytes_received += size
+        
+        message_id = int(request.match_info["message_id"])
+        messages = self.channels.get(channel_id, {})
+        if message_id not in messages:
+            return await self._error(404, 10008, "Unknown Message", headers)
+        messages[message_id] = payload.get("content", messages[message_id])
+        response = await self._respond(message_payload(message_id, channel_id))
+        response.headers.update(headers)
+        return response
+    
+    async def _delete_message(self, request: web.Request) -> web.Response:
+        error, channel_id, headers = await self._message_request(request)
+        if error is not None:
+            return error
+        
+        message_id = int(request.match_info["message_id"])
+        if self.channels.get(channel_id, {}).pop(message_id, None) is None:
+            return await self._error(404, 10008, "Unknown Message", headers)
+        self.requests += 1
+        return web.Response(status=204, headers=headers)
+    
+    async def _send(self, request: web.Request, data: Any) -> web.StreamResponse:
+        """Write a response fully before returning, so callers can act after the bot has it."""
+        response = await self._respond(data)
+        await response.prepare(request)
+        await response.write_eof()
+        return response
+    
+    async def _users_me(self, request: web.Request) -> web.Response:
+        return await self._respond(BOT_USER)
+    
+    async def _application(self, request: web.Request) -> web.Response:
+        return await self._respond({
+            "id": str(APPLICATION_ID),
+            "name": "Compliance Sentinel",
+            "description": "",
+            "icon": None,
+            "bot_public": True,
+            "bot_require_code_grant": False,
+            "owner": BOT_USER,
+            "verify_key": "0" * 64,
+            "flags": 0,
+        })
+    
+    async def _sync_commands(self, request: web.Request) -> web.Response:
+        await request.read()
+        return await self._respond([])
+    
+    async def _read_payload(self, request: web.Request):
+        """Read a JSON or multipart (payload_json + files) request body."""
+        if request.content_type.startswith("multipart/"):
+            payload, files, size = {}, 0, 0
+            reader = await request.multipart()
+            async for part in reader:
+                body = await part.read()
+                size += len(body)
+                if part.name == "payload_json":
+                    payload = json.loads(body)
+                else:
+                    files += 1
+            return payload, files, size
+        
+        body = await request.read()
+        return (json.loads(body) if body else {}), 0, len(body)
+    
+    async def _interaction_callback(self, request: web.Request) -> web.Response:
+        interaction_id = int(request.match_info["interaction_id"])
+        payload, files, size = await self._read_payload(request)
+        self.bytes_received += size
+        
+        callback = Callback(interaction_id, payload.get("type", 0), payload.get("data") or {}, files, size)
+        
+        response: Dict[str, Any] = {"interaction": {"id": str(interaction_id), "type": 2}}
+        if callback.type == 4:
+            attachments = [
+                {
+                    "id": str(next(self._ids)),
+                    "filename": "document.md",
+                    "size": size,
+                    "url": f"{self.base_url}/attachments/{next(self._ids)}/document.md?ex=7fffffff",
+                    "proxy_url": f"{self.base_url}/attachments/document.md",
+                }
+                for _ in range(files)
+            ]
+            response["resource"] = {"type": 4, "message": message_payload(next(self._ids), 1, attachments)}
+        
+        # Like Discord, only show the user a modal once the bot's callback has completed
+        sent = await self._send(request, response)
+        self._resolve(callback)
+        return sent
+    
+    async def _followup(self, request: web.Request) -> web.Response:
+        payload, files, size = await self._read_payload(request)
+        self.bytes_received += size
+        return await self._respond(message_payload(next(self._ids), 1))
+    
+    def _resolve(self, callback: Callback):
+        """Hand a callback to the task waiting for it, on the waiter's loop."""
+        future = self._waiters.pop(callback.interaction_id, None)
+        if future is not None:
+            self._waiter_loop.call_soon_threadsafe(_set_result, future, callback)
+    
+    def expect(self, interaction_id: int) -> "asyncio.Future[Callback]":
+        """Get a future that resolves when the callback for an interaction arrives."""
+        self._waiter_loop = asyncio.get_running_loop()
+        future = self._waiter_loop.create_future()
+        self._waiters[interaction_id] = future
+        return future
+    
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving in a background thread and return the API base URL."""
+        started = threading.Event()
+        
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self._app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, host, port)
+            self._loop.run_until_complete(site.start())
+            bound_port = self._runner.addresses[0][1]
+            self.base_url = f"http://{host}:{bound_port}"
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+        
+        self._thread = threading.Thread(target=serve, name="fake-discord-api", daemon=True)
+        self._thread.start()
+        started.wait()
+        return f"{self.base_url}/api/v10"
+    
+    def stop(self):
+        """Stop the server thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+def _set_result(future: "asyncio.Future[Callback]", callback: Callback):
+    if not future.done():
+        future.set_result(callback)
@@ -0,0 +1,70 @@
+"""Stand-ins for discord.py objects so handlers can be driven without a gateway connection."""
+
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+
+class FakeResponse:
+    """
+    Records calls made on `interaction.response`, serializing payloads like discord.py does.
+    
+    Only the last call is kept so long benchmark runs don't accumulate memory.
+    """
+    
+    def __init__(self):
+        self.calls = 0
+        self.last: Optional[Dict[str, Any]] = None
+        self.bytes_uploaded = 0
+        self.done = False
+    
+    def is_done(self) -> bool:
+        return self.done
+    
+    def _record(self, kwargs: Dict[str, Any]):
+        embed = kwargs.get("embed")
+        if embed is not None:
+            embed.to_dict()
+        file = kwargs.get("file")
+        if file is not None:
+            self.bytes_uploaded += len(file.fp.read())
+        self.calls += 1
+        self.last = kwargs
+    
+    async def send_message(self, content: Optional[str] = None, **kwargs):
+        kwargs["content"] = content
+        self._record(kwargs)
+        self.done = True
+        return None
+    
+    async def send_modal(self, modal):
+        modal.to_dict()
+        self.calls += 1
+        self.last = {"modal": modal}
+        self.done = True
+    
+    async def defer(self, **kwargs):
+        self.calls += 1
+        self.last = {"defer": kwargs}
+        self.done = True
+
+
+class FakeFollowup:
+    """Records calls made on `interaction.followup`."""
+    
+    def __init__(self, response: FakeResponse):
+        self._response = response
+    
+    async def send(self, content: Optional[str] = None, **kwargs):
+        kwargs["content"] = content
+        self._response._record(kwargs)
+
+
+def make_interaction(guild_id: int = 1, user_id: int = 1) -> SimpleNamespace:
+    """Build an object with the parts of `discord.Interaction` the handlers use."""
+    response = FakeResponse()
+    return SimpleNamespace(
+        guild_id=guild_id,
+        user=SimpleNamespace(id=user_id),
+        response=response,
+        followup=FakeFollowup(response),
+    )
@@ -0,0 +1,136 @@
+"""Minimal benchmark harness: timing, JSON result files and baseline comparison."""
+
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+# Each timed repeat runs for at least this long
+MIN_REPEAT_TIME = 0.2
+
+# Slowdown (as a fraction of the baseline median) that counts as a regression
+DEFAULT_THRESHOLD = 0.2
+
+
+class Benchmark(NamedTuple):
+    """A named operation to time. Async benchmarks are awaited on one event loop."""
+    
+    name: str
+    func: Callable[[], Any]
+    is_async: bool = False
+
+
+class Result(NamedTuple):
+    """Per-operation timings of a benchmark, in seconds."""
+    
+    name: str
+    min: float
+    median: float
+    number: int
+    repeat: int
+
+
+def _time_sync(func: Callable[[], Any], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return time.perf_counter() - start
+
+
+async def _time_async(func: Callable[[], Awaitable[Any]], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await func()
+    return time.perf_counter() - start
+
+
+async def _run_one(benchmark: Benchmark, repeat: int) -> Result:
+    """Calibrate the loop count, then time `repeat` runs of it."""
+    async def timed(number: int) -> float:
+        if benchmark.is_async:
+            return await _time_async(benchmark.func, number)
+        return _time_sync(benchmark.func, number)
+    
+    await timed(1)  # Warm up caches and lazily created pools
+    number = 1
+    while True:
+        elapsed = await timed(number)
+        if elapsed >= MIN_REPEAT_TIME:
+            break
+        number *= 10 if elapsed < MIN_REPEAT_TIME / 10 else 2
+    
+    samples = [await timed(number) / number for _ in range(repeat)]
+    return Result(benchmark.name, min(samples), statistics.median(samples), number, repeat)
+
+
+def run(benchmarks: List[Benchmark], repeat: int = 5, pattern: Optional[str] = None) -> List[Result]:
+    """Run benchmarks whose name contains `pattern` (all if None) and print each result."""
+    selected = [benchmark for benchmark in benchmarks if pattern is None or pattern in benchmark.name]
+    
+    async def run_all() -> List[Result]:
+        results = []
+        for benchmark in selected:
+            result = await _run_one(benchmark, repeat)
+            print(f"{result.name:<48}{result.median * 1e6:>12.2f} µs{result.min * 1e6:>12.2f} µs (min)")
+            results.append(result)
+        return results
+    
+    return asyncio.run(run_all())
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: List[Result], path: str):
+    """Write results and run metadata to a JSON file."""
+    data = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+        },
+        "results": {result.name: result._asdict() for result in results},
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """Read the results of an earlier run, keyed by benchmark name."""
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)["results"]
+
+
+def compare(results: List[Result], baseline: Dict[str, Dict[str, Any]], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Compare results against a baseline run and print the change of each benchmark.
+    
+    Returns:
+        Names of benchmarks whose median is more than `threshold` slower than the baseline
+    """
+    regressions = []
+    print(f"\n{'benchmark':<48}{'baseline µs':>14}{'current µs':>14}{'change':>10}")
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous is None:
+            print(f"{result.name:<48}{'-':>14}{result.median * 1e6:>14.2f}{'new':>10}")
+            continue
+        
+        change = result.median / previous["median"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(result.name)
+            flag = "  REGRESSION"
+        print(f"{result.name:<48}{previous['median'] * 1e6:>14.2f}{result.median * 1e6:>14.2f}{change:>+10.1%}{flag}")
+    return regressions
@@ -0,0 +1,359 @@
+"""Load test: drive the bot with synthetic /generate interactions against a local fake Discord API.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --users 2000 --concurrency 200
+    python -m benchmarks.load_test --users 5000 --rate 500 --abandon-rate 0.3
+    python -m benchmarks.load_test --users 2000 --api-latency 0.05 --save load.json
+
+Each virtual user runs `/generate <type>` and, unless it abandons the form,
+submits the modal. Interactions go through discord.py's normal dispatch
+(`ConnectionState.parse_interaction_create`) into `GenerateCommands` and
+`FormHandler`, and every response is a real HTTP request to the fake API.
+Latency is measured from dispatch to the callback's arrival at the fake API,
+the same window as Discord's 3-second interaction deadline.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+import discord
+from benchmarks.fake_discord import APPLICATION_ID, Callback, FakeDiscordAPI
+from bot.gateway_stats import current_rss
+
+# Discord fails interactions that aren't answered within this many seconds
+INTERACTION_DEADLINE = 3.0
+
+GUILD_ID_BASE = 300000000000000000
+USER_ID_BASE = 400000000000000000
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples (0 if empty)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def interaction_payload(interaction_id: int, interaction_type: int, guild_id: int, user_id: int,
+                        data: Dict[str, Any]) -> Dict[str, Any]:
+    """An INTERACTION_CREATE payload as sent over the gateway."""
+    return {
+        "id": str(interaction_id),
+        "application_id": str(APPLICATION_ID),
+        "type": interaction_type,
+        "token": f"token-{interaction_id}",
+        "version": 1,
+        "guild_id": str(guild_id),
+        "member": {
+            "user": {
+                "id": str(user_id),
+                "username": f"user{user_id}",
+                "discriminator": "0",
+                "global_name": None,
+                "avatar": None,
+            },
+            "roles": [],
+            "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+            "permissions": "0",
+        },
+        "app_permissions": "0",
+        "locale": "en-US",
+        "guild_locale": "en-US",
+        "attachment_size_limit": 8 * 1024 * 1024,
+        "data": data,
+    }
+
+
+def modal_submission(modal: Dict[str, Any], answer: str) -> Dict[str, Any]:
+    """Fill in every text input of a modal sent by the bot."""
+    def fill(component: Dict[str, Any]) -> Dict[str, Any]:
+        value = "\n".join(f"{answer} item {i}" for i in range(3)) if component.get("style") == 2 else answer
+        return {"type": 4, "custom_id": component["custom_id"], "value": value}
+    
+    components = []
+    for row in modal["components"]:
+        if row["type"] == 1:  # Action row
+            components.append({"type": 1, "components": [fill(item) for item in row["components"]]})
+        elif row["type"] == 18:  # Label
+            components.append({"type": 18, "component": fill(row["component"])})
+    return {"custom_id": modal["custom_id"], "components": components}
+
+
+class LoadTest:
+    """Runs virtual users against a bot and collects latency and resource samples."""
+    
+    def __init__(self, bot, api: FakeDiscordAPI, args: argparse.Namespace, document_types: List[str]):
+        self.bot = bot
+        self.api = api
+        self.args = args
+        self.document_types = document_types
+        self.random = random.Random(args.seed)
+        self.interaction_ids = itertools.count(500000000000000000)
+        
+        self.slash_latencies: List[float] = []
+        self.submit_latencies: List[float] = []
+        self.loop_lag: List[float] = []
+        self.completed = 0
+        self.abandoned = 0
+        self.shed = 0  # Turned away by rate limits or render admission control
+        self.failed = 0
+        self.errors: Dict[str, int] = {}
+        self.peak_rss = current_rss()
+    
+    def _fail(self, reason: str):
+        self.failed += 1
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+    
+    def _is_shed(self, callback: Callback) -> bool:
+        """Count a "try again later" reply from the bot as shed load rather than a failure."""
+        if callback.type == 4 and (callback.data.get("content") or "").startswith("⏳"):
+            self.shed += 1
+            return True
+        return False
+    
+    async def _interact(self, interaction_type: int, guild_id: int, user_id: int,
+                        data: Dict[str, Any]) -> Optional[Callback]:
+        """Dispatch an interaction and wait for the bot's callback."""
+        interaction_id = next(self.interaction_ids)
+        waiter = self.api.expect(interaction_id)
+        payload = interaction_payload(interaction_id, interaction_type, guild_id, user_id, data)
+        
+        start = time.perf_counter()
+        self.bot._connection.parse_interaction_create(payload)
+        try:
+            callback = await asyncio.wait_for(waiter, self.args.timeout)
+        except asyncio.TimeoutError:
+            return None
+        callback.received_at -= start  # Latency, measured on the same clock
+        return callback
+    
+    async def virtual_user(self, number: int):
+        """Open a form with /generate and submit it, or abandon it."""
+        guild_id = GUILD_ID_BASE + number % self.args.guilds
+        user_id = USER_ID_BASE + number
+        document_type = self.document_types[number % len(self.document_types)]
+        
+        command = {
+            "id": "1",
+            "name": "generate",
+            "type": 1,
+            "options": [{"name": "document_type", "type": 3, "value": document_type}],
+        }
+        modal = await self._interact(2, guild_id, user_id, command)
+        if modal is None:
+            return self._fail("slash command timed out")
+        self.slash_latencies.append(modal.received_at)
+        if self._is_shed(modal):
+            return
+        if modal.type != 9:
+            return self._fail(f"slash command answered with type {modal.type} instead of a modal")
+        
+        if self.random.random() < self.args.abandon_rate:
+            self.abandoned += 1
+            return
+        if self.args.think_time:
+            await asyncio.sleep(self.args.think_time)
+        
+        document = await self._interact(5, guild_id, user_id, modal_submission(modal.data, f"Server {number}"))
+        if document is None:
+            return self._fail("form submit timed out")
+        self.submit_latencies.append(document.received_at)
+        if self._is_shed(document):
+            return
+        
+        embeds = document.data.get("embeds") or []
+        if document.type != 4 or not embeds or not embeds[0].get("title", "").startswith("✅"):
+            return self._fail(document.data.get("content") or f"form submit answered with type {document.type}")
+        self.completed += 1
+    
+    async def _monitor(self, stop: asyncio.Event, interval: float = 0.01):
+        """Sample event loop lag (sleep overshoot) and peak RSS until stopped."""
+        samples = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag.append(time.perf_counter() - start - interval)
+            samples += 1
+            if samples % 10 == 0:
+                self.peak_rss = max(self.peak_rss, current_rss())
+    
+    async def run(self) -> float:
+        """Run every virtual user and return the elapsed time."""
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        
+        async def launch(number: int):
+            async with semaphore:
+                await self.virtual_user(number)
+        
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(self._monitor(stop))
+        
+        start = time.perf_counter()
+        tasks = []
+        for number in range(self.args.users):
+            if self.args.rate:
+                # Open model: users arrive at a fixed rate whether or not earlier ones finished
+                delay = start + number / self.args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(launch(number)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        
+        stop.set()
+        await monitor
+        return elapsed
+
+
+def build_report(test: LoadTest, elapsed: float, rss_start: int, rss_end: int) -> Dict[str, Any]:
+    """Summarize a finished load test."""
+    def latency_summary(samples: List[float]) -> Dict[str, float]:
+        return {
+            "count": len(samples),
+            "p50": percentile(samples, 0.50),
+            "p95": percentile(samples, 0.95),
+            "p99": percentile(samples, 0.99),
+            "max": max(samples, default=0.0),
+            "over_deadline": sum(1 for sample in samples if sample > INTERACTION_DEADLINE),
+        }
+    
+    form_handler = test.bot.form_handler
+    interactions = len(test.slash_latencies) + len(test.submit_latencies)
+    return {
+        "users": test.args.users,
+        "completed": test.completed,
+        "abandoned": test.abandoned,
+        "shed": test.shed,
+        "failed": test.failed,
+        "errors": test.errors,
+        "elapsed": elapsed,
+        "throughput": {
+            "forms_per_second": test.completed / elapsed if elapsed else 0.0,
+            "interactions_per_second": interactions / elapsed if elapsed else 0.0,
+        },
+        "latency": {
+            "slash_to_modal": latency_summary(test.slash_latencies),
+            "submit_to_document": latency_summary(test.submit_latencies),
+        },
+        "event_loop_lag": {
+            "p50": percentile(test.loop_lag, 0.50),
+            "p99": percentile(test.loop_lag, 0.99),
+            "max": max(test.loop_lag, default=0.0),
+        },
+        "rss": {
+            "start": rss_start,
+            "peak": max(test.peak_rss, rss_end),
+            "end": rss_end,
+            "growth": rss_end - rss_start,
+        },
+        "active_forms": len(form_handler.active_forms),
+        "form_sessions": form_handler.active_forms.get_stats(),
+        "render": form_handler.render_executor.get_stats(),
+        "api": {"requests": test.api.requests, "bytes_received": test.api.bytes_received},
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a load test summary."""
+    ms = 1000
+    mib = 1024 * 1024
+    print(f"\nUsers: {report['users']}  completed: {report['completed']}  "
+          f"abandoned: {report['abandoned']}  shed: {report['shed']}  failed: {report['failed']}  "
+          f"in {report['elapsed']:.2f}s")
+    for reason, count in report["errors"].items():
+        print(f"  {count} x {reason}")
+    print(f"Throughput: {report['throughput']['forms_per_second']:.1f} forms/s, "
+          f"{report['throughput']['interactions_per_second']:.1f} interactions/s")
+    
+    print(f"\n{'latency (ms)':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'> 3s':>7}")
+    for name, summary in report["latency"].items():
+        print(f"{name:<22}{summary['p50'] * ms:>9.1f}{summary['p95'] * ms:>9.1f}"
+              f"{summary['p99'] * ms:>9.1f}{summary['max'] * ms:>9.1f}{summary['over_deadline']:>7}")
+    
+    lag = report["event_loop_lag"]
+    print(f"\nEvent loop lag (ms): p50 {lag['p50'] * ms:.2f}  p99 {lag['p99'] * ms:.2f}  max {lag['max'] * ms:.2f}")
+    rss = report["rss"]
+    print(f"RSS (MiB): start {rss['start'] / mib:.1f}  peak {rss['peak'] / mib:.1f}  "
+          f"end {rss['end'] / mib:.1f}  growth {rss['growth'] / mib:+.1f}")
+    print(f"Forms still in memory: {report['active_forms']} "
+          f"(expired: {report['form_sessions']['expired']}, evicted: {report['form_sessions']['evicted']})")
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the fake API, log the bot in against it and run the load test."""
+    from bot.bot import create_bot
+    from bot.handlers.form_schemas import FORM_SCHEMAS
+    
+    api = FakeDiscordAPI(latency=args.api_latency)
+    discord.http.Route.BASE = api.start()
+    
+    bot = create_bot()
+    try:
+        await bot.login("load-test-token")  # Runs setup_hook: cogs, form handler, command sync
+        document_types = args.document_types or list(FORM_SCHEMAS)
+        
+        rss_start = current_rss()
+        test = LoadTest(bot, api, args, document_types)
+        elapsed = await test.run()
+        rss_end = current_rss()
+        return build_report(test, elapsed, rss_start, rss_end)
+    finally:
+        await bot.close()
+        api.stop()
+
+
+def main(argv=None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test", description=__doc__.splitlines()[0])
+    parser.add_argument("-u", "--users", type=int, default=1000, help="virtual users to run (default: 1000)")
+    parser.add_argument("-c", "--concurrency", type=int, default=100,
+                        help="maximum users in flight at once (default: 100)")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="start users at this many per second instead of as fast as possible")
+    parser.add_argument("--abandon-rate", type=float, default=0.0,
+                        help="fraction of users who open the form but never submit it (default: 0)")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="seconds each user spends filling in the form (default: 0)")
+    parser.add_argument("--guilds", type=int, default=50, help="number of distinct servers (default: 50)")
+    parser.add_argument("--document-type", dest="document_types", action="append",
+                        help="document type to generate (repeatable; default: every type)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="seconds the fake API waits before answering")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds to wait for each callback (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for abandonment (default: 0)")
+    parser.add_argument("--save", default=None, help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"\nSaved report to {args.save}")
+    
+    latency = report["latency"]
+    missed = latency["slash_to_modal"]["over_deadline"] + latency["submit_to_document"]["over_deadline"]
+    return 1 if report["failed"] or missed else 0
+
+
+if __name__ == "__main__":
+    # Keep the bot's databases and command sync state out of the working tree
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="compliance-load-test-"))
+    # Every virtual user shares a few guilds, so per-guild limits would cap the test itself
+    os.environ.setdefault("GENERATE_USER_LIMIT", "0")
+    os.environ.setdefault("GENERATE_GUILD_LIMIT", "0")
+    sys.exit(main())
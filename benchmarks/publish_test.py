@@ -0,0 +1,180 @@
+"""Publish test: post documents to many guilds' channels and republish them against a local fake Discord API.
+
+Run from the repository root:
+
+    python -m benchmarks.publish_test --guilds 500
+    python -m benchmarks.publish_test --guilds 2000 --global-limit 50 --api-latency 0.02
+
+Every guild publishes every document type to its own channel. Then a share
+of the guilds upload a changed template and each document type is
+republished across all guilds at once, the way a template update does.
+Requests go through the PublishScheduler, HTTPSender and discord.py's HTTP
+client over real HTTP to the fake API, which enforces per-channel rate
+limits and answers 429 when they're exceeded. At the end every channel's messages are compared with the
+document split into sections.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+from benchmarks.fake_discord import FakeDiscordAPI
+
+GUILD_ID_BASE = 300000000000000000
+CHANNEL_ID_BASE = 500000000000000000
+
+# Appended to the template of guilds that "upload" a change before republishing
+TEMPLATE_CHANGE = "\n\n## Changelog\n\nThis document was updated.\n"
+
+
+async def run_publish_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the fake API, publish to every guild, change templates, republish and check the channels."""
+    import discord
+    from bot.handlers.document_generator import DocumentGenerator
+    from bot.handlers.form_schemas import FORM_SCHEMAS
+    from bot.handlers.publication_store import PublicationStore
+    from bot.handlers.publish_scheduler import HTTPSender, PublishScheduler
+    from bot.handlers.publisher import Publisher, split_sections
+    from bot.handlers.render_executor import RenderExecutor
+    from bot.handlers.template_store import GuildTemplateStore
+    from config.config import DATA_DIR
+    
+    api = FakeDiscordAPI(
+        latency=args.api_latency, message_limit=args.message_limit, message_period=args.message_period,
+        global_limit=args.api_global_limit
+    )
+    discord.http.Route.BASE = api.start()
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    await http.static_login("publish-test-token")
+    
+    generator = DocumentGenerator(GuildTemplateStore(os.path.join(DATA_DIR, "guild_templates.db")))
+    executor = RenderExecutor(generator, "thread", args.render_workers)
+    scheduler = PublishScheduler(HTTPSender(http), args.concurrency, args.global_limit)
+    publisher = Publisher(executor, PublicationStore(":memory:"), scheduler, render_concurrency=args.render_workers)
+    document_types = args.document_types or list(FORM_SCHEMAS)
+    guild_ids = [GUILD_ID_BASE + number for number in range(args.guilds)]
+    
+    def channel_id(guild_number: int, type_number: int) -> int:
+        return CHANNEL_ID_BASE + guild_number * len(document_types) + type_number
+    
+    try:
+        # Publish every document type in every guild
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            publisher.publish(
+                guild_id, channel_id(guild_number, type_number), document_type,
+                FORM_SCHEMAS[document_type].parse(
+                    {field.name: f"Server {guild_number}" for field in FORM_SCHEMAS[document_type].fields}
+                )
+            )
+            for guild_number, guild_id in enumerate(guild_ids)
+            for type_number, document_type in enumerate(document_types)
+        ))
+        publish_elapsed = time.perf_counter() - start
+        publish_requests = api.requests
+        
+        # Some guilds change their templates, then every document type is republished everywhere
+        changed_guilds = guild_ids[::max(1, round(1 / args.change_rate))] if args.change_rate > 0 else []
+        for guild_id in changed_guilds:
+            for document_type in document_types:
+                source = generator.load_template(document_type) + TEMPLATE_CHANGE
+                generator.set_override(guild_id, document_type, source)
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*(publisher.republish(document_type) for document_type in document_types))
+        republish_elapsed = time.perf_counter() - start
+        
+        # Every channel should hold exactly the document, split into sections
+        mismatched = 0
+        for guild_number, guild_id in enumerate(guild_ids):
+            for type_number, document_type in enumerate(document_types):
+                publication = publisher.store.get(guild_id, document_type, channel_id(guild_number, type_number))
+                rendered = await executor.render(document_type, publication.variables, guild_id)
+                if list(api.channels.get(publication.channel_id, {}).values()) != split_sections(rendered.text):
+                    mismatched += 1
+        
+        return {
+            "guilds": args.guilds,
+            "document_types": len(document_types),
+            "publications": publisher.store.count(),
+            "messages": sum(len(messages) for messages in api.channels.values()),
+            "mismatched": mismatched,
+            "publish": {"elapsed": publish_elapsed, "requests": publish_requests},
+            "republish": {
+                "elapsed": republish_elapsed,
+                "requests": api.requests - publish_requests,
+                "changed_guilds": len(changed_guilds),
+                "updated": sum(result.updated for result in results),
+                "unchanged": sum(result.unchanged for result in results),
+                "failed": sum(result.failed for result in results),
+            },
+            "api": {"requests": api.requests, "rate_limited": api.rate_limited},
+            "scheduler": scheduler.get_stats(),
+        }
+    finally:
+        await publisher.close()
+        await http.close()
+        executor.shutdown()
+        api.stop()
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a publish test summary."""
+    publish = report["publish"]
+    republish = report["republish"]
+    scheduler = report["scheduler"]
+    print(f"\nGuilds: {report['guilds']}  document types: {report['document_types']}  "
+          f"publications: {report['publications']}  messages: {report['messages']}  "
+          f"mismatched: {report['mismatched']}")
+    print(f"Publish: {publish['requests']} requests in {publish['elapsed']:.2f}s")
+    print(f"Republish: {republish['requests']} requests in {republish['elapsed']:.2f}s "
+          f"({republish['changed_guilds']} guilds changed their templates; "
+          f"{republish['updated']} updated, {republish['unchanged']} unchanged, {republish['failed']} failed)")
+    print(f"API: {report['api']['requests']} requests, {report['api']['rate_limited']} rate limited")
+    print(f"Scheduler: {scheduler['sent']} sent, {scheduler['retried']} retried, "
+          f"{scheduler['coalesced']} coalesced, {scheduler['wait_seconds']:.1f}s waiting for buckets to reset")
+
+
+def main(argv=None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.publish_test", description=__doc__.splitlines()[0])
+    parser.add_argument("-g", "--guilds", type=int, default=200, help="guilds to publish to (default: 200)")
+    parser.add_argument("--document-type", dest="document_types", action="append",
+                        help="document type to publish (repeatable; default: every type)")
+    parser.add_argument("--change-rate", type=float, default=0.5,
+                        help="fraction of guilds that change their templates before republishing (default: 0.5)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="requests in flight at once (default: 8)")
+    parser.add_argument("--global-limit", type=float, default=0.0,
+                        help="requests per second the scheduler sends overall; 0 for no limit (default: 0)")
+    parser.add_argument("--render-workers", type=int, default=4, help="render threads (default: 4)")
+    parser.add_argument("--message-limit", type=int, default=5,
+                        help="message requests the fake API allows per channel per period (default: 5)")
+    parser.add_argument("--message-period", type=float, default=5.0,
+                        help="seconds in the fake API's per-channel window (default: 5)")
+    parser.add_argument("--api-global-limit", type=int, default=0,
+                        help="requests per second the fake API allows overall; 0 for no limit (default: 0)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="seconds the fake API waits before answering")
+    parser.add_argument("--save", default=None, help="write the report as JSON to this file")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    report = asyncio.run(run_publish_test(args))
+    print_report(report)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"\nSaved report to {args.save}")
+    
+    return 1 if report["mismatched"] or report["republish"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    # Keep the template overrides out of the working tree
+    os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="compliance-publish-test-"))
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Benchmarks for the render, modal, autocomplete and form submit paths.
+
+Run from the repository root:
+
+    python -m benchmarks.suite                              # run everything, save to benchmarks/results/latest.json
+    python -m benchmarks.suite -k render                    # only benchmarks whose name contains "render"
+    python -m benchmarks.suite --compare                    # compare against the committed benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/results/before.json --threshold 0.2
+
+With --compare, the command exits with status 1 if any benchmark's median is
+more than the threshold slower than in the baseline file. Ad-hoc runs go to
+benchmarks/results/, which git ignores; benchmarks/baseline.json is committed
+and refreshed with `--save benchmarks/baseline.json` when performance changes
+on purpose.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+# Keep the databases written by the benchmarked handlers (drafts, history, overrides) out of
+# the real data directory; config reads DATA_DIR on import, so this comes before the bot imports
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="compliance-benchmarks-"))
+
+from benchmarks.fakes import make_interaction
+from benchmarks.harness import DEFAULT_THRESHOLD, Benchmark, compare, load_results, run, save_results
+from bot.commands.generate import GenerateCommands
+from bot.handlers.form_handler import FormHandler
+from bot.handlers.form_schemas import FORM_SCHEMAS, FormSchema
+from bot.handlers.search_index import normalize
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Length of every answer in the maximum-size inputs
+MAX_ANSWER_LENGTH = 2000
+
+AUTOCOMPLETE_QUERIES = ["", "r", "priv", "privacy pol", "tos", "moderaton", "xyz"]
+
+
+def small_answers(schema: FormSchema) -> Dict[str, Any]:
+    """Short answers for every field, parsed like a form submission."""
+    return schema.parse({
+        field.name: "First item\nSecond item" if field.is_list else f"Example {field.label.lower()}"
+        for field in schema.fields
+    })
+
+
+def max_answers(schema: FormSchema) -> Dict[str, Any]:
+    """MAX_ANSWER_LENGTH characters for every field, parsed like a form submission."""
+    line = "Lorem ipsum dolor sit amet, consectetur adipiscing elit."
+    text = " ".join([line] * (MAX_ANSWER_LENGTH // len(line) + 1))[:MAX_ANSWER_LENGTH]
+    list_text = "\n".join([line] * (MAX_ANSWER_LENGTH // len(line) + 1))[:MAX_ANSWER_LENGTH]
+    return schema.parse({field.name: list_text if field.is_list else text for field in schema.fields})
+
+
+def build_benchmarks(form_handler: FormHandler) -> List[Benchmark]:
+    """Create every benchmark around a shared FormHandler."""
+    generator = form_handler.document_generator
+    benchmarks = []
+    
+    # Rendering
+    for document_type, schema in FORM_SCHEMAS.items():
+        for size, answers in (("small", small_answers(schema)), ("max", max_answers(schema))):
+            benchmarks.append(Benchmark(
+                f"render.{document_type}.{size}",
+                lambda document_type=document_type, answers=answers: generator.generate_document(document_type, answers)
+            ))
+    
+    # Modal construction (discord.py views need a running event loop)
+    for document_type in form_handler.modal_specs:
+        async def build_modal(document_type=document_type):
+            form_handler._get_form_modal(document_type)
+        benchmarks.append(Benchmark(f"modal.{document_type}", build_modal, is_async=True))
+    
+    # Autocomplete, through the cog (cached per query) and the raw index search
+    cog = GenerateCommands(SimpleNamespace(form_handler=form_handler))
+    interaction = make_interaction()
+    for query in AUTOCOMPLETE_QUERIES:
+        label = query.replace(" ", "_") or "empty"
+        
+        async def autocomplete(query=query):
+            await cog.document_type_autocomplete(interaction, query)
+        benchmarks.append(Benchmark(f"autocomplete.cached.{label}", autocomplete, is_async=True))
+        
+        if query:
+            normalized = normalize(query)
+            benchmarks.append(Benchmark(
+                f"autocomplete.uncached.{label}",
+                lambda normalized=normalized: cog.document_type_index._search(normalized)
+            ))
+    
+    # Form submission end to end, with a fake interaction
+    counter = itertools.count()
+    for size, make_answers in (("small", small_answers), ("max", max_answers)):
+        answers = make_answers(FORM_SCHEMAS["rules"])
+        
+        async def submit_uncached(answers=answers):
+            # A unique server name makes every submission miss the render cache
+            form_data = {**answers, "server_name": f"Server {next(counter)}"}
+            await form_handler._process_form(make_interaction(), "rules", form_data)
+        
+        async def submit_cached(answers=answers):
+            await form_handler._process_form(make_interaction(), "rules", answers)
+        
+        benchmarks.append(Benchmark(f"form_submit.rules.{size}.uncached", submit_uncached, is_async=True))
+        benchmarks.append(Benchmark(f"form_submit.rules.{size}.cached", submit_cached, is_async=True))
+    
+    return benchmarks
+
+
+def main(argv=None) -> int:
+    """Run the suite, save the results and optionally gate against a baseline."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="timed repeats per benchmark (default: 5)")
+    parser.add_argument("--save", default=os.path.join(RESULTS_DIR, "latest.json"), help="where to write results")
+    parser.add_argument("--compare", nargs="?", const=BASELINE, default=None,
+                        help="baseline results file to compare against (default: benchmarks/baseline.json)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed slowdown before failing, as a fraction (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
+    
+    form_handler = FormHandler()
+    try:
+        results = run(build_benchmarks(form_handler), repeat=args.repeat, pattern=args.pattern)
+    finally:
+        form_handler.close()
+    
+    os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+    save_results(results, args.save)
+    print(f"\nSaved {len(results)} result(s) to {args.save}")
+    
+    if args.compare:
+        regressions = compare(results, load_results(args.compare), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
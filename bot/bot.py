@@ -1,8 +1,29 @@
 """Main bot instance and setup."""
 
+import asyncio
 import discord
 from discord.ext import commands
-from config.config import DISCORD_BOT_TOKEN, BOT_PREFIX
+from bot.command_sync import sync_commands
+from bot.gateway_stats import GatewayStats
+from bot.handlers.form_handler import DocumentTypeButton, EditAnswersButton, FormHandler, StartFormButton
+from bot.handlers.publication_store import PublicationStore
+from bot.handlers.publish_scheduler import HTTPSender, PublishScheduler
+from bot.handlers.publisher import Publisher
+from bot.metrics import ERRORS, METRICS, MetricsServer
+from config.config import (
+    AUTO_REPUBLISH,
+    BOT_PREFIX,
+    CLUSTER_WORKERS,
+    COMMAND_SYNC_STATE,
+    DEV_GUILD_IDS,
+    FORCE_COMMAND_SYNC,
+    GATEWAY_STATS_INTERVAL,
+    PUBLICATIONS_DB,
+    PUBLISH_CONCURRENCY,
+    PUBLISH_GLOBAL_LIMIT,
+    RENDER_WORKERS,
+    SLASH_ONLY,
+)
 import logging
 
 # Set up logging
@@ -16,34 +37,129 @@ logger = logging.getLogger(__name__)
 class LegalComplianceBot(commands.Bot):
     """Main bot class for the Legal Compliance Generator."""
     
-    def __init__(self):
-        # Set up intents
-        intents = discord.Intents.default()
-        intents.message_content = True
-        intents.guilds = True
+    def __init__(self, slash_only: bool = SLASH_ONLY, sync_commands: bool = True, serve_metrics: bool = True,
+                 **client_options):
+        """
+        Args:
+            slash_only: Run without prefix commands, message content or message and member caches
+            sync_commands: Sync slash commands on startup (only one cluster worker should)
+            serve_metrics: Serve /metrics from this process (cluster workers report to the supervisor instead)
+            client_options: Extra options for the discord.py client, such as shard_ids
+        """
+        self.slash_only = slash_only
+        self.sync_commands_on_startup = sync_commands
+        
+        if slash_only:
+            # Interactions arrive without any intents; guilds keeps guild objects in sync.
+            # Nothing reads messages or members, so don't receive, chunk or cache them.
+            intents = discord.Intents.none()
+            intents.guilds = True
+            options = {
+                "max_messages": None,
+                "chunk_guilds_at_startup": False,
+                "member_cache_flags": discord.MemberCacheFlags.none(),
+            }
+        else:
+            # Set up intents
+            intents = discord.Intents.default()
+            intents.message_content = True
+            intents.guilds = True
+            options = {}
         
         super().__init__(
             command_prefix=BOT_PREFIX,
             intents=intents,
-            help_command=None  # We'll use our custom help command
+            help_command=None,  # We'll use our custom help command
+            **options,
+            **client_options
         )
+        self.form_handler: FormHandler = None  # Created in setup_hook
+        self.publisher: Publisher = None  # Created in setup_hook
+        self.gateway_stats = GatewayStats()
+        self._gateway_stats_task = None
+        self.metrics_server = MetricsServer(METRICS) if serve_metrics else None
     
     async def setup_hook(self):
         """Called when the bot is starting up."""
+        self.form_handler = FormHandler()
+        
+        # Register persistent buttons once so they keep working across restarts
+        self.add_dynamic_items(DocumentTypeButton, StartFormButton, EditAnswersButton)
+        
+        # Cluster workers share the publications database and the global limit, but each updates only its own guilds
+        scheduler = PublishScheduler(
+            HTTPSender(self.http), PUBLISH_CONCURRENCY, PUBLISH_GLOBAL_LIMIT / max(1, CLUSTER_WORKERS)
+        )
+        self.publisher = Publisher(
+            self.form_handler.render_executor, PublicationStore(PUBLICATIONS_DB), scheduler, self.owns_guild,
+            RENDER_WORKERS
+        )
+        if AUTO_REPUBLISH:
+            self.publisher.watch_templates(self.form_handler.document_generator.templates, asyncio.get_running_loop())
+        
         # Load cogs
         try:
             await self.load_extension("bot.commands.generate")
             await self.load_extension("bot.commands.help")
+            await self.load_extension("bot.commands.templates")
+            await self.load_extension("bot.commands.history")
+            await self.load_extension("bot.commands.publish")
             logger.info("Successfully loaded all cogs")
         except Exception as e:
             logger.error(f"Error loading cogs: {e}")
         
-        # Sync slash commands
-        try:
-            synced = await self.tree.sync()
-            logger.info(f"Synced {len(synced)} slash command(s)")
-        except Exception as e:
-            logger.error(f"Error syncing commands: {e}")
+        if self.slash_only:
+            # No message events arrive in this mode, so prefix commands could never run
+            for command in list(self.commands):
+                self.remove_command(command.name)
+            logger.info("Slash-only mode: prefix commands, message cache and member cache disabled")
+        
+        # Sync slash commands, skipping the REST calls if nothing changed since the last sync
+        if self.sync_commands_on_startup:
+            try:
+                await sync_commands(
+                    self.tree,
+                    self.application_id,
+                    COMMAND_SYNC_STATE,
+                    force=FORCE_COMMAND_SYNC,
+                    dev_guild_ids=DEV_GUILD_IDS
+                )
+            except Exception as e:
+                logger.error(f"Error syncing commands: {e}")
+        
+        # Serve /metrics if METRICS_PORT is set
+        if self.metrics_server is not None:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Error starting metrics server: {e}")
+        
+        self._gateway_stats_task = self.gateway_stats.start(GATEWAY_STATS_INTERVAL)
+    
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether one of this process's shards receives a guild's events."""
+        shard_ids = getattr(self, "shard_ids", None)  # Only sharded bots have a fixed set
+        if self.shard_count is None or shard_ids is None:
+            return True
+        return (guild_id >> 22) % self.shard_count in shard_ids
+    
+    def dispatch(self, event_name: str, /, *args, **kwargs):
+        """Count gateway events on their way to the normal dispatch."""
+        # Counted here rather than in an on_socket_event_type listener, which would cost a task per event
+        if event_name == "socket_event_type":
+            self.gateway_stats.record(args[0])
+        super().dispatch(event_name, *args, **kwargs)
+    
+    async def close(self):
+        """Stop the metrics server, stats logging and publishing, then disconnect."""
+        if self._gateway_stats_task is not None:
+            self._gateway_stats_task.cancel()
+            logger.info(self.gateway_stats.report())
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        if self.publisher is not None:
+            await self.publisher.close()
+        await super().close()
     
     async def on_ready(self):
         """Called when the bot is ready."""
@@ -63,6 +179,7 @@ class LegalComplianceBot(commands.Bot):
             return  # Ignore command not found errors
         
         logger.error(f"Command error: {error}")
+        ERRORS.labels("command", type(error).__name__).inc()
         
         if isinstance(error, commands.MissingRequiredArgument):
             await ctx.send(f"❌ Missing required argument: `{error.param.name}`")
@@ -76,6 +193,27 @@ class LegalComplianceBot(commands.Bot):
         logger.error(f"Error in {event_method}: {args}, {kwargs}")
 
 
+class ShardedComplianceBot(LegalComplianceBot, commands.AutoShardedBot):
+    """
+    A bot that runs a fixed set of shards, used by each cluster worker.
+    
+    Pass `shard_ids` and `shard_count`. With an `identify_gate` shared between
+    workers, identifies are spaced out across every process instead of only
+    within this one.
+    """
+    
+    def __init__(self, *args, identify_gate=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.identify_gate = identify_gate
+    
+    async def before_identify_hook(self, shard_id: int, *, initial: bool = False):
+        """Wait for this shard's turn to identify."""
+        if self.identify_gate is None:
+            await super().before_identify_hook(shard_id, initial=initial)
+        else:
+            await asyncio.to_thread(self.identify_gate.wait, shard_id)
+
+
 def create_bot() -> LegalComplianceBot:
     """Create and return a bot instance."""
     return LegalComplianceBot()
@@ -0,0 +1,470 @@
+"""Run the bot as a cluster of worker processes, each owning a contiguous range of shards.
+
+The supervisor (the process running main.py) starts one worker per shard range,
+restarts workers that exit or stop sending heartbeats, and serves a combined
+/health and /metrics view on METRICS_HOST:METRICS_PORT when METRICS_PORT is set.
+Only worker 0 syncs slash commands.
+
+Every interaction for a guild arrives on that guild's shard, so each guild is
+always handled by the same worker and per-process caches stay consistent.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from bot.metrics import MetricsRegistry
+from config.config import (
+    CLUSTER_HEARTBEAT_INTERVAL,
+    CLUSTER_HEARTBEAT_TIMEOUT,
+    DISCORD_BOT_TOKEN,
+    METRICS_HOST,
+    METRICS_PORT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Minimum gap between identifies in the same rate limit bucket (Discord allows one per 5 seconds)
+IDENTIFY_INTERVAL = 5.0
+
+# Restart delays double after each crash, up to this many seconds
+MAX_RESTART_DELAY = 60.0
+
+# A worker that stayed up this long before exiting is restarted without backoff
+STABLE_UPTIME = 300.0
+
+# Seconds workers get to disconnect cleanly on shutdown before they are killed
+SHUTDOWN_TIMEOUT = 15.0
+
+# Seconds between cluster health log lines
+HEALTH_LOG_INTERVAL = 60.0
+
+
+def shard_ranges(shard_count: int, workers: int) -> List[List[int]]:
+    """Split shards 0..shard_count-1 into at most `workers` contiguous ranges of nearly equal size."""
+    workers = max(1, min(workers, shard_count))
+    base, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for index in range(workers):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+class IdentifyGate:
+    """
+    Spaces out gateway identifies across processes.
+    
+    Discord allows one identify per IDENTIFY_INTERVAL in each of `max_concurrency`
+    buckets (shard_id % max_concurrency). The next free slot of each bucket is kept
+    in shared memory, so every worker process waits its turn.
+    """
+    
+    def __init__(self, context, max_concurrency: int = 1, interval: float = IDENTIFY_INTERVAL):
+        self.max_concurrency = max(1, max_concurrency)
+        self.interval = interval
+        self._lock = context.Lock()
+        self._next_slot = context.RawArray("d", self.max_concurrency)
+    
+    def wait(self, shard_id: int):
+        """Block until a shard may identify."""
+        bucket = shard_id % self.max_concurrency
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot[bucket])
+            self._next_slot[bucket] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def worker_status(bot, index: int, shard_ids: List[int]) -> Dict[str, Any]:
+    """Heartbeat sent from a worker to the supervisor."""
+    from bot.gateway_stats import current_rss
+    from bot.metrics import METRICS
+    
+    form_handler = bot.form_handler
+    latency = bot.latency
+    return {
+        "worker": index,
+        "pid": os.getpid(),
+        "shard_ids": shard_ids,
+        "ready": bot.is_ready(),
+        "guilds": len(bot.guilds),
+        "latency": latency if math.isfinite(latency) else None,
+        "gateway_events": bot.gateway_stats.total,
+        "active_forms": len(form_handler.active_forms) if form_handler else 0,
+        "render": form_handler.render_executor.get_stats() if form_handler else None,
+        "rss": current_rss(),
+        "metrics": METRICS.render() if METRICS.enabled else None,
+    }
+
+
+async def _send_heartbeats(bot, index: int, shard_ids: List[int], heartbeats, interval: float):
+    while True:
+        try:
+            heartbeats.put(worker_status(bot, index, shard_ids))
+        except Exception as e:
+            logger.error(f"Error sending heartbeat: {e}")
+        await asyncio.sleep(interval)
+
+
+async def _run_worker(index: int, shard_ids: List[int], shard_count: int, heartbeats,
+                      identify_gate: IdentifyGate, heartbeat_interval: float):
+    from bot.bot import ShardedComplianceBot
+    
+    bot = ShardedComplianceBot(
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+        identify_gate=identify_gate,
+        sync_commands=index == 0,
+        serve_metrics=False
+    )
+    
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, lambda: loop.create_task(bot.close()))
+    except NotImplementedError:
+        pass  # No signal handlers on Windows; the supervisor kills the process instead
+    
+    heartbeat = loop.create_task(_send_heartbeats(bot, index, shard_ids, heartbeats, heartbeat_interval))
+    try:
+        async with bot:
+            await bot.start(DISCORD_BOT_TOKEN)
+    finally:
+        heartbeat.cancel()
+
+
+def run_worker(index: int, shard_ids: List[int], shard_count: int, heartbeats,
+               identify_gate: IdentifyGate, heartbeat_interval: float):
+    """Worker process entry point: run one sharded bot until it is stopped."""
+    # Ctrl+C reaches every process in the terminal; the supervisor stops workers with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.info(f"Worker {index} running shards {shard_ids[0]}-{shard_ids[-1]} of {shard_count}")
+    try:
+        asyncio.run(_run_worker(index, shard_ids, shard_count, heartbeats, identify_gate, heartbeat_interval))
+    finally:
+        heartbeats.cancel_join_thread()  # Don't block exit on heartbeats nobody will read
+
+
+def _add_label(sample: str, name: str, value: str) -> str:
+    """Add a label to one sample line of the Prometheus text format."""
+    end = min(position for position in (sample.find("{"), sample.find(" ")) if position != -1)
+    if sample[end] == "{":
+        return f'{sample[:end + 1]}{name}="{value}",{sample[end + 1:]}'
+    return f'{sample[:end]}{{{name}="{value}"}}{sample[end:]}'
+
+
+def merge_metrics(worker_metrics: Dict[int, str]) -> str:
+    """Combine the metrics of several workers, adding a `worker` label to every sample."""
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for index, text in sorted(worker_metrics.items()):
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# HELP ") or line.startswith("# TYPE "):
+                family = line.split(" ", 3)[2]
+                header = headers.setdefault(family, [])
+                if len(header) < 2 and line not in header:
+                    header.append(line)
+                samples.setdefault(family, [])
+            elif line and family is not None:
+                samples[family].append(_add_label(line, "worker", str(index)))
+    
+    lines = []
+    for family, header in headers.items():
+        lines.extend(header)
+        lines.extend(samples[family])
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class WorkerHandle:
+    """Supervisor-side state of one worker process."""
+    
+    __slots__ = ("index", "shard_ids", "process", "started_at", "last_heartbeat",
+                 "status", "restarts", "failures", "restart_at")
+    
+    def __init__(self, index: int, shard_ids: List[int]):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process = None
+        self.started_at = 0.0
+        self.last_heartbeat: Optional[float] = None
+        self.status: Optional[Dict[str, Any]] = None
+        self.restarts = 0
+        self.failures = 0  # Consecutive quick exits, for backoff
+        self.restart_at = 0.0
+    
+    def heartbeat_age(self, now: float) -> float:
+        """Seconds since the last heartbeat (or since the worker started, before its first)."""
+        return now - (self.last_heartbeat if self.last_heartbeat is not None else self.started_at)
+
+
+class Cluster:
+    """Starts, supervises and reports on the worker processes."""
+    
+    def __init__(self, shard_count: int, workers: int, max_concurrency: int = 1,
+                 heartbeat_interval: float = CLUSTER_HEARTBEAT_INTERVAL,
+                 heartbeat_timeout: float = CLUSTER_HEARTBEAT_TIMEOUT,
+                 target: Callable[..., None] = run_worker):
+        # Spawn rather than fork: the supervisor runs an event loop and server threads
+        self._context = multiprocessing.get_context("spawn")
+        self.shard_count = shard_count
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.target = target
+        self.heartbeats = self._context.Queue()
+        self.identify_gate = IdentifyGate(self._context, max_concurrency)
+        self.workers = [WorkerHandle(index, shard_ids) for index, shard_ids in enumerate(shard_ranges(shard_count, workers))]
+        self._runner = None
+        
+        # Cluster-level metrics, filled in on every scrape
+        self.metrics = MetricsRegistry(enabled=True)
+        self._worker_up = self.metrics.gauge(
+            "compliance_cluster_worker_up", "Whether a worker is running and sending heartbeats.", ("worker",)
+        )
+        self._worker_ready = self.metrics.gauge(
+            "compliance_cluster_worker_ready", "Whether all of a worker's shards are connected.", ("worker",)
+        )
+        self._worker_guilds = self.metrics.gauge(
+            "compliance_cluster_worker_guilds", "Guilds on a worker's shards.", ("worker",)
+        )
+        self._worker_latency = self.metrics.gauge(
+            "compliance_cluster_worker_latency_seconds", "Average gateway heartbeat latency of a worker.", ("worker",)
+        )
+        self._worker_rss = self.metrics.gauge(
+            "compliance_cluster_worker_rss_bytes", "Resident memory of a worker process.", ("worker",)
+        )
+        self._worker_restarts = self.metrics.counter(
+            "compliance_cluster_worker_restarts_total", "Times a worker was restarted.", ("worker",)
+        )
+    
+    def _start(self, worker: WorkerHandle):
+        process = self._context.Process(
+            target=self.target,
+            name=f"cluster-worker-{worker.index}",
+            args=(worker.index, worker.shard_ids, self.shard_count, self.heartbeats,
+                  self.identify_gate, self.heartbeat_interval)
+        )
+        process.start()
+        worker.process = process
+        worker.started_at = time.monotonic()
+        worker.last_heartbeat = None
+        worker.status = None
+        logger.info(
+            f"Started worker {worker.index} (pid {process.pid}) "
+            f"for shards {worker.shard_ids[0]}-{worker.shard_ids[-1]}"
+        )
+    
+    def _receive_heartbeats(self):
+        """Take every queued heartbeat without blocking."""
+        while True:
+            try:
+                status = self.heartbeats.get_nowait()
+            except queue.Empty:
+                return
+            worker = self.workers[status["worker"]]
+            # Ignore late heartbeats from a process that has since been replaced
+            if worker.process is not None and worker.process.pid == status["pid"]:
+                worker.status = status
+                worker.last_heartbeat = time.monotonic()
+    
+    def _supervise(self, now: float):
+        """Restart workers that exited, and kill workers that stopped sending heartbeats."""
+        for worker in self.workers:
+            process = worker.process
+            if process is None:
+                if now >= worker.restart_at:
+                    self._start(worker)
+                continue
+            
+            if not process.is_alive():
+                uptime = now - worker.started_at
+                worker.failures = 1 if uptime >= STABLE_UPTIME else worker.failures + 1
+                delay = min(MAX_RESTART_DELAY, 2.0 ** (worker.failures - 1))
+                logger.warning(
+                    f"Worker {worker.index} exited with code {process.exitcode} after {uptime:.0f}s, "
+                    f"restarting in {delay:.0f}s"
+                )
+                process.join()
+                worker.process = None
+                worker.status = None
+                worker.restarts += 1
+                worker.restart_at = now + delay
+                self._worker_restarts.labels(worker.index).inc()
+                continue
+            
+            age = worker.heartbeat_age(now)
+            if age > self.heartbeat_timeout:
+                # A worker that can't send heartbeats can't be trusted to handle SIGTERM either
+                logger.warning(f"Worker {worker.index} sent no heartbeat for {age:.0f}s, killing it")
+                process.kill()
+    
+    def _is_healthy(self, worker: WorkerHandle, now: float) -> bool:
+        return (
+            worker.process is not None
+            and worker.process.is_alive()
+            and worker.status is not None
+            and worker.status["ready"]
+            and worker.heartbeat_age(now) <= self.heartbeat_timeout
+        )
+    
+    def health(self) -> Dict[str, Any]:
+        """Status of every worker, from their latest heartbeats."""
+        now = time.monotonic()
+        workers = []
+        for worker in self.workers:
+            status = worker.status or {}
+            workers.append({
+                "worker": worker.index,
+                "pid": worker.process.pid if worker.process is not None else None,
+                "alive": worker.process is not None and worker.process.is_alive(),
+                "healthy": self._is_healthy(worker, now),
+                "shards": [worker.shard_ids[0], worker.shard_ids[-1]],
+                "restarts": worker.restarts,
+                "heartbeat_age": worker.heartbeat_age(now) if worker.process is not None else None,
+                **{key: value for key, value in status.items() if key not in ("worker", "pid", "shard_ids", "metrics")},
+            })
+        return {
+            "healthy": all(worker["healthy"] for worker in workers),
+            "shard_count": self.shard_count,
+            "workers": workers,
+        }
+    
+    def render_metrics(self) -> str:
+        """Cluster metrics followed by every worker's own metrics, labelled by worker."""
+        now = time.monotonic()
+        worker_metrics = {}
+        for worker in self.workers:
+            status = worker.status or {}
+            alive = worker.process is not None and worker.process.is_alive()
+            self._worker_up.labels(worker.index).set(1 if alive and worker.heartbeat_age(now) <= self.heartbeat_timeout else 0)
+            self._worker_ready.labels(worker.index).set(1 if status.get("ready") else 0)
+            self._worker_guilds.labels(worker.index).set(status.get("guilds", 0))
+            self._worker_latency.labels(worker.index).set(status.get("latency") or 0.0)
+            self._worker_rss.labels(worker.index).set(status.get("rss", 0))
+            if status.get("metrics"):
+                worker_metrics[worker.index] = status["metrics"]
+        return self.metrics.render() + merge_metrics(worker_metrics)
+    
+    def summary(self) -> str:
+        """One-line cluster health for the log."""
+        health = self.health()
+        healthy = sum(1 for worker in health["workers"] if worker["healthy"])
+        guilds = sum(worker.get("guilds", 0) for worker in health["workers"])
+        forms = sum(worker.get("active_forms", 0) for worker in health["workers"])
+        rss = sum(worker.get("rss", 0) for worker in health["workers"])
+        return (
+            f"Cluster: {healthy}/{len(self.workers)} workers healthy, {guilds} guilds, "
+            f"{forms} active forms, RSS {rss / (1024 * 1024):.1f} MiB"
+        )
+    
+    async def _start_server(self, host: str, port: int):
+        """Serve /health and /metrics for the whole cluster."""
+        from aiohttp import web
+        from bot.metrics import CONTENT_TYPE
+        
+        async def health(request):
+            data = self.health()
+            return web.Response(
+                body=json.dumps(data, indent=2).encode("utf-8"),
+                status=200 if data["healthy"] else 503,
+                content_type="application/json"
+            )
+        
+        async def metrics(request):
+            return web.Response(body=self.render_metrics().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+        
+        app = web.Application()
+        app.router.add_get("/health", health)
+        app.router.add_get("/metrics", metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Serving cluster health and metrics on http://{host}:{port}/health and /metrics")
+    
+    async def _stop_workers(self):
+        """Ask every worker to disconnect, then kill any that don't exit in time."""
+        running = [worker.process for worker in self.workers if worker.process is not None and worker.process.is_alive()]
+        for process in running:
+            process.terminate()
+        
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        while any(process.is_alive() for process in running) and time.monotonic() < deadline:
+            self._receive_heartbeats()  # Keep the queue drained so workers can exit
+            await asyncio.sleep(0.1)
+        
+        for process in running:
+            if process.is_alive():
+                logger.warning(f"Worker pid {process.pid} did not stop in {SHUTDOWN_TIMEOUT:.0f}s, killing it")
+                process.kill()
+            process.join()
+    
+    async def run(self, host: str = METRICS_HOST, port: int = METRICS_PORT,
+                  stop: Optional[asyncio.Event] = None):
+        """Run and supervise the workers until SIGINT/SIGTERM (or `stop` is set)."""
+        stop = stop or asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signal_number, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows, or not the main thread
+        
+        if port > 0:
+            await self._start_server(host, port)
+        
+        logger.info(f"Starting {len(self.workers)} worker(s) for {self.shard_count} shard(s)")
+        last_log = time.monotonic()
+        try:
+            while not stop.is_set():
+                self._receive_heartbeats()
+                now = time.monotonic()
+                self._supervise(now)
+                
+                if now - last_log >= HEALTH_LOG_INTERVAL:
+                    logger.info(self.summary())
+                    last_log = now
+                
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            logger.info("Stopping cluster workers")
+            await self._stop_workers()
+            if self._runner is not None:
+                await self._runner.cleanup()
+
+
+async def fetch_gateway_info(token: str) -> Tuple[int, int]:
+    """Ask Discord for the recommended shard count and the identify max_concurrency."""
+    import discord
+    
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shards, _, session_start_limit = await http.get_bot_gateway()
+    finally:
+        await http.close()
+    return shards, session_start_limit.get("max_concurrency", 1)
+
+
+def run_cluster(token: str, workers: int, shard_count: int = 0):
+    """Run the bot as a supervised cluster of `workers` processes."""
+    recommended_shards, max_concurrency = asyncio.run(fetch_gateway_info(token))
+    shard_count = shard_count or recommended_shards
+    logger.info(
+        f"Cluster mode: {shard_count} shard(s) across {min(workers, shard_count)} worker(s) "
+        f"(Discord recommends {recommended_shards}, max identify concurrency {max_concurrency})"
+    )
+    
+    cluster = Cluster(shard_count, workers, max_concurrency)
+    asyncio.run(cluster.run())
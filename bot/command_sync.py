@@ -0,0 +1,100 @@
+"""Sync slash commands only when the command tree has changed since the last sync."""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+import discord
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+
+def tree_fingerprint(tree: app_commands.CommandTree, application_id: int,
+                     guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Hash the payload that `tree.sync(guild=guild)` would upload."""
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    serialized = json.dumps(
+        [application_id, payload],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class CommandSyncState:
+    """Fingerprint and duration of the last sync of each scope, kept in a JSON file."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._scopes: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                self._scopes = json.load(file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable command sync state {path}: {e}")
+    
+    def get(self, scope: str) -> Optional[Dict[str, Any]]:
+        """Get the last sync record for a scope ("global" or "guild:<id>")."""
+        return self._scopes.get(scope)
+    
+    def record(self, scope: str, fingerprint: str, duration: float):
+        """Remember a successful sync and write the state file atomically."""
+        self._scopes[scope] = {"fingerprint": fingerprint, "duration": duration, "synced_at": time.time()}
+        
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(self._scopes, file, indent=2, sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+
+async def sync_commands(tree: app_commands.CommandTree, application_id: int, state_path: str,
+                        force: bool = False, dev_guild_ids: Iterable[int] = ()) -> int:
+    """
+    Sync the command tree where it changed since the last recorded sync.
+    
+    Args:
+        tree: Command tree to sync
+        application_id: Bot's application id, part of the fingerprint
+        state_path: JSON file holding the last synced fingerprints
+        force: Sync even if the fingerprint is unchanged
+        dev_guild_ids: If given, copy global commands to these guilds and sync only them
+    
+    Returns:
+        Number of scopes that were synced
+    """
+    state = CommandSyncState(state_path)
+    guilds = [discord.Object(id=guild_id) for guild_id in dev_guild_ids]
+    for guild in guilds:
+        # Guild commands update instantly, so development changes show up right away
+        tree.copy_global_to(guild=guild)
+    
+    synced = 0
+    skipped_time = 0.0
+    for guild in guilds or [None]:
+        scope = "global" if guild is None else f"guild:{guild.id}"
+        fingerprint = tree_fingerprint(tree, application_id, guild)
+        previous = state.get(scope)
+        
+        if not force and previous and previous["fingerprint"] == fingerprint:
+            skipped_time += previous.get("duration", 0.0)
+            logger.info(f"Slash commands unchanged for {scope}, skipping sync")
+            continue
+        
+        start = time.perf_counter()
+        commands = await tree.sync(guild=guild)
+        duration = time.perf_counter() - start
+        state.record(scope, fingerprint, duration)
+        synced += 1
+        logger.info(f"Synced {len(commands)} slash command(s) to {scope} in {duration:.2f}s")
+    
+    if skipped_time:
+        logger.info(f"Skipped unchanged command syncs, saving about {skipped_time:.2f}s")
+    return synced
@@ -1 +1,14 @@
 """Command handlers for the bot."""
+
+from discord import app_commands
+from bot.handlers.document_types import DOCUMENT_REGISTRY
+from bot.handlers.exporters import EXPORTERS
+
+# Document types offered by commands that work on a single document
+DOCUMENT_TYPE_CHOICES = [
+    app_commands.Choice(name=document_type.name, value=document_type.key)
+    for document_type in DOCUMENT_REGISTRY
+]
+
+# Output formats offered by commands that send a document
+FORMAT_CHOICES = [app_commands.Choice(name=exporter.label, value=exporter.name) for exporter in EXPORTERS.values()]
@@ -3,8 +3,23 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from bot.handlers.form_handler import FormHandler
-from config.config import DOCUMENT_TYPES
+from bot.commands import FORMAT_CHOICES
+from bot.handlers.document_types import DOCUMENT_REGISTRY
+from bot.handlers.exporters import DEFAULT_EXPORT_FORMAT, EXPORTERS
+from bot.handlers.form_schemas import BUNDLE_TYPE
+from bot.handlers.search_index import SearchIndex
+from bot.metrics import GENERATE_INVOCATIONS
+from config.config import TEMPLATE_RELOAD_INTERVAL
+
+# Document types accepted by /generate and !generate
+GENERATE_CHOICES = {**DOCUMENT_REGISTRY.names(), BUNDLE_TYPE: "Compliance Bundle (all documents)"}
+
+
+def _document_type_label(document_type: str) -> str:
+    """Metric label for a requested document type; free-form input is never used as a label."""
+    if not document_type:
+        return "menu"
+    return document_type if document_type in GENERATE_CHOICES else "invalid"
 
 
 class GenerateCommands(commands.Cog):
@@ -12,7 +27,24 @@ class GenerateCommands(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
-        self.form_handler = FormHandler()
+        self.form_handler = bot.form_handler
+        
+        # Choices are built once and ranked by a prebuilt index on every keystroke
+        self.document_type_index = SearchIndex(
+            ((key, display_name), app_commands.Choice(name=display_name, value=key))
+            for key, display_name in GENERATE_CHOICES.items()
+        )
+    
+    async def cog_load(self):
+        """Start watching templates for changes and writing form drafts."""
+        self.form_handler.document_generator.templates.start_watcher(TEMPLATE_RELOAD_INTERVAL)
+        self.form_handler.drafts.start()
+    
+    async def cog_unload(self):
+        """Stop watching templates for changes, write pending drafts and release the render pool."""
+        self.form_handler.document_generator.templates.stop_watcher()
+        await self.form_handler.drafts.stop()
+        self.form_handler.close()
     
     async def document_type_autocomplete(
         self,
@@ -20,55 +52,60 @@ class GenerateCommands(commands.Cog):
         current: str
     ) -> list[app_commands.Choice[str]]:
         """Autocomplete handler for document_type parameter."""
-        choices = []
-        current_lower = current.lower()
-        
-        for key, display_name in DOCUMENT_TYPES.items():
-            # Match against both key and display name
-            if current_lower in key.lower() or current_lower in display_name.lower():
-                choices.append(app_commands.Choice(name=display_name, value=key))
-        
         # Return up to 25 choices (Discord's limit)
-        return choices[:25]
+        return self.document_type_index.search(current)
     
     @app_commands.command(name="generate", description="Generate a legal/compliance document")
-    @app_commands.describe(document_type="Type of document to generate (optional - use buttons if not specified)")
+    @app_commands.describe(
+        document_type="Type of document to generate (optional - use buttons if not specified)",
+        export_format="File format of the document (default: Markdown)"
+    )
+    @app_commands.rename(export_format="format")
     @app_commands.autocomplete(document_type=document_type_autocomplete)
+    @app_commands.choices(export_format=FORMAT_CHOICES)
     async def generate_slash(
         self,
         interaction: discord.Interaction,
-        document_type: str = None
+        document_type: str = None,
+        export_format: str = DEFAULT_EXPORT_FORMAT
     ):
         """Slash command to generate a document."""
+        GENERATE_INVOCATIONS.labels("slash", _document_type_label(document_type)).inc()
+        
         if document_type:
             # Direct document type specified
-            if document_type not in DOCUMENT_TYPES:
+            if document_type not in GENERATE_CHOICES:
                 await interaction.response.send_message(
-                    f"❌ Invalid document type. Available types: {', '.join(DOCUMENT_TYPES.keys())}",
+                    f"❌ Invalid document type. Available types: {', '.join(GENERATE_CHOICES.keys())}",
                     ephemeral=True
                 )
                 return
             
-            # Initialize form data and show modal
-            self.form_handler.active_forms[interaction.user.id] = {
-                "document_type": document_type,
-                "data": {}
-            }
-            modal = self.form_handler._get_form_modal(document_type)
-            await interaction.response.send_modal(modal)
+            # Start a form session and show modal
+            await self.form_handler.start_form(interaction, document_type, export_format)
         else:
             # Show document type selection
             embed = self.form_handler.get_document_type_embed()
-            view = self.form_handler.get_document_type_view()
+            view = self.form_handler.get_document_type_view(export_format)
             await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
     
     @commands.command(name="generate", aliases=["gen", "g"])
-    async def generate_message(self, ctx: commands.Context, document_type: str = None):
-        """Message command to generate a document."""
+    async def generate_message(self, ctx: commands.Context, document_type: str = None,
+                               export_format: str = DEFAULT_EXPORT_FORMAT):
+        """Message command to generate a document, e.g. `!generate rules pdf`."""
+        GENERATE_INVOCATIONS.labels("prefix", _document_type_label(document_type)).inc()
+        export_format = export_format.lower()
+        if export_format not in EXPORTERS:
+            await ctx.send(
+                f"❌ Invalid format: `{export_format}`\n"
+                f"Available formats: `{', '.join(EXPORTERS)}`"
+            )
+            return
+        
         if document_type:
             # Direct document type specified
-            if document_type not in DOCUMENT_TYPES:
-                available = ', '.join(DOCUMENT_TYPES.keys())
+            if document_type not in GENERATE_CHOICES:
+                available = ', '.join(GENERATE_CHOICES.keys())
                 await ctx.send(
                     f"❌ Invalid document type: `{document_type}`\n"
                     f"Available types: `{available}`"
@@ -78,34 +115,18 @@ class GenerateCommands(commands.Cog):
             # For message commands, we need to use a button to trigger the modal
             # since modals can only be sent in response to interactions
             embed = discord.Embed(
-                title=f"Generate {DOCUMENT_TYPES[document_type]}",
+                title=f"Generate {GENERATE_CHOICES[document_type]}",
                 description="Click the button below to start the form.",
                 color=discord.Color.blue()
             )
             
-            # Create a button that will trigger the modal
-            class StartFormButton(discord.ui.Button):
-                def __init__(self, form_handler, doc_type):
-                    super().__init__(label="Start Form", style=discord.ButtonStyle.primary)
-                    self.form_handler = form_handler
-                    self.doc_type = doc_type
-                
-                async def callback(self, interaction: discord.Interaction):
-                    # Initialize form data
-                    self.form_handler.active_forms[interaction.user.id] = {
-                        "document_type": self.doc_type,
-                        "data": {}
-                    }
-                    modal = self.form_handler._get_form_modal(self.doc_type)
-                    await interaction.response.send_modal(modal)
-            
-            view = discord.ui.View(timeout=300)
-            view.add_item(StartFormButton(self.form_handler, document_type))
+            # Attach the shared button that will trigger the modal
+            view = self.form_handler.get_start_form_view(document_type, export_format)
             await ctx.send(embed=embed, view=view)
         else:
             # Show document type selection
             embed = self.form_handler.get_document_type_embed()
-            view = self.form_handler.get_document_type_view()
+            view = self.form_handler.get_document_type_view(export_format)
             await ctx.send(embed=embed, view=view)
 
 
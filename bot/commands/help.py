@@ -3,7 +3,8 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from config.config import DOCUMENT_TYPES, BOT_PREFIX
+from bot.handlers.document_types import DOCUMENT_REGISTRY
+from config.config import BOT_PREFIX
 
 
 class HelpCommands(commands.Cog):
@@ -11,21 +12,29 @@ class HelpCommands(commands.Cog):
     
     def __init__(self, bot):
         self.bot = bot
+        self.slash_only = bot.slash_only  # Only mention prefix commands if they exist
+        self.payloads = bot.form_handler.payloads
+        self.payloads.register("help", self._create_help_embed)
     
     @app_commands.command(name="help", description="Show help information about the bot")
     async def help_slash(self, interaction: discord.Interaction):
         """Slash command to show help."""
-        embed = self._create_help_embed()
+        embed = self.payloads.get("help")
         await interaction.response.send_message(embed=embed, ephemeral=True)
     
     @commands.command(name="help", aliases=["h", "commands"])
     async def help_message(self, ctx: commands.Context):
         """Message command to show help."""
-        embed = self._create_help_embed()
+        embed = self.payloads.get("help")
         await ctx.send(embed=embed)
     
     def _create_help_embed(self) -> discord.Embed:
         """Create the help embed."""
+        # Prefix commands are only mentioned when they exist
+        def prefix_alternative(name: str) -> str:
+            return "" if self.slash_only else f" or `{BOT_PREFIX}{name}`"
+        example_prefix = "/" if self.slash_only else BOT_PREFIX
+        
         embed = discord.Embed(
             title="📚 Legal Compliance Generator - Help",
             description="Generate legal and compliance documents for your Discord server.",
@@ -35,8 +44,23 @@ class HelpCommands(commands.Cog):
         embed.add_field(
             name="📋 Available Commands",
             value=(
-                f"`/generate` or `{BOT_PREFIX}generate` - Generate a document\n"
-                f"`/help` or `{BOT_PREFIX}help` - Show this help message"
+                f"`/generate`{prefix_alternative('generate')} - Generate a document\n"
+                f"`/help`{prefix_alternative('help')} - Show this help message"
+            ),
+            inline=False
+        )
+        
+        embed.add_field(
+            name="🛠️ Server Management (Manage Server permission)",
+            value=(
+                "`/template upload` - Use your own template for a document\n"
+                "`/template reset` - Go back to the built-in template\n"
+                "`/template download` - Download the template this server uses\n"
+                "`/history list` - List earlier versions of a document\n"
+                "`/history get` - Download an earlier version\n"
+                "`/history diff` - Compare two versions\n"
+                "`/publish` - Post a document into a channel and keep it up to date\n"
+                "`/unpublish` - Delete a published document from a channel"
             ),
             inline=False
         )
@@ -44,8 +68,8 @@ class HelpCommands(commands.Cog):
         embed.add_field(
             name="📄 Available Document Types",
             value="\n".join([
-                f"• **{display_name}** (`{doc_type}`)"
-                for doc_type, display_name in DOCUMENT_TYPES.items()
+                f"• **{document_type.name}** (`{document_type.key}`)"
+                for document_type in DOCUMENT_REGISTRY
             ]),
             inline=False
         )
@@ -54,9 +78,10 @@ class HelpCommands(commands.Cog):
             name="🚀 Usage Examples",
             value=(
                 f"`/generate rules` - Generate server rules\n"
+                f"`/generate terms_of_service format:PDF` - Generate terms of service as a PDF\n"
                 f"`/generate` - Show document type selection\n"
-                f"`{BOT_PREFIX}generate privacy_policy` - Generate privacy policy\n"
-                f"`{BOT_PREFIX}generate code_of_conduct` - Generate code of conduct"
+                f"`{example_prefix}generate privacy_policy` - Generate privacy policy\n"
+                f"`{example_prefix}generate code_of_conduct` - Generate code of conduct"
             ),
             inline=False
         )
@@ -64,10 +89,10 @@ class HelpCommands(commands.Cog):
         embed.add_field(
             name="💡 How It Works",
             value=(
-                "1. Use `/generate` or `!generate` to start\n"
+                f"1. Use `/generate`{prefix_alternative('generate')} to start\n"
                 "2. Select a document type\n"
                 "3. Fill out the interactive form\n"
-                "4. Receive your generated markdown document"
+                "4. Receive your generated document (markdown, or HTML, plain text or PDF with `format`)"
             ),
             inline=False
         )
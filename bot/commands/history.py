@@ -0,0 +1,155 @@
+"""History commands that let server managers list, download and compare earlier documents."""
+
+import asyncio
+import io
+import discord
+from discord import app_commands
+from discord.ext import commands
+from bot.commands import DOCUMENT_TYPE_CHOICES, FORMAT_CHOICES
+from bot.handlers.document_types import DOCUMENT_REGISTRY
+from bot.handlers.exporters import DEFAULT_EXPORT_FORMAT, EXPORTERS, UnsupportedCharacters
+
+# Versions shown per page of /history list
+PAGE_SIZE = 10
+
+# Longest diff shown inline rather than attached as a file
+INLINE_DIFF_LIMIT = 1900
+
+HISTORY_DISABLED_MESSAGE = "ℹ️ Document history is turned off for this bot."
+
+
+def format_size(size: int) -> str:
+    """Show a byte count in B or KB."""
+    return f"{size} B" if size < 1024 else f"{size / 1024:.1f} KB"
+
+
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+class HistoryCommands(commands.GroupCog, group_name="history", group_description="Earlier versions of generated documents"):
+    """Commands for browsing a server's document history."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.form_handler = bot.form_handler
+        self.history = bot.form_handler.history
+        super().__init__()
+    
+    async def _check_enabled(self, interaction: discord.Interaction) -> bool:
+        """Reply and return False if history is turned off."""
+        if self.history is None:
+            await interaction.response.send_message(HISTORY_DISABLED_MESSAGE, ephemeral=True)
+            return False
+        return True
+    
+    @app_commands.command(name="list", description="List recorded versions of a document")
+    @app_commands.describe(document_type="Document to list", before="Only show versions older than this one")
+    @app_commands.choices(document_type=DOCUMENT_TYPE_CHOICES)
+    async def list_versions(self, interaction: discord.Interaction, document_type: str,
+                            before: app_commands.Range[int, 1] = None):
+        """Show a page of versions, newest first."""
+        if not await self._check_enabled(interaction):
+            return
+        
+        entries = await asyncio.to_thread(
+            self.history.list_versions, interaction.guild_id, document_type, PAGE_SIZE, before
+        )
+        name = DOCUMENT_REGISTRY[document_type].name
+        if not entries:
+            await interaction.response.send_message(f"ℹ️ No recorded versions of **{name}**.", ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title=f"📜 {name} History",
+            description="\n".join(
+                f"**v{entry.version}** - <t:{int(entry.created_at)}:f> - {format_size(entry.size)}"
+                f"{f' - <@{entry.created_by}>' if entry.created_by else ''} - `{entry.hash[:12]}`"
+                for entry in entries
+            ),
+            color=discord.Color.blue()
+        )
+        if entries[-1].version > 1:
+            embed.set_footer(text=f"Older versions: /history list document_type:{document_type} before:{entries[-1].version}")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="get", description="Download a recorded version of a document")
+    @app_commands.describe(
+        document_type="Document to download",
+        version="Version to download (default: the latest)",
+        export_format="File format (default: Markdown)"
+    )
+    @app_commands.rename(export_format="format")
+    @app_commands.choices(document_type=DOCUMENT_TYPE_CHOICES, export_format=FORMAT_CHOICES)
+    async def get_version(self, interaction: discord.Interaction, document_type: str,
+                          version: app_commands.Range[int, 1] = None, export_format: str = DEFAULT_EXPORT_FORMAT):
+        """Send a recorded version as a file."""
+        if not await self._check_enabled(interaction):
+            return
+        
+        name = DOCUMENT_REGISTRY[document_type].name
+        if version is None:
+            version = await asyncio.to_thread(self.history.latest_version, interaction.guild_id, document_type)
+            if not version:
+                await interaction.response.send_message(f"ℹ️ No recorded versions of **{name}**.", ephemeral=True)
+                return
+        
+        data = await asyncio.to_thread(self.history.get, interaction.guild_id, document_type, version)
+        if data is None:
+            await interaction.response.send_message(f"❌ **{name}** has no version {version}.", ephemeral=True)
+            return
+        
+        try:
+            data = await self.form_handler.export_executor.export(export_format, data)
+        except UnsupportedCharacters as e:
+            await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+            return
+        filename = f"{document_type}_v{version}.{EXPORTERS[export_format].extension}"
+        await interaction.response.send_message(
+            file=discord.File(io.BytesIO(data), filename=filename), ephemeral=True
+        )
+    
+    @app_commands.command(name="diff", description="Compare two recorded versions of a document")
+    @app_commands.describe(
+        document_type="Document to compare",
+        old="Older version (default: the one before `new`)",
+        new="Newer version (default: the latest)"
+    )
+    @app_commands.choices(document_type=DOCUMENT_TYPE_CHOICES)
+    async def diff(self, interaction: discord.Interaction, document_type: str,
+                   old: app_commands.Range[int, 1] = None, new: app_commands.Range[int, 1] = None):
+        """Show a unified diff between two versions."""
+        if not await self._check_enabled(interaction):
+            return
+        
+        name = DOCUMENT_REGISTRY[document_type].name
+        if new is None:
+            new = await asyncio.to_thread(self.history.latest_version, interaction.guild_id, document_type)
+        if old is None:
+            old = new - 1
+        if old < 1:
+            await interaction.response.send_message(
+                f"ℹ️ **{name}** needs at least two recorded versions to compare.", ephemeral=True
+            )
+            return
+        
+        diff = await asyncio.to_thread(self.history.diff, interaction.guild_id, document_type, old, new)
+        if diff is None:
+            await interaction.response.send_message(
+                f"❌ Couldn't find versions {old} and {new} of **{name}**.", ephemeral=True
+            )
+        elif not diff:
+            await interaction.response.send_message(
+                f"ℹ️ Versions {old} and {new} of **{name}** are identical.", ephemeral=True
+            )
+        elif len(diff) <= INLINE_DIFF_LIMIT:
+            await interaction.response.send_message(f"```diff\n{diff}\n```", ephemeral=True)
+        else:
+            await interaction.response.send_message(
+                f"Changes in **{name}** from version {old} to {new}:",
+                file=discord.File(io.BytesIO(diff.encode("utf-8")), filename=f"{document_type}_v{old}_v{new}.diff"),
+                ephemeral=True
+            )
+
+
+async def setup(bot):
+    """Setup function for the cog."""
+    await bot.add_cog(HistoryCommands(bot))
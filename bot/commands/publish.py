@@ -0,0 +1,123 @@
+"""Publish commands that post a document into a channel and keep it up to date."""
+
+import asyncio
+import logging
+import discord
+from discord import app_commands
+from discord.ext import commands
+from bot.commands import DOCUMENT_TYPE_CHOICES
+from bot.handlers.document_types import DOCUMENT_REGISTRY
+from bot.handlers.form_handler import OVERLOADED_MESSAGE
+from bot.handlers.form_schemas import FORM_SCHEMAS
+from bot.handlers.publisher import PublishError
+from bot.handlers.render_executor import RenderOverloaded
+from bot.metrics import ERRORS
+
+logger = logging.getLogger(__name__)
+
+
+def message_link(guild_id: int, channel_id: int, message_id: int) -> str:
+    """Link that jumps to a message."""
+    return f"https://discord.com/channels/{guild_id}/{channel_id}/{message_id}"
+
+
+class PublishCommands(commands.Cog):
+    """Commands for posting documents into channels."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.form_handler = bot.form_handler
+        self.publisher = bot.publisher
+    
+    @app_commands.command(name="publish", description="Post a document into a channel, or update it there")
+    @app_commands.describe(document_type="Document to publish", channel="Channel to post it in")
+    @app_commands.choices(document_type=DOCUMENT_TYPE_CHOICES)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(manage_guild=True)
+    async def publish(self, interaction: discord.Interaction, document_type: str, channel: discord.TextChannel):
+        """Render a document from your last answers and post it, split at its sections."""
+        if not await self.form_handler.check_rate_limit(interaction):
+            return
+        
+        name = DOCUMENT_REGISTRY[document_type].name
+        guild_id = interaction.guild_id
+        
+        # Your last form answers, or the ones the document was last published with
+        answers = await self.form_handler.drafts.load(guild_id, interaction.user.id, document_type)
+        if answers is not None:
+            variables = FORM_SCHEMAS[document_type].parse(answers)
+        else:
+            existing = await asyncio.to_thread(self.publisher.store.get, guild_id, document_type, channel.id)
+            if existing is None:
+                await interaction.response.send_message(
+                    f"ℹ️ Generate **{name}** with `/generate` first, then publish it.", ephemeral=True
+                )
+                return
+            variables = existing.variables
+        
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            result = await self.publisher.publish(guild_id, channel.id, document_type, variables, interaction.user.id)
+        except RenderOverloaded:
+            await interaction.followup.send(OVERLOADED_MESSAGE, ephemeral=True)
+            return
+        except PublishError as e:
+            if e.status == 403:
+                message = f"❌ I don't have permission to post in {channel.mention}."
+            else:
+                logger.error(f"Error publishing {document_type} to channel {channel.id}: {e}")
+                message = f"❌ Discord refused to publish the document: {e}"
+            await interaction.followup.send(message, ephemeral=True)
+            return
+        except Exception as e:
+            ERRORS.labels("publish", type(e).__name__).inc()
+            logger.error(f"Error publishing {document_type} to channel {channel.id}: {e}")
+            await interaction.followup.send(f"❌ Error publishing the document: {e}", ephemeral=True)
+            return
+        
+        publication = result.publication
+        if not publication.message_ids:
+            await interaction.followup.send(
+                f"ℹ️ **{name}** is empty, so there was nothing to post.", ephemeral=True
+            )
+            return
+        link = message_link(guild_id, channel.id, publication.message_ids[0])
+        if not result.changed:
+            message = f"ℹ️ **{name}** in {channel.mention} is already up to date: {link}"
+        else:
+            message = (
+                f"✅ Published **{name}** in {channel.mention} as {len(publication.message_ids)} message(s) "
+                f"({result.posted} posted, {result.edited} edited, {result.deleted} deleted): {link}"
+            )
+        await interaction.followup.send(message, ephemeral=True)
+    
+    @app_commands.command(name="unpublish", description="Delete a published document from a channel")
+    @app_commands.describe(document_type="Document to remove", channel="Channel it was published in")
+    @app_commands.choices(document_type=DOCUMENT_TYPE_CHOICES)
+    @app_commands.guild_only()
+    @app_commands.default_permissions(manage_guild=True)
+    async def unpublish(self, interaction: discord.Interaction, document_type: str, channel: discord.TextChannel):
+        """Delete a published document's messages."""
+        name = DOCUMENT_REGISTRY[document_type].name
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            removed = await self.publisher.unpublish(interaction.guild_id, document_type, channel.id)
+        except PublishError as e:
+            await interaction.followup.send(f"❌ Couldn't delete the messages: {e}", ephemeral=True)
+            return
+        except Exception as e:
+            ERRORS.labels("unpublish", type(e).__name__).inc()
+            logger.error(f"Error unpublishing {document_type} from channel {channel.id}: {e}")
+            await interaction.followup.send(f"❌ Error removing the document: {e}", ephemeral=True)
+            return
+        
+        if removed:
+            message = f"✅ Removed **{name}** from {channel.mention}."
+        else:
+            message = f"ℹ️ **{name}** isn't published in {channel.mention}."
+        await interaction.followup.send(message, ephemeral=True)
+
+
+async def setup(bot):
+    """Setup function for the cog."""
+    await bot.add_cog(PublishCommands(bot))
@@ -0,0 +1,111 @@
+"""Template commands that let server managers override the built-in templates."""
+
+import asyncio
+import io
+import discord
+from discord import app_commands
+from discord.ext import commands
+from bot.commands import DOCUMENT_TYPE_CHOICES
+from bot.handlers.document_types import DOCUMENT_REGISTRY
+from bot.handlers.form_schemas import FORM_SCHEMAS
+from bot.handlers.template_engine import compile_template
+from config.config import AUTO_REPUBLISH
+
+# Largest template file accepted for upload
+MAX_TEMPLATE_SIZE = 64 * 1024
+
+
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+class TemplateCommands(commands.GroupCog, group_name="template", group_description="Customize document templates"):
+    """Commands for managing a server's template overrides."""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.document_generator = bot.form_handler.document_generator
+        self.template_store = self.document_generator.template_store
+        self.publisher = bot.publisher
+        super().__init__()
+    
+    async def _refresh_overrides(self, guild_id: int):
+        """Drop the guild's cached overrides after a change, checking the store in a thread."""
+        has_overrides = await asyncio.to_thread(self.template_store.has_overrides, guild_id)
+        # The generator's override cache is only ever touched from the event loop
+        self.document_generator.invalidate_overrides(guild_id, has_overrides)
+    
+    async def _republish(self, guild_id: int, document_type: str) -> str:
+        """Update the guild's published copies of a document, returning a note for the reply."""
+        if not AUTO_REPUBLISH:
+            return ""
+        if not await asyncio.to_thread(self.publisher.store.list_guild, guild_id, document_type):
+            return ""
+        self.publisher.schedule_republish(document_type, [guild_id])
+        return "\nPublished copies are being updated."
+    
+    @app_commands.command(name="upload", description="Replace a document's template for this server")
+    @app_commands.describe(document_type="Document to customize", file="Markdown template file")
+    @app_commands.choices(document_type=DOCUMENT_TYPE_CHOICES)
+    async def upload(self, interaction: discord.Interaction, document_type: str, file: discord.Attachment):
+        """Store an uploaded template as this server's override."""
+        if file.size > MAX_TEMPLATE_SIZE:
+            await interaction.response.send_message(
+                f"❌ Templates can be at most {MAX_TEMPLATE_SIZE // 1024} KB.", ephemeral=True
+            )
+            return
+        
+        try:
+            content = (await file.read()).decode("utf-8")
+        except UnicodeDecodeError:
+            await interaction.response.send_message("❌ Templates must be UTF-8 text files.", ephemeral=True)
+            return
+        
+        # Placeholders the form doesn't collect would always render as N/A
+        fields = {field.name for field in FORM_SCHEMAS[document_type].fields}
+        unknown = compile_template(content).placeholders - fields
+        if unknown:
+            await interaction.response.send_message(
+                f"❌ Unknown placeholder(s): {', '.join(f'`{{{name}}}`' for name in sorted(unknown))}\n"
+                f"Available placeholders: {', '.join(f'`{{{name}}}`' for name in sorted(fields))}",
+                ephemeral=True
+            )
+            return
+        
+        version = await asyncio.to_thread(
+            self.template_store.save, interaction.guild_id, document_type, content, interaction.user.id
+        )
+        await self._refresh_overrides(interaction.guild_id)
+        note = await self._republish(interaction.guild_id, document_type)
+        await interaction.response.send_message(
+            f"✅ **{DOCUMENT_REGISTRY[document_type].name}** now uses your template (version {version}).{note}",
+            ephemeral=True
+        )
+    
+    @app_commands.command(name="reset", description="Go back to the built-in template")
+    @app_commands.describe(document_type="Document to reset")
+    @app_commands.choices(document_type=DOCUMENT_TYPE_CHOICES)
+    async def reset(self, interaction: discord.Interaction, document_type: str):
+        """Remove this server's override for a document type."""
+        removed = await asyncio.to_thread(self.template_store.reset, interaction.guild_id, document_type)
+        await self._refresh_overrides(interaction.guild_id)
+        if removed:
+            note = await self._republish(interaction.guild_id, document_type)
+            message = f"✅ **{DOCUMENT_REGISTRY[document_type].name}** now uses the built-in template.{note}"
+        else:
+            message = f"ℹ️ **{DOCUMENT_REGISTRY[document_type].name}** already uses the built-in template."
+        await interaction.response.send_message(message, ephemeral=True)
+    
+    @app_commands.command(name="download", description="Download the template this server uses")
+    @app_commands.describe(document_type="Document whose template to download")
+    @app_commands.choices(document_type=DOCUMENT_TYPE_CHOICES)
+    async def download(self, interaction: discord.Interaction, document_type: str):
+        """Send the active template so it can be edited and uploaded again."""
+        source = self.document_generator.load_template(document_type, interaction.guild_id)
+        await interaction.response.send_message(
+            file=discord.File(io.BytesIO(source.encode("utf-8")), filename=f"{document_type}.md"),
+            ephemeral=True
+        )
+
+
+async def setup(bot):
+    """Setup function for the cog."""
+    await bot.add_cog(TemplateCommands(bot))
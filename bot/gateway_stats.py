@@ -0,0 +1,79 @@
+"""Gateway event counts and process memory, logged periodically."""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 if unknown)."""
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, on platforms without /proc
+    return 0
+
+
+class GatewayStats:
+    """Counts gateway events by type and reports their rate since the last report."""
+    
+    def __init__(self):
+        self.events: Counter = Counter()
+        self.total = 0
+        self._last_counts: Dict[str, int] = {}
+        self._last_total = 0
+        self._last_time = time.monotonic()
+    
+    def record(self, event_type: str):
+        """Count one gateway event."""
+        self.events[event_type] += 1
+        self.total += 1
+    
+    def report(self, top: int = 5) -> str:
+        """Describe the event rate, the busiest event types and RSS since the previous report."""
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-9)
+        rate = (self.total - self._last_total) / elapsed
+        
+        deltas = Counter({
+            event_type: count - self._last_counts.get(event_type, 0)
+            for event_type, count in self.events.items()
+        })
+        busiest = ", ".join(
+            f"{event_type} {count / elapsed:.2f}/s" for event_type, count in deltas.most_common(top) if count
+        )
+        
+        self._last_counts = dict(self.events)
+        self._last_total = self.total
+        self._last_time = now
+        
+        return (
+            f"Gateway events: {rate:.2f}/s ({self.total} total)"
+            f"{f' - {busiest}' if busiest else ''}; RSS {current_rss() / (1024 * 1024):.1f} MiB"
+        )
+    
+    async def log_periodically(self, interval: float):
+        """Log a report every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(self.report())
+    
+    def start(self, interval: float) -> Optional["asyncio.Task[None]"]:
+        """Start logging reports in the background; does nothing if `interval` is 0."""
+        if interval <= 0:
+            return None
+        return asyncio.get_running_loop().create_task(self.log_periodically(interval), name="gateway-stats")
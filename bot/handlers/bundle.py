@@ -0,0 +1,37 @@
+"""Helpers for rendering every document type into a single archive."""
+
+import zipfile
+from io import BytesIO
+from typing import Any, Dict, Iterable, Tuple
+from bot.handlers.form_schemas import FORM_SCHEMAS
+
+BUNDLE_FILENAME = "compliance_bundle.zip"
+
+
+def build_bundle_variables(document_types: Iterable[str], shared: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the variables for each document in a bundle.
+    
+    Each document gets its schema's defaults for optional fields, overridden by
+    the shared answers. Anything else is left for the template's "N/A".
+    """
+    variables = {}
+    for document_type in document_types:
+        schema = FORM_SCHEMAS.get(document_type)
+        defaults = {
+            field.name: field.default
+            for field in (schema.fields if schema else ())
+            if field.default is not None
+        }
+        defaults.update(shared)
+        variables[document_type] = defaults
+    return variables
+
+
+def build_bundle_archive(documents: Iterable[Tuple[str, bytes]]) -> bytes:
+    """Pack (filename, content) pairs into a zip archive."""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in documents:
+            archive.writestr(filename, data)
+    return buffer.getvalue()
@@ -1,69 +1,126 @@
 """Document generator that processes templates and replaces variables."""
 
-import os
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple, Union
+from bot.handlers.template_cache import TemplateCache, TemplateEntry
+from bot.handlers.template_engine import CompiledTemplate
+from bot.handlers.template_store import GuildTemplate, GuildTemplateStore
+from bot.metrics import TEMPLATE_LOAD_SECONDS
 from config.config import TEMPLATES_DIR
 
+Template = Union[TemplateEntry, GuildTemplate]
+
 
 class DocumentGenerator:
     """Handles template loading and document generation."""
     
-    def __init__(self):
+    def __init__(self, template_store: Optional[GuildTemplateStore] = None, override_cache_size: int = 1024):
         self.templates_dir = Path(TEMPLATES_DIR)
+        self.templates = TemplateCache(self.templates_dir)  # Loads every template up front
+        
+        # Per-guild overrides, read through an LRU cache in front of the store
+        self.template_store = template_store
+        self.override_cache_size = override_cache_size
+        self._override_guilds = template_store.guild_ids() if template_store else set()
+        self._overrides: "OrderedDict[Tuple[int, str], Optional[GuildTemplate]]" = OrderedDict()
     
-    def load_template(self, document_type: str) -> str:
-        """Load a template file for the given document type."""
-        template_path = self.templates_dir / f"{document_type}.md"
+    def resolve_template(self, document_type: str, guild_id: Optional[int] = None) -> Template:
+        """
+        Get the template used for a document type in a guild.
         
-        if not template_path.exists():
-            raise FileNotFoundError(f"Template not found: {template_path}")
+        Guilds without overrides cost a single set lookup before falling back to
+        the built-in template.
         
-        with open(template_path, "r", encoding="utf-8") as f:
-            return f.read()
+        Raises:
+            FileNotFoundError: If there is no override and no built-in template
+        """
+        if guild_id in self._override_guilds:
+            key = (guild_id, document_type)
+            if key in self._overrides:
+                self._overrides.move_to_end(key)
+                override = self._overrides[key]
+            else:
+                with TEMPLATE_LOAD_SECONDS.labels("guild").time():
+                    override = self.template_store.get_active(guild_id, document_type)
+                self._overrides[key] = override  # Cache misses too, so they stay cheap
+                if len(self._overrides) > self.override_cache_size:
+                    self._overrides.popitem(last=False)
+            
+            if override is not None:
+                return override
+        
+        return self.templates.get(document_type)
+    
+    def load_template(self, document_type: str, guild_id: Optional[int] = None) -> str:
+        """Get the source of the template for the given document type."""
+        return self.resolve_template(document_type, guild_id).source
+    
+    def get_template(self, document_type: str, guild_id: Optional[int] = None) -> CompiledTemplate:
+        """Get the compiled template for a document type."""
+        return self.resolve_template(document_type, guild_id).compiled
     
-    def generate_document(self, document_type: str, variables: Dict[str, Any]) -> str:
+    def set_override(self, guild_id: int, document_type: str, content: str, created_by: Optional[int] = None) -> int:
+        """Store a guild's override for a document type and make it active. Returns its version number."""
+        version = self.template_store.save(guild_id, document_type, content, created_by)
+        self.invalidate_overrides(guild_id)
+        return version
+    
+    def reset_override(self, guild_id: int, document_type: str) -> bool:
+        """Go back to the built-in template for a guild. Returns False if there was no override."""
+        removed = self.template_store.reset(guild_id, document_type)
+        self.invalidate_overrides(guild_id)
+        return removed
+    
+    def invalidate_overrides(self, guild_id: int, has_overrides: Optional[bool] = None):
+        """
+        Drop a guild's cached overrides and re-check whether it has any.
+        
+        Callers that already asked the store (e.g. from a thread) can pass
+        `has_overrides` so this doesn't query it again.
         """
-        Generate a document by replacing template variables.
+        if self.template_store is None:
+            return
+        
+        for key in [key for key in self._overrides if key[0] == guild_id]:
+            del self._overrides[key]
+        
+        if has_overrides is None:
+            has_overrides = self.template_store.has_overrides(guild_id)
+        if has_overrides:
+            self._override_guilds.add(guild_id)
+        else:
+            self._override_guilds.discard(guild_id)
+    
+    def generate_document(self, document_type: str, variables: Dict[str, Any], guild_id: Optional[int] = None) -> str:
+        """
+        Generate a document by filling in template variables.
         
         Args:
             document_type: Type of document to generate
             variables: Dictionary of variable names and values to substitute
+            guild_id: Guild whose template overrides apply, if any
         
         Returns:
             Generated markdown document as string
         """
-        template = self.load_template(document_type)
-        
-        # Replace all variables in the template
-        # Handle both {variable} and {variable_name} formats
-        document = template
-        
-        for key, value in variables.items():
-            # Replace {key} and {key_name} patterns
-            placeholder = f"{{{key}}}"
-            if placeholder in document:
-                # Convert value to string, handle lists and None
-                if value is None:
-                    str_value = "N/A"
-                elif isinstance(value, list):
-                    str_value = "\n".join(f"- {item}" for item in value) if value else "None"
-                else:
-                    str_value = str(value)
-                document = document.replace(placeholder, str_value)
+        return self.get_template(document_type, guild_id).render(variables)
+    
+    def generate_document_bytes(self, document_type: str, variables: Dict[str, Any],
+                                guild_id: Optional[int] = None) -> bytes:
+        """
+        Generate a document as UTF-8 encoded bytes.
         
-        # Clean up any remaining placeholders
-        import re
-        document = re.sub(r'\{[^}]+\}', 'N/A', document)
+        Args:
+            document_type: Type of document to generate
+            variables: Dictionary of variable names and values to substitute
+            guild_id: Guild whose template overrides apply, if any
         
-        return document
+        Returns:
+            Generated markdown document as UTF-8 bytes
+        """
+        return self.get_template(document_type, guild_id).render_bytes(variables)
     
     def get_available_document_types(self) -> list:
         """Get list of available document types based on template files."""
-        if not self.templates_dir.exists():
-            return []
-        
-        return [
-            f.stem for f in self.templates_dir.glob("*.md")
-            if f.is_file()
-        ]
+        return self.templates.document_types()
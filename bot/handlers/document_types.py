@@ -0,0 +1,79 @@
+"""Registry of document types and how they are presented in messages and buttons."""
+
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from bot.handlers.form_schemas import BUNDLE_TYPE
+from config.config import DOCUMENT_TYPES
+
+DEFAULT_ICON = "📄"
+
+# Icon and short button label for each document type
+DOCUMENT_TYPE_STYLES: Dict[str, Tuple[str, str]] = {
+    "rules": ("📋", "Rules"),
+    "privacy_policy": ("🔒", "Privacy"),
+    "terms_of_service": ("📜", "ToS"),
+    "code_of_conduct": ("✅", "CoC"),
+    "staff_sops": ("👥", "SOPs"),
+    "moderation_guidelines": ("⚖️", "Moderation"),
+    "appeal_process": ("📝", "Appeal"),
+}
+
+
+class DocumentType(NamedTuple):
+    """A document type and its display names."""
+    
+    key: str
+    name: str
+    icon: str = DEFAULT_ICON
+    short_label: Optional[str] = None  # Button label, defaults to the name
+    
+    @property
+    def title(self) -> str:
+        """Name with icon, e.g. "📋 Server Rules"."""
+        return f"{self.icon} {self.name}"
+    
+    @property
+    def button_label(self) -> str:
+        """Short name with icon, e.g. "📋 Rules"."""
+        return f"{self.icon} {self.short_label or self.name}"
+
+
+# Pseudo document type that renders every document in one zip file
+BUNDLE_DOCUMENT_TYPE = DocumentType(BUNDLE_TYPE, "All Documents", "📦")
+
+
+class DocumentTypeRegistry:
+    """Ordered document types; `revision` is bumped whenever the registry changes."""
+    
+    def __init__(self, document_types: Dict[str, str],
+                 styles: Dict[str, Tuple[str, str]] = DOCUMENT_TYPE_STYLES):
+        self.revision = 0
+        self._styles = styles
+        self._types: Dict[str, DocumentType] = {}
+        for key, name in document_types.items():
+            self.add(key, name)
+    
+    def add(self, key: str, name: str):
+        """Register a document type, or rename an existing one."""
+        icon, short_label = self._styles.get(key, (DEFAULT_ICON, None))
+        self._types[key] = DocumentType(key, name, icon, short_label)
+        self.revision += 1
+    
+    def __iter__(self) -> Iterator[DocumentType]:
+        return iter(self._types.values())
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._types
+    
+    def __getitem__(self, key: str) -> DocumentType:
+        return self._types[key]
+    
+    def names(self) -> Dict[str, str]:
+        """Get document type keys mapped to display names."""
+        return {key: document_type.name for key, document_type in self._types.items()}
+    
+    def selectable(self) -> List[DocumentType]:
+        """Get every document type offered for selection, including the bundle."""
+        return [*self._types.values(), BUNDLE_DOCUMENT_TYPE]
+
+
+DOCUMENT_REGISTRY = DocumentTypeRegistry(DOCUMENT_TYPES)
@@ -0,0 +1,254 @@
+"""SQLite store for form answers, written behind the modal path so drafts survive restarts."""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from bot.metrics import ERRORS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS form_drafts (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    document_type TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, user_id, document_type)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS form_drafts_updated_at ON form_drafts (updated_at);
+"""
+
+# Seconds between sweeps that delete expired drafts from the database
+PURGE_INTERVAL = 3600
+
+DraftKey = Tuple[int, int, str]  # (guild_id, user_id, document_type); guild_id is 0 in DMs
+Draft = Optional[Tuple[Dict[str, str], float]]  # (answers, saved_at), or None for a pending delete
+
+
+class DraftStore:
+    """
+    Raw form answers keyed by (guild, user, document type), kept for `ttl` seconds.
+    
+    save() and delete() only update an in-memory pending map; a background task
+    writes the pending changes to SQLite in one transaction every `flush_interval`
+    seconds, so the modal path never waits on the disk. Later changes to the same
+    draft replace earlier ones before they are written. load() reads the pending
+    and in-flight changes first, so a draft is visible as soon as it is saved,
+    and otherwise queries a separate read-only connection in a thread: WAL lets
+    it read while a batch is being written, without waiting for the writer.
+    """
+    
+    def __init__(self, path: str, ttl: float, flush_interval: float = 1.0):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._pending: Dict[DraftKey, Draft] = {}
+        self._writing: Dict[DraftKey, Draft] = {}  # Batch being written by the background task
+        self._dirty: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._last_purge = 0.0
+        
+        # Lifetime counters
+        self.saved = 0
+        self.written = 0
+        self.flushes = 0
+        
+        self._lock = threading.Lock()
+        self._connection = None
+        self._read_lock = threading.Lock()
+        self._reader = None
+        if self.enabled:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._connection:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; only the last commit can be lost
+                self._connection.executescript(SCHEMA)
+            if path != ":memory:":
+                self._reader = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            else:
+                # A second connection would open a different in-memory database
+                self._reader, self._read_lock = self._connection, self._lock
+    
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+    
+    @staticmethod
+    def _key(guild_id: Optional[int], user_id: int, document_type: str) -> DraftKey:
+        return (guild_id or 0, user_id, document_type)
+    
+    def save(self, guild_id: Optional[int], user_id: int, document_type: str, answers: Dict[str, str]):
+        """Queue a user's raw answers for a document type to be written."""
+        if not self.enabled:
+            return
+        self._pending[self._key(guild_id, user_id, document_type)] = (dict(answers), time.time())
+        self.saved += 1
+        if self._dirty is not None:
+            self._dirty.set()
+    
+    def delete(self, guild_id: Optional[int], user_id: int, document_type: str):
+        """Queue a user's draft for a document type to be deleted."""
+        if not self.enabled:
+            return
+        self._pending[self._key(guild_id, user_id, document_type)] = None
+        if self._dirty is not None:
+            self._dirty.set()
+    
+    async def load(self, guild_id: Optional[int], user_id: int, document_type: str) -> Optional[Dict[str, str]]:
+        """Get a user's unexpired answers for a document type, or None if there are none."""
+        if not self.enabled:
+            return None
+        
+        key = self._key(guild_id, user_id, document_type)
+        oldest = time.time() - self.ttl
+        for changes in (self._pending, self._writing):
+            if key in changes:
+                draft = changes[key]
+                if draft is None or draft[1] <= oldest:
+                    return None
+                return dict(draft[0])
+        
+        row = await asyncio.to_thread(self._read, key, oldest)
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+    
+    def _read(self, key: DraftKey, oldest: float) -> Optional[Tuple[str]]:
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT answers FROM form_drafts "
+                "WHERE guild_id = ? AND user_id = ? AND document_type = ? AND updated_at > ?",
+                (*key, oldest)
+            ).fetchone()
+    
+    def flush(self) -> int:
+        """Write every pending change now and return how many were written."""
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            self._write(batch)
+        except Exception:
+            self._requeue(batch)
+            raise
+        return len(batch)
+    
+    def _requeue(self, batch: Dict[DraftKey, Draft]):
+        """Put a failed batch back, keeping any change made to a draft since."""
+        for key, draft in batch.items():
+            self._pending.setdefault(key, draft)
+    
+    def _write(self, batch: Dict[DraftKey, Draft]):
+        """Write a batch of changes in one transaction, and delete expired drafts now and then."""
+        upserts = []
+        deletes = []
+        for key, draft in batch.items():
+            if draft is None:
+                deletes.append(key)
+            else:
+                answers, saved_at = draft
+                upserts.append((*key, json.dumps(answers, ensure_ascii=False), saved_at))
+        
+        now = time.time()
+        with self._lock, self._connection:
+            if upserts:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO form_drafts (guild_id, user_id, document_type, answers, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    upserts
+                )
+            if deletes:
+                self._connection.executemany(
+                    "DELETE FROM form_drafts WHERE guild_id = ? AND user_id = ? AND document_type = ?",
+                    deletes
+                )
+            if now - self._last_purge >= PURGE_INTERVAL:
+                self._connection.execute("DELETE FROM form_drafts WHERE updated_at <= ?", (now - self.ttl,))
+                self._last_purge = now
+        
+        self.written += len(batch)
+        self.flushes += 1
+    
+    async def _write_behind(self):
+        """Write pending changes in batches until cancelled."""
+        while True:
+            await self._dirty.wait()
+            # Collect everything saved within the interval into one transaction
+            await asyncio.sleep(self.flush_interval)
+            self._dirty.clear()
+            
+            batch, self._pending = self._pending, {}
+            if not batch:
+                continue
+            self._writing = batch
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                logger.error(f"Error writing form drafts: {e}")
+                ERRORS.labels("drafts", type(e).__name__).inc()
+                self._requeue(batch)
+                self._dirty.set()
+            finally:
+                self._writing = {}
+    
+    def start(self):
+        """Start writing saved drafts in the background."""
+        if not self.enabled or self._task is not None:
+            return
+        self._dirty = asyncio.Event()
+        if self._pending:
+            self._dirty.set()
+        self._task = asyncio.get_running_loop().create_task(self._write_behind(), name="draft-writer")
+    
+    async def stop(self):
+        """Stop the background writer and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._dirty = None
+        if self.enabled:
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Error writing form drafts: {e}")
+    
+    def close(self):
+        """Write whatever is still pending and close the database connection."""
+        if self._connection is None:
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error writing form drafts: {e}")
+        with self._lock:
+            self._connection.close()
+        if self._reader is not self._connection:
+            with self._read_lock:
+                self._reader.close()
+        self._connection = None
+        self._reader = None
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get saved, pending and written draft counts."""
+        return {
+            "saved": self.saved,
+            "pending": len(self._pending),
+            "written": self.written,
+            "flushes": self.flushes,
+        }
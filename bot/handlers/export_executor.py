@@ -0,0 +1,131 @@
+"""Process-pool conversion of rendered documents to export formats, cached by content hash."""
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+from bot.handlers.exporters import EXPORTERS, Exporter, export_document
+from bot.metrics import EXPORT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def make_export_key(export_format: str, data: bytes) -> str:
+    """Hash a document's content into a cache key for one export format."""
+    return f"{export_format}:{hashlib.sha256(data).hexdigest()}"
+
+
+class ExportExecutor:
+    """
+    Converts markdown documents to other formats in a process pool.
+    
+    Converted files are kept in an LRU cache keyed by the format and a hash of
+    the markdown, so identical documents are converted once no matter which
+    answers or template produced them. Concurrent requests for the same
+    conversion share one job.
+    """
+    
+    def __init__(self, max_workers: int = 2, cache_size: int = 128):
+        self.max_workers = max(1, max_workers)
+        self.cache_size = cache_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._in_flight: Dict[str, "asyncio.Future[bytes]"] = {}
+        
+        # Lifetime counters
+        self.conversions = 0
+        self.hits = 0
+        self.shared = 0
+        self.total_convert_time = 0.0
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Create the pool on first use."""
+        if self._executor is None:
+            # Spawn rather than fork: the bot runs an event loop and helper threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+    
+    @staticmethod
+    def get_exporter(export_format: str) -> Exporter:
+        """
+        Look up an export format.
+        
+        Raises:
+            ValueError: If the format isn't registered
+        """
+        exporter = EXPORTERS.get(export_format)
+        if exporter is None:
+            raise ValueError(f"Unknown export format: {export_format} (expected one of {', '.join(EXPORTERS)})")
+        return exporter
+    
+    async def export(self, export_format: str, data: bytes) -> bytes:
+        """
+        Convert a UTF-8 markdown document to an export format.
+        
+        Raises:
+            ValueError: If the format isn't registered
+        """
+        exporter = self.get_exporter(export_format)
+        if not exporter.in_pool:
+            return exporter.convert(data.decode("utf-8"))
+        
+        key = make_export_key(export_format, data)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future)
+        
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        future = loop.run_in_executor(self._get_executor(), export_document, export_format, data)
+        self._in_flight[key] = future
+        try:
+            # Shielded so a cancelled requester doesn't cancel the job for everyone sharing it
+            converted = await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._in_flight.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        
+        elapsed = time.perf_counter() - start
+        self.conversions += 1
+        self.total_convert_time += elapsed
+        EXPORT_SECONDS.labels(export_format).observe(elapsed)
+        logger.debug(f"Exported {len(data)} bytes of markdown to {export_format} in {elapsed * 1000:.2f}ms")
+        
+        if self.cache_size > 0:
+            self._cache[key] = converted
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return converted
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get conversion, cache hit and latency figures."""
+        return {
+            "workers": self.max_workers,
+            "entries": len(self._cache),
+            "in_flight": len(self._in_flight),
+            "conversions": self.conversions,
+            "hits": self.hits,
+            "shared": self.shared,
+            "avg_convert_ms": self.total_convert_time / (self.conversions or 1) * 1000,
+        }
+    
+    def shutdown(self):
+        """Shut down the pool without waiting for queued conversions."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,472 @@
+"""
+Pure-Python converters from generated markdown to other document formats.
+
+Converters take the rendered markdown and return the encoded file. They only
+understand the markdown the templates produce (headings, paragraphs, lists,
+rules, quotes, code blocks and inline emphasis, code and links), need no
+network access or third-party packages, and can run in a worker process.
+"""
+
+import html
+import re
+import textwrap
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_EXPORT_FORMAT = "markdown"
+
+# Most characters listed when a document can't be exported
+UNSUPPORTED_CHARACTERS_SHOWN = 10
+
+
+class UnsupportedCharacters(ValueError):
+    """The document contains characters an export format can't represent."""
+    
+    def __init__(self, label: str, characters: str):
+        super().__init__(label, characters)
+        self.label = label
+        self.characters = characters
+    
+    def __str__(self) -> str:
+        shown = " ".join(self.characters[:UNSUPPORTED_CHARACTERS_SHOWN])
+        more = "…" if len(self.characters) > UNSUPPORTED_CHARACTERS_SHOWN else ""
+        return (
+            f"{self.label} export only supports Western European characters, and this document "
+            f"contains {shown}{more}. Choose HTML or plain text instead."
+        )
+
+
+class Block(NamedTuple):
+    """A block-level markdown element."""
+    
+    kind: str  # heading, paragraph, list, rule, quote or code
+    text: str = ""  # Heading, paragraph, quote or code text
+    level: int = 0  # Heading level
+    items: Tuple[str, ...] = ()  # List items
+    ordered: bool = False
+
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_ITEM = re.compile(r"^\s*(?:([-*+])|(\d+)[.)])\s+(.*)$")
+_RULE = re.compile(r"^\s*([-*_])(?:\s*\1){2,}\s*$")
+
+_CODE_SPAN = re.compile(r"`([^`]+)`")
+_LINK = re.compile(r"\[([^\]]+)\]\((https?://[^\s)]+|mailto:[^\s)]+)\)")
+_STRONG = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_EMPHASIS = re.compile(r"(?<![\w*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])")
+
+
+def parse_blocks(markdown: str) -> List[Block]:
+    """Split markdown into block-level elements."""
+    blocks: List[Block] = []
+    paragraph: List[str] = []
+    items: List[str] = []
+    ordered = False
+    quote: List[str] = []
+    code: Optional[List[str]] = None
+    
+    def close():
+        nonlocal ordered
+        if paragraph:
+            blocks.append(Block("paragraph", " ".join(paragraph)))
+            paragraph.clear()
+        if items:
+            blocks.append(Block("list", items=tuple(items), ordered=ordered))
+            items.clear()
+        if quote:
+            blocks.append(Block("quote", " ".join(quote)))
+            quote.clear()
+    
+    for line in markdown.splitlines():
+        if code is not None:
+            if line.strip().startswith("```"):
+                blocks.append(Block("code", "\n".join(code)))
+                code = None
+            else:
+                code.append(line)
+            continue
+        
+        stripped = line.strip()
+        if not stripped:
+            close()
+        elif stripped.startswith("```"):
+            close()
+            code = []
+        elif _RULE.match(line):
+            close()
+            blocks.append(Block("rule"))
+        elif _HEADING.match(stripped):
+            close()
+            match = _HEADING.match(stripped)
+            blocks.append(Block("heading", match.group(2), level=len(match.group(1))))
+        elif _LIST_ITEM.match(line):
+            match = _LIST_ITEM.match(line)
+            is_ordered = match.group(2) is not None
+            if paragraph or quote or (items and is_ordered != ordered):
+                close()
+            ordered = is_ordered
+            items.append(match.group(3).strip())
+        elif stripped.startswith(">"):
+            if paragraph or items:
+                close()
+            quote.append(stripped.lstrip(">").strip())
+        elif items:
+            items[-1] = f"{items[-1]} {stripped}"  # Continuation of the last item
+        else:
+            if quote:
+                close()
+            paragraph.append(stripped)
+    
+    if code is not None:
+        blocks.append(Block("code", "\n".join(code)))
+    close()
+    return blocks
+
+
+def inline_html(text: str) -> str:
+    """Convert inline markdown to escaped HTML."""
+    spans: List[str] = []
+    
+    def stash(markup: str) -> str:
+        spans.append(markup)
+        return f"\x00{len(spans) - 1}\x00"
+    
+    # Code spans and links are set aside so their contents aren't treated as emphasis
+    text = _CODE_SPAN.sub(lambda m: stash(f"<code>{html.escape(m.group(1))}</code>"), text)
+    text = _LINK.sub(
+        lambda m: stash(f'<a href="{html.escape(m.group(2))}">{inline_html(m.group(1))}</a>'), text
+    )
+    text = html.escape(text, quote=False)
+    text = _STRONG.sub(r"<strong>\2</strong>", text)
+    text = _EMPHASIS.sub(r"<em>\2</em>", text)
+    return re.sub(r"\x00(\d+)\x00", lambda m: spans[int(m.group(1))], text)
+
+
+def inline_text(text: str) -> str:
+    """Strip inline markdown, keeping link targets."""
+    text = _CODE_SPAN.sub(r"\1", text)
+    text = _LINK.sub(lambda m: m.group(1) if m.group(2).endswith(m.group(1)) else f"{m.group(1)} ({m.group(2)})", text)
+    text = _STRONG.sub(r"\2", text)
+    return _EMPHASIS.sub(r"\2", text)
+
+
+def document_title(blocks: List[Block], default: str = "Document") -> str:
+    """Use the first heading as the document title."""
+    for block in blocks:
+        if block.kind == "heading":
+            return inline_text(block.text)
+    return default
+
+
+# -- Plain text --
+
+TEXT_WIDTH = 80
+
+
+def markdown_to_text(markdown: str) -> str:
+    """Convert markdown to wrapped plain text."""
+    out: List[str] = []
+    for block in parse_blocks(markdown):
+        if block.kind == "heading":
+            text = inline_text(block.text)
+            out.append(text)
+            if block.level <= 2:
+                out.append(("=" if block.level == 1 else "-") * min(len(text), TEXT_WIDTH))
+        elif block.kind == "paragraph":
+            out.append(textwrap.fill(inline_text(block.text), TEXT_WIDTH))
+        elif block.kind == "list":
+            for number, item in enumerate(block.items, start=1):
+                marker = f"{number}. " if block.ordered else "* "
+                out.append(textwrap.fill(
+                    inline_text(item), TEXT_WIDTH, initial_indent=f"  {marker}",
+                    subsequent_indent=" " * (2 + len(marker))
+                ))
+        elif block.kind == "quote":
+            out.append(textwrap.fill(inline_text(block.text), TEXT_WIDTH, initial_indent="  ", subsequent_indent="  "))
+        elif block.kind == "code":
+            out.append(textwrap.indent(block.text, "    "))
+        elif block.kind == "rule":
+            out.append("-" * TEXT_WIDTH)
+        out.append("")
+    return "\n".join(out).rstrip() + "\n"
+
+
+# -- HTML --
+
+HTML_STYLE = (
+    "body{font-family:-apple-system,'Segoe UI',Helvetica,Arial,sans-serif;line-height:1.6;"
+    "max-width:48rem;margin:2rem auto;padding:0 1rem;color:#1f2328}"
+    "h1,h2{border-bottom:1px solid #d0d7de;padding-bottom:.3em}"
+    "code,pre{background:#f6f8fa;border-radius:4px;padding:.1em .3em}"
+    "blockquote{margin-left:0;padding-left:1em;border-left:4px solid #d0d7de;color:#59636e}"
+    "hr{border:0;border-top:1px solid #d0d7de}"
+)
+
+
+def markdown_to_html(markdown: str) -> str:
+    """Convert markdown to a standalone HTML page."""
+    blocks = parse_blocks(markdown)
+    body: List[str] = []
+    for block in blocks:
+        if block.kind == "heading":
+            body.append(f"<h{block.level}>{inline_html(block.text)}</h{block.level}>")
+        elif block.kind == "paragraph":
+            body.append(f"<p>{inline_html(block.text)}</p>")
+        elif block.kind == "list":
+            tag = "ol" if block.ordered else "ul"
+            body.append(f"<{tag}>")
+            body.extend(f"<li>{inline_html(item)}</li>" for item in block.items)
+            body.append(f"</{tag}>")
+        elif block.kind == "quote":
+            body.append(f"<blockquote><p>{inline_html(block.text)}</p></blockquote>")
+        elif block.kind == "code":
+            body.append(f"<pre><code>{html.escape(block.text)}</code></pre>")
+        elif block.kind == "rule":
+            body.append("<hr>")
+    
+    return (
+        "<!DOCTYPE html>\n"
+        '<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+        f"<title>{html.escape(document_title(blocks))}</title>\n"
+        f"<style>{HTML_STYLE}</style>\n</head>\n<body>\n"
+        + "\n".join(body)
+        + "\n</body>\n</html>\n"
+    )
+
+
+# -- PDF --
+
+# Advance widths (1/1000 em) of ASCII 32-126 in the standard Helvetica fonts
+_HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_HELVETICA_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+_DEFAULT_WIDTH = 600  # Non-ASCII characters, erring wide so lines never overflow
+
+PAGE_WIDTH = 612  # US Letter, in points
+PAGE_HEIGHT = 792
+PAGE_MARGIN = 72
+BODY_SIZE = 10.5
+HEADING_SIZES = {1: 18, 2: 14, 3: 12}
+LINE_SPACING = 1.4
+
+
+def _text_width(text: str, size: float, bold: bool = False) -> float:
+    widths = _HELVETICA_BOLD_WIDTHS if bold else _HELVETICA_WIDTHS
+    total = 0
+    for character in text:
+        code = ord(character) - 32
+        total += widths[code] if 0 <= code < len(widths) else _DEFAULT_WIDTH
+    return total * size / 1000
+
+
+def _wrap(text: str, size: float, width: float, bold: bool = False) -> List[str]:
+    """Break text into lines that fit `width` points, splitting overlong words."""
+    lines: List[str] = []
+    line = ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if _text_width(candidate, size, bold) <= width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        while _text_width(word, size, bold) > width:
+            cut = len(word) - 1
+            while cut > 1 and _text_width(word[:cut], size, bold) > width:
+                cut -= 1
+            lines.append(word[:cut])
+            word = word[cut:]
+        line = word
+    if line:
+        lines.append(line)
+    return lines or [""]
+
+
+def _pdf_string(text: str) -> bytes:
+    """Encode text as a PDF literal string in WinAnsiEncoding."""
+    data = text.encode("cp1252")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _encodable(character: str) -> bool:
+    try:
+        character.encode("cp1252")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+class _PdfLayout:
+    """Lays out lines of text top to bottom across pages."""
+    
+    def __init__(self):
+        self.pages: List[List[bytes]] = []
+        self.y = 0.0
+        self._new_page()
+    
+    def _new_page(self):
+        self.pages.append([])
+        self.y = PAGE_HEIGHT - PAGE_MARGIN
+    
+    def space(self, points: float):
+        self.y -= points
+    
+    def line(self, text: str, size: float, bold: bool = False, indent: float = 0):
+        leading = size * LINE_SPACING
+        if self.y - leading < PAGE_MARGIN:
+            self._new_page()
+        self.y -= leading
+        if text:
+            font = b"/F2" if bold else b"/F1"
+            self.pages[-1].append(
+                b"BT %s %.2f Tf %.2f %.2f Td %s Tj ET" % (font, size, PAGE_MARGIN + indent, self.y, _pdf_string(text))
+            )
+    
+    def rule(self):
+        if self.y - BODY_SIZE < PAGE_MARGIN:
+            self._new_page()
+        self.y -= BODY_SIZE / 2
+        self.pages[-1].append(
+            b"0.6 G 0.5 w %d %.2f m %d %.2f l S" % (PAGE_MARGIN, self.y, PAGE_WIDTH - PAGE_MARGIN, self.y)
+        )
+        self.y -= BODY_SIZE / 2
+    
+    def paragraph(self, text: str, size: float = BODY_SIZE, bold: bool = False, indent: float = 0,
+                  first_prefix: str = ""):
+        width = PAGE_WIDTH - 2 * PAGE_MARGIN - indent
+        for number, text_line in enumerate(_wrap(text, size, width, bold)):
+            if number == 0 and first_prefix:
+                self.line(first_prefix, size, bold, indent - _text_width(first_prefix, size, bold))
+                self.y += size * LINE_SPACING  # Same baseline as the first line
+            self.line(text_line, size, bold, indent)
+
+
+def markdown_to_pdf(markdown: str) -> bytes:
+    """
+    Convert markdown to a PDF using the standard Helvetica fonts.
+    
+    Raises:
+        UnsupportedCharacters: If the text has characters outside WinAnsiEncoding
+            (cp1252), which the standard fonts can't show
+    """
+    try:
+        markdown.encode("cp1252")
+    except UnicodeEncodeError:
+        characters = sorted({character for character in markdown if not _encodable(character)})
+        raise UnsupportedCharacters("PDF", "".join(characters)) from None
+    blocks = parse_blocks(markdown)
+    layout = _PdfLayout()
+    for block in blocks:
+        if block.kind == "heading":
+            size = HEADING_SIZES.get(block.level, BODY_SIZE)
+            layout.space(size * 0.4)
+            layout.paragraph(inline_text(block.text), size, bold=True)
+            layout.space(size * 0.2)
+        elif block.kind == "paragraph":
+            layout.paragraph(inline_text(block.text))
+            layout.space(BODY_SIZE * 0.5)
+        elif block.kind == "list":
+            for number, item in enumerate(block.items, start=1):
+                marker = f"{number}. " if block.ordered else "• "
+                layout.paragraph(inline_text(item), indent=18, first_prefix=marker)
+            layout.space(BODY_SIZE * 0.5)
+        elif block.kind == "quote":
+            layout.paragraph(inline_text(block.text), indent=18)
+            layout.space(BODY_SIZE * 0.5)
+        elif block.kind == "code":
+            for code_line in block.text.splitlines() or [""]:
+                layout.paragraph(code_line, indent=18)
+            layout.space(BODY_SIZE * 0.5)
+        elif block.kind == "rule":
+            layout.rule()
+    
+    # Objects: 1 catalog, 2 page tree, 3-4 fonts, 5 info, then a page and its content stream per page
+    objects: List[bytes] = [b"", b"",
+                            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+                            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+                            b"<< /Title %s /Producer (compliance-sentinel) >>" % _pdf_string(document_title(blocks))]
+    page_ids = []
+    for commands in layout.pages:
+        stream = zlib.compress(b"\n".join(commands))
+        page_id = len(objects) + 1
+        page_ids.append(page_id)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, page_id + 1)
+        )
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % page_id for page_id in page_ids), len(page_ids)
+    )
+    
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# -- Registry --
+
+class Exporter(NamedTuple):
+    """An output format and the converter that produces it from markdown."""
+    
+    name: str
+    label: str
+    extension: str
+    convert: Callable[[str], bytes]
+    in_pool: bool = True  # Convert in the export process pool; only trivial conversions should run on the event loop
+
+
+def _markdown(markdown: str) -> bytes:
+    return markdown.encode("utf-8")
+
+
+EXPORTERS: Dict[str, Exporter] = {}
+
+
+def register_exporter(exporter: Exporter):
+    """
+    Add (or replace) an output format.
+    
+    Pool workers look formats up by name, so register custom formats when a
+    module the workers also import is loaded.
+    """
+    EXPORTERS[exporter.name] = exporter
+
+
+register_exporter(Exporter("markdown", "Markdown", "md", _markdown, in_pool=False))
+register_exporter(Exporter("text", "Plain text", "txt", lambda markdown: markdown_to_text(markdown).encode("utf-8")))
+register_exporter(Exporter("html", "HTML", "html", lambda markdown: markdown_to_html(markdown).encode("utf-8")))
+register_exporter(Exporter("pdf", "PDF", "pdf", markdown_to_pdf))
+
+
+def export_document(export_format: str, data: bytes) -> bytes:
+    """
+    Convert a UTF-8 markdown document to an output format.
+    
+    Raises:
+        KeyError: If the format isn't registered
+    """
+    return EXPORTERS[export_format].convert(data.decode("utf-8"))
@@ -1,65 +1,379 @@
 """Handles interactive forms for collecting user input."""
 
+import asyncio
 import discord
+import hashlib
+import json
+import logging
+import math
+from concurrent.futures import Future, ThreadPoolExecutor
 from io import BytesIO
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
+from bot.handlers.bundle import BUNDLE_FILENAME, build_bundle_variables
 from bot.handlers.document_generator import DocumentGenerator
+from bot.handlers.draft_store import DraftStore
+from bot.handlers.document_types import BUNDLE_DOCUMENT_TYPE, DOCUMENT_REGISTRY, DocumentTypeRegistry
+from bot.handlers.export_executor import ExportExecutor
+from bot.handlers.exporters import DEFAULT_EXPORT_FORMAT, EXPORTERS, UnsupportedCharacters
+from bot.handlers.form_schemas import BUNDLE_SCHEMA, BUNDLE_TYPE, FORM_SCHEMAS, FormSchema
+from bot.handlers.history_store import DocumentHistory
+from bot.handlers.payloads import PayloadCache
+from bot.handlers.render_cache import RenderCache, make_render_key
+from bot.handlers.rate_limit import GenerateRateLimiter, RateLimited
+from bot.handlers.render_executor import RenderExecutor, RenderOverloaded
+from bot.handlers.session_store import FormSession, SessionStore
+from bot.handlers.template_engine import CompiledTemplate
+from bot.handlers.template_store import GuildTemplateStore
+from bot.metrics import (
+    ACTIVE_FORMS,
+    DOCUMENT_SIZE_BYTES,
+    ERRORS,
+    FORM_DURATION,
+    GENERATE_INVOCATIONS,
+    METRICS,
+    REJECTED,
+    RESPONSE_SEND_SECONDS,
+)
+from config.config import (
+    DOCUMENT_HISTORY,
+    DOCUMENT_HISTORY_DB,
+    FORM_ANSWERS_TTL,
+    DOCUMENT_TYPES,
+    DRAFT_FLUSH_INTERVAL,
+    EXPORT_CACHE_SIZE,
+    EXPORT_WORKERS,
+    FORM_DRAFT_TTL,
+    FORM_DRAFTS_DB,
+    FORM_SESSION_MAX_SIZE,
+    FORM_SESSION_TTL,
+    GENERATE_GUILD_LIMIT,
+    GENERATE_GUILD_PERIOD,
+    GENERATE_USER_LIMIT,
+    GENERATE_USER_PERIOD,
+    GUILD_TEMPLATE_CACHE_SIZE,
+    GUILD_TEMPLATES_DB,
+    MAX_INFLIGHT_RENDERS,
+    RENDER_CACHE_SIZE,
+    RENDER_EXECUTOR,
+    RENDER_WORKERS,
+)
 
+logger = logging.getLogger(__name__)
 
-class DocumentTypeButton(discord.ui.Button):
-    """Button for selecting a document type."""
+# Largest document (in UTF-8 bytes) sent inline as a code block rather than as a file
+INLINE_DOCUMENT_LIMIT = 1900
+
+OVERLOADED_MESSAGE = (
+    "⏳ The bot is busy generating other documents right now. "
+    "Please try again in a few seconds."
+)
+
+# Longest list of changed sections shown after an edit (Discord's embed field limit)
+CHANGED_SECTIONS_LIMIT = 1024
+
+# Hex digits of the answers digest carried in an Edit Answers button's custom_id
+ANSWERS_DIGEST_LENGTH = 20
+
+EDIT_BASELINE_MISSING = (
+    "The answers this document was generated from are no longer available, "
+    "so the whole document was generated again."
+)
+
+
+def rate_limit_message(limited: RateLimited) -> str:
+    """Explain a rate limit to the user who hit it."""
+    seconds = math.ceil(limited.retry_after)
+    if limited.scope == "guild":
+        return f"⏳ This server is generating a lot of documents right now. Try again in {seconds} seconds."
+    return f"⏳ You're generating documents too quickly. Try again in {seconds} seconds."
+
+
+def button_custom_id(action: str, doc_type: str, export_format: str) -> str:
+    """Build a persistent button's custom_id; markdown buttons keep the original format-less id."""
+    if export_format == DEFAULT_EXPORT_FORMAT:
+        return f"compliance:{action}:{doc_type}"
+    return f"compliance:{action}:{doc_type}:{export_format}"
+
+
+def answers_digest(document_type: str, answers: Dict[str, str]) -> str:
+    """Short digest identifying the raw answers a document was generated from."""
+    payload = json.dumps([document_type, answers], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:ANSWERS_DIGEST_LENGTH]
+
+
+def describe_changes(template: CompiledTemplate, changed: FrozenSet[str], variables: Dict[str, Any]) -> str:
+    """List the sections of a document that an edit changed."""
+    if not changed:
+        return "Nothing changed; your answers are the same as before."
+    titles = "\n".join(
+        f"• {template.section_title(section, variables)}" for section in template.changed_sections(changed)
+    )
+    if len(titles) > CHANGED_SECTIONS_LIMIT:
+        titles = titles[:CHANGED_SECTIONS_LIMIT - 1] + "…"
+    return titles
+
+
+class DocumentTypeButton(discord.ui.DynamicItem[discord.ui.Button],
+                         template=r"compliance:select:(?P<doc_type>[a-z_]+)(?::(?P<export_format>[a-z]+))?"):
+    """Persistent button for selecting a document type, routed by its custom_id."""
     
-    def __init__(self, form_handler, doc_type: str, label: str):
-        super().__init__(label=label, style=discord.ButtonStyle.primary)
-        self.form_handler = form_handler
+    def __init__(self, doc_type: str, label: Optional[str] = None, export_format: str = DEFAULT_EXPORT_FORMAT):
+        super().__init__(
+            discord.ui.Button(
+                label=label,
+                style=discord.ButtonStyle.primary,
+                custom_id=button_custom_id("select", doc_type, export_format)
+            )
+        )
         self.doc_type = doc_type
+        self.export_format = export_format
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        """Rebuild the button from a clicked component."""
+        return cls(match["doc_type"], item.label, match["export_format"] or DEFAULT_EXPORT_FORMAT)
     
     async def callback(self, interaction: discord.Interaction):
         """Handle button click."""
-        await self.form_handler._handle_document_type_selection(interaction, self.doc_type)
+        GENERATE_INVOCATIONS.labels("select_button", self.doc_type).inc()
+        await interaction.client.form_handler._handle_document_type_selection(
+            interaction, self.doc_type, self.export_format
+        )
+
+
+class StartFormButton(discord.ui.DynamicItem[discord.ui.Button],
+                      template=r"compliance:start:(?P<doc_type>[a-z_]+)(?::(?P<export_format>[a-z]+))?"):
+    """Persistent button that opens the form for a document type."""
+    
+    def __init__(self, doc_type: str, export_format: str = DEFAULT_EXPORT_FORMAT):
+        super().__init__(
+            discord.ui.Button(
+                label="Start Form",
+                style=discord.ButtonStyle.primary,
+                custom_id=button_custom_id("start", doc_type, export_format)
+            )
+        )
+        self.doc_type = doc_type
+        self.export_format = export_format
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        """Rebuild the button from a clicked component."""
+        return cls(match["doc_type"], match["export_format"] or DEFAULT_EXPORT_FORMAT)
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Handle button click."""
+        GENERATE_INVOCATIONS.labels("start_button", self.doc_type).inc()
+        await interaction.client.form_handler.start_form(interaction, self.doc_type, self.export_format)
+
+
+class EditAnswersButton(discord.ui.DynamicItem[discord.ui.Button],
+                        template=r"compliance:edit:(?P<doc_type>[a-z_]+)(?::(?P<export_format>[a-z]+))?"
+                                 r"(?::(?P<answers>[0-9a-f]+))?"):
+    """
+    Persistent button on a generated document that reopens its form with that document's answers.
+    
+    The custom_id carries a digest of the answers (`compliance:edit:<type>:<format>:<digest>`),
+    so the button edits the document it is attached to rather than the user's latest draft.
+    """
+    
+    def __init__(self, doc_type: str, export_format: str = DEFAULT_EXPORT_FORMAT, answers: Optional[str] = None):
+        if answers is None:
+            custom_id = button_custom_id("edit", doc_type, export_format)
+        else:
+            custom_id = f"compliance:edit:{doc_type}:{export_format}:{answers}"
+        super().__init__(
+            discord.ui.Button(
+                label="Edit Answers",
+                style=discord.ButtonStyle.secondary,
+                custom_id=custom_id
+            )
+        )
+        self.doc_type = doc_type
+        self.export_format = export_format
+        self.answers = answers
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        """Rebuild the button from a clicked component."""
+        return cls(match["doc_type"], match["export_format"] or DEFAULT_EXPORT_FORMAT, match["answers"])
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Handle button click."""
+        GENERATE_INVOCATIONS.labels("edit_button", self.doc_type).inc()
+        await interaction.client.form_handler.start_form(
+            interaction, self.doc_type, self.export_format, edit=True, answers=self.answers
+        )
 
 
 class DocumentTypeView(discord.ui.View):
-    """View containing document type selection buttons."""
+    """Persistent view containing document type selection buttons."""
     
-    def __init__(self, form_handler):
-        super().__init__(timeout=300)
-        self.form_handler = form_handler
-        
-        document_types = [
-            ("rules", "📋 Rules"),
-            ("privacy_policy", "🔒 Privacy"),
-            ("terms_of_service", "📜 ToS"),
-            ("code_of_conduct", "✅ CoC"),
-            ("staff_sops", "👥 SOPs"),
-            ("moderation_guidelines", "⚖️ Moderation"),
-            ("appeal_process", "📝 Appeal"),
-        ]
+    def __init__(self, registry: DocumentTypeRegistry = DOCUMENT_REGISTRY, export_format: str = DEFAULT_EXPORT_FORMAT):
+        super().__init__(timeout=None)
         
-        for doc_type, label in document_types:
-            self.add_item(DocumentTypeButton(form_handler, doc_type, label))
+        for document_type in registry.selectable():
+            self.add_item(DocumentTypeButton(document_type.key, document_type.button_label, export_format))
+
+
+class StartFormView(discord.ui.View):
+    """Persistent view with a single button that starts a form."""
+    
+    def __init__(self, doc_type: str, export_format: str = DEFAULT_EXPORT_FORMAT):
+        super().__init__(timeout=None)
+        self.add_item(StartFormButton(doc_type, export_format))
+
+
+class EditAnswersView(discord.ui.View):
+    """Persistent view with a single button that reopens a document's form for editing."""
+    
+    def __init__(self, doc_type: str, export_format: str = DEFAULT_EXPORT_FORMAT, answers: Optional[str] = None):
+        super().__init__(timeout=None)
+        self.add_item(EditAnswersButton(doc_type, export_format, answers))
 
 
-class DynamicModal(discord.ui.Modal):
-    """A modal that can have its on_submit callback set dynamically."""
+class ModalSpec:
+    """A form schema compiled into ready-to-use TextInput arguments."""
     
-    def __init__(self, title: str, callback_func):
-        super().__init__(title=title)
-        self._callback_func = callback_func
+    __slots__ = ("schema", "title", "inputs")
+    
+    def __init__(self, schema: FormSchema):
+        self.schema = schema
+        self.title = schema.title
+        self.inputs = tuple(
+            {
+                "label": field.label,
+                "placeholder": field.placeholder,
+                "style": discord.TextStyle.paragraph if field.paragraph else discord.TextStyle.short,
+                "required": field.required,
+                "max_length": field.max_length,
+                "custom_id": field.name,
+            }
+            for field in schema.fields
+        )
+
+
+class SchemaModal(discord.ui.Modal):
+    """
+    A form modal built from a compiled ModalSpec, optionally prefilled with earlier answers.
+    
+    When `previous` holds the answers of the document being edited, the new
+    document is re-rendered from it incrementally and the reply lists the
+    sections that changed. With `edit` but no `previous`, the reply says the
+    earlier answers were no longer available.
+    """
+    
+    def __init__(self, form_handler, spec: ModalSpec, defaults: Optional[Dict[str, str]] = None,
+                 export_format: str = DEFAULT_EXPORT_FORMAT, previous: Optional[Dict[str, str]] = None,
+                 session: Optional[FormSession] = None, edit: bool = False):
+        # Expire with the session so abandoned modals don't stay in the client's view store
+        super().__init__(title=spec.title, timeout=FORM_SESSION_TTL)
+        self.form_handler = form_handler
+        self.spec = spec
+        self.export_format = export_format
+        self.previous = previous
+        self.session = session
+        self.edit = edit or previous is not None
+        
+        for kwargs in spec.inputs:
+            default = defaults.get(kwargs["custom_id"]) if defaults else None
+            if default:
+                default = default[:kwargs["max_length"]]
+            self.add_item(discord.ui.TextInput(**kwargs, default=default or None))
+    
+    async def on_timeout(self):
+        """Forget the form session of a modal that was never submitted."""
+        if self.session is not None:
+            self.form_handler.active_forms.expire(self.session)
     
     async def on_submit(self, interaction: discord.Interaction):
-        """Handle modal submission."""
-        await self._callback_func(interaction)
+        """Save the raw answers as a draft, parse them with the schema and generate the document."""
+        values = {item.custom_id: item.value for item in self.children}
+        document_type = self.spec.schema.document_type
+        self.form_handler.drafts.save(interaction.guild_id, interaction.user.id, document_type, values)
+        form_data = self.spec.schema.parse(values)
+        digest = self.form_handler._record_answers(interaction, document_type, values)
+        if METRICS.enabled:
+            self.form_handler._observe_form_duration(interaction, document_type)
+        if document_type == BUNDLE_TYPE:
+            await self.form_handler._process_bundle(interaction, form_data, self.export_format)
+        else:
+            previous_data = self.spec.schema.parse(self.previous) if self.previous is not None else None
+            await self.form_handler._process_form(
+                interaction, document_type, form_data, self.export_format, previous_data, digest, self.edit
+            )
 
 
 class FormHandler:
     """Manages interactive forms for document generation."""
     
     def __init__(self):
-        self.document_generator = DocumentGenerator()
-        self.active_forms: Dict[int, Dict[str, Any]] = {}  # user_id -> form_data
+        self.document_generator = DocumentGenerator(GuildTemplateStore(GUILD_TEMPLATES_DB), GUILD_TEMPLATE_CACHE_SIZE)
+        self.render_executor = RenderExecutor(
+            self.document_generator, RENDER_EXECUTOR, RENDER_WORKERS, MAX_INFLIGHT_RENDERS
+        )
+        self.rate_limiter = GenerateRateLimiter(
+            GENERATE_USER_LIMIT, GENERATE_USER_PERIOD, GENERATE_GUILD_LIMIT, GENERATE_GUILD_PERIOD
+        )
+        self.export_executor = ExportExecutor(EXPORT_WORKERS, EXPORT_CACHE_SIZE)
+        self.render_cache = RenderCache(RENDER_CACHE_SIZE)
+        self.active_forms = SessionStore(FORM_SESSION_TTL, FORM_SESSION_MAX_SIZE)  # (guild_id, user_id) -> session
+        self.drafts = DraftStore(FORM_DRAFTS_DB, FORM_DRAFT_TTL, DRAFT_FLUSH_INTERVAL)  # Last answers, kept across restarts
+        self.history = DocumentHistory(
+            DOCUMENT_HISTORY_DB, FORM_ANSWERS_TTL, self._history_dictionary
+        ) if DOCUMENT_HISTORY else None
+        # One writer thread records documents in the order they were generated, off the event loop
+        self._history_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self.modal_specs = self._compile_modal_specs()  # document_type -> ModalSpec
+        
+        # Views and static embeds are built once and shared by every message; buttons are routed by custom_id
+        self.document_type_views = {
+            export_format: DocumentTypeView(DOCUMENT_REGISTRY, export_format) for export_format in EXPORTERS
+        }
+        self.start_form_views = {
+            (document_type.key, export_format): StartFormView(document_type.key, export_format)
+            for document_type in DOCUMENT_REGISTRY.selectable()
+            for export_format in EXPORTERS
+        }
+        self.edit_views = {
+            (document_type.key, export_format): EditAnswersView(document_type.key, export_format)
+            for document_type in DOCUMENT_REGISTRY.selectable()
+            for export_format in EXPORTERS
+        }
+        self.payloads = PayloadCache(DOCUMENT_REGISTRY, self.document_generator.templates)
+        self.payloads.register("document_types", self._build_document_type_embed)
+        ACTIVE_FORMS.set_function(lambda: len(self.active_forms))
+    
+    def _compile_modal_specs(self) -> Dict[str, ModalSpec]:
+        """Validate every form schema against its template and compile it into a modal spec."""
+        specs = {}
+        for document_type, schema in FORM_SCHEMAS.items():
+            schema.validate(self.document_generator.get_template(document_type).placeholders)
+            specs[document_type] = ModalSpec(schema)
+        
+        # Bundle fields only need to appear in at least one template
+        placeholders = set()
+        for document_type in DOCUMENT_TYPES:
+            placeholders |= self.document_generator.get_template(document_type).placeholders
+        BUNDLE_SCHEMA.validate(placeholders)
+        specs[BUNDLE_TYPE] = ModalSpec(BUNDLE_SCHEMA)
+        return specs
+    
+    def close(self):
+        """Release the render and export pools, the template, draft and history stores."""
+        self.render_executor.shutdown()
+        self.export_executor.shutdown()
+        self.document_generator.template_store.close()
+        self.drafts.close()
+        self._history_writer.shutdown(wait=True)  # Finish recording documents that were already sent
+        if self.history is not None:
+            self.history.close()
     
     def get_document_type_embed(self) -> discord.Embed:
+        """Get the cached embed for document type selection."""
+        return self.payloads.get("document_types")
+    
+    def _build_document_type_embed(self) -> discord.Embed:
         """Create an embed for document type selection."""
         embed = discord.Embed(
             title="📄 Legal Compliance Document Generator",
@@ -67,473 +381,352 @@ class FormHandler:
             color=discord.Color.blue()
         )
         
-        document_types = {
-            "rules": "📋 Server Rules",
-            "privacy_policy": "🔒 Privacy Policy",
-            "terms_of_service": "📜 Terms of Service",
-            "code_of_conduct": "✅ Code of Conduct",
-            "staff_sops": "👥 Staff SOPs",
-            "moderation_guidelines": "⚖️ Moderation Guidelines",
-            "appeal_process": "📝 Appeal Process",
-        }
+        available = set(self.document_generator.get_available_document_types())
+        for document_type in DOCUMENT_REGISTRY:
+            if document_type.key in available:
+                embed.add_field(
+                    name=document_type.title,
+                    value=f"Type: `{document_type.key}`",
+                    inline=False
+                )
         
-        for doc_type, display_name in document_types.items():
-            embed.add_field(
-                name=display_name,
-                value=f"Type: `{doc_type}`",
-                inline=False
-            )
+        embed.add_field(
+            name=BUNDLE_DOCUMENT_TYPE.title,
+            value=f"Type: `{BUNDLE_TYPE}` - every document above in one zip file",
+            inline=False
+        )
         
         embed.set_footer(text="Use the buttons below or type the document type name")
         return embed
     
-    def get_document_type_view(self) -> discord.ui.View:
-        """Create a view with buttons for document type selection."""
-        view = DocumentTypeView(self)
-        return view
+    def get_document_type_view(self, export_format: str = DEFAULT_EXPORT_FORMAT) -> discord.ui.View:
+        """Get the shared view with buttons for document type selection in an export format."""
+        return self.document_type_views[export_format]
+    
+    def get_start_form_view(self, document_type: str, export_format: str = DEFAULT_EXPORT_FORMAT) -> discord.ui.View:
+        """Get the shared view with a button that starts the form for a document type and export format."""
+        return self.start_form_views[document_type, export_format]
     
-    async def _handle_document_type_selection(self, interaction: discord.Interaction, document_type: str):
+    def get_edit_view(self, document_type: str, export_format: str = DEFAULT_EXPORT_FORMAT,
+                      answers: Optional[str] = None) -> discord.ui.View:
+        """
+        Get a view with a button that reopens a generated document's form for editing.
+        
+        With an `answers` digest the button edits exactly those answers. Its view
+        is built per message, which costs nothing afterwards: a view made only of
+        dynamic items isn't kept in the client's view store.
+        """
+        if answers is None:
+            return self.edit_views[document_type, export_format]
+        return EditAnswersView(document_type, export_format, answers)
+    
+    async def check_rate_limit(self, interaction: discord.Interaction) -> bool:
+        """Take a generate request from the user's and guild's limits, or reply and return False."""
+        limited = self.rate_limiter.hit(interaction.guild_id, interaction.user.id)
+        if limited is None:
+            return True
+        
+        REJECTED.labels(limited.scope).inc()
+        await interaction.response.send_message(rate_limit_message(limited), ephemeral=True)
+        return False
+    
+    async def _handle_document_type_selection(self, interaction: discord.Interaction, document_type: str,
+                                              export_format: str = DEFAULT_EXPORT_FORMAT):
         """Handle document type button selection."""
-        # Initialize form data for this user
-        self.active_forms[interaction.user.id] = {
-            "document_type": document_type,
-            "data": {}
-        }
+        await self.start_form(interaction, document_type, export_format)
+    
+    async def start_form(self, interaction: discord.Interaction, document_type: str,
+                         export_format: str = DEFAULT_EXPORT_FORMAT, edit: bool = False,
+                         answers: Optional[str] = None):
+        """
+        Start a form session for the user and show the form modal, prefilled with their last answers.
+        
+        Every way of opening a form (commands, menu and start buttons, edit
+        buttons) comes through here, so this is where a generate request is
+        taken from the user's and guild's limits.
+        
+        With `edit`, the form is prefilled with the answers of the document
+        being edited (found by their `answers` digest) instead, and the submitted
+        form is compared against them to re-render only what changed.
+        """
+        if document_type not in self.modal_specs:
+            await interaction.response.send_message(
+                f"❌ Invalid document type. Available types: {', '.join(self.modal_specs)}",
+                ephemeral=True
+            )
+            return
+        if export_format not in EXPORTERS:
+            await interaction.response.send_message(
+                f"❌ Invalid format. Available formats: {', '.join(EXPORTERS)}",
+                ephemeral=True
+            )
+            return
+        if not await self.check_rate_limit(interaction):
+            return
+        
+        session = self.active_forms.start(interaction.guild_id, interaction.user.id, document_type)
         
         # Show the appropriate form modal
-        modal = self._get_form_modal(document_type)
+        defaults = await self.drafts.load(interaction.guild_id, interaction.user.id, document_type)
+        previous = None
+        if edit:
+            previous = await self._load_answers(interaction.guild_id, document_type, answers, defaults)
+            if previous is not None:
+                defaults = previous
+        modal = self._get_form_modal(document_type, defaults, export_format, previous, session, edit)
         await interaction.response.send_modal(modal)
     
-    def _get_form_modal(self, document_type: str) -> discord.ui.Modal:
-        """Get the appropriate modal form for a document type."""
-        modals = {
-            "rules": self._get_rules_modal,
-            "privacy_policy": self._get_privacy_policy_modal,
-            "terms_of_service": self._get_terms_modal,
-            "code_of_conduct": self._get_code_of_conduct_modal,
-            "staff_sops": self._get_staff_sops_modal,
-            "moderation_guidelines": self._get_moderation_modal,
-            "appeal_process": self._get_appeal_modal,
-        }
-        
-        return modals.get(document_type, self._get_generic_modal)()
-    
-    def _get_rules_modal(self) -> discord.ui.Modal:
-        """Modal for Server Rules."""
-        server_name = discord.ui.TextInput(
-            label="Server Name",
-            placeholder="Enter your server name",
-            required=True,
-            max_length=100
-        )
-        
-        contact_info = discord.ui.TextInput(
-            label="Contact Information",
-            placeholder="Email or Discord username for contact",
-            required=False,
-            max_length=200
-        )
-        
-        rules = discord.ui.TextInput(
-            label="Rules (one per line)",
-            placeholder="Rule 1\nRule 2\nRule 3",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=2000
-        )
-        
-        consequences = discord.ui.TextInput(
-            label="Consequences for Violations",
-            placeholder="e.g., Warning → Mute → Ban",
-            style=discord.TextStyle.paragraph,
-            required=False,
-            max_length=500
-        )
-        
-        async def callback(interaction: discord.Interaction):
-            form_data = {
-                "server_name": server_name.value,
-                "contact_info": contact_info.value or "Contact server administrators",
-                "rules": [r.strip() for r in rules.value.split("\n") if r.strip()],
-                "consequences": consequences.value or "Violations may result in warnings, mutes, or bans at staff discretion."
-            }
-            await self._process_form(interaction, "rules", form_data)
-        
-        modal = DynamicModal(title="Generate Server Rules", callback_func=callback)
-        modal.add_item(server_name)
-        modal.add_item(contact_info)
-        modal.add_item(rules)
-        modal.add_item(consequences)
-        return modal
-    
-    def _get_privacy_policy_modal(self) -> discord.ui.Modal:
-        """Modal for Privacy Policy."""
-        server_name = discord.ui.TextInput(
-            label="Server Name",
-            placeholder="Enter your server name",
-            required=True,
-            max_length=100
-        )
-        
-        contact_email = discord.ui.TextInput(
-            label="Contact Email",
-            placeholder="privacy@example.com",
-            required=False,
-            max_length=200
-        )
-        
-        data_collected = discord.ui.TextInput(
-            label="Data Collected (one per line)",
-            placeholder="Discord username\nMessages\nUser IDs",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=1000
-        )
-        
-        data_usage = discord.ui.TextInput(
-            label="How Data is Used",
-            placeholder="Describe how collected data is used",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=1000
-        )
-        
-        async def callback(interaction: discord.Interaction):
-            form_data = {
-                "server_name": server_name.value,
-                "contact_email": contact_email.value or "Contact server administrators",
-                "data_collected": [d.strip() for d in data_collected.value.split("\n") if d.strip()],
-                "data_usage": data_usage.value
-            }
-            await self._process_form(interaction, "privacy_policy", form_data)
-        
-        modal = DynamicModal(title="Generate Privacy Policy", callback_func=callback)
-        modal.add_item(server_name)
-        modal.add_item(contact_email)
-        modal.add_item(data_collected)
-        modal.add_item(data_usage)
-        return modal
-    
-    def _get_terms_modal(self) -> discord.ui.Modal:
-        """Modal for Terms of Service."""
-        server_name = discord.ui.TextInput(
-            label="Server Name",
-            placeholder="Enter your server name",
-            required=True,
-            max_length=100
-        )
-        
-        contact_info = discord.ui.TextInput(
-            label="Contact Information",
-            placeholder="Email or Discord username",
-            required=False,
-            max_length=200
-        )
-        
-        prohibited_activities = discord.ui.TextInput(
-            label="Prohibited Activities (one per line)",
-            placeholder="Harassment\nSpam\nNSFW content",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=1500
-        )
-        
-        user_obligations = discord.ui.TextInput(
-            label="User Obligations",
-            placeholder="Describe user responsibilities",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=1000
-        )
-        
-        async def callback(interaction: discord.Interaction):
-            form_data = {
-                "server_name": server_name.value,
-                "contact_info": contact_info.value or "Contact server administrators",
-                "prohibited_activities": [p.strip() for p in prohibited_activities.value.split("\n") if p.strip()],
-                "user_obligations": user_obligations.value
-            }
-            await self._process_form(interaction, "terms_of_service", form_data)
-        
-        modal = DynamicModal(title="Generate Terms of Service", callback_func=callback)
-        modal.add_item(server_name)
-        modal.add_item(contact_info)
-        modal.add_item(prohibited_activities)
-        modal.add_item(user_obligations)
-        return modal
-    
-    def _get_code_of_conduct_modal(self) -> discord.ui.Modal:
-        """Modal for Code of Conduct."""
-        server_name = discord.ui.TextInput(
-            label="Server Name",
-            placeholder="Enter your server name",
-            required=True,
-            max_length=100
-        )
-        
-        expected_behavior = discord.ui.TextInput(
-            label="Expected Behavior (one per line)",
-            placeholder="Be respectful\nBe inclusive\nFollow Discord ToS",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=1500
-        )
-        
-        reporting_process = discord.ui.TextInput(
-            label="Reporting Process",
-            placeholder="How to report violations",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=500
-        )
-        
-        contact_info = discord.ui.TextInput(
-            label="Contact Information",
-            placeholder="Email or Discord username",
-            required=False,
-            max_length=200
-        )
-        
-        async def callback(interaction: discord.Interaction):
-            form_data = {
-                "server_name": server_name.value,
-                "expected_behavior": [b.strip() for b in expected_behavior.value.split("\n") if b.strip()],
-                "reporting_process": reporting_process.value,
-                "contact_info": contact_info.value or "Contact server administrators"
-            }
-            await self._process_form(interaction, "code_of_conduct", form_data)
-        
-        modal = DynamicModal(title="Generate Code of Conduct", callback_func=callback)
-        modal.add_item(server_name)
-        modal.add_item(expected_behavior)
-        modal.add_item(reporting_process)
-        modal.add_item(contact_info)
-        return modal
-    
-    def _get_staff_sops_modal(self) -> discord.ui.Modal:
-        """Modal for Staff SOPs."""
-        server_name = discord.ui.TextInput(
-            label="Server Name",
-            placeholder="Enter your server name",
-            required=True,
-            max_length=100
-        )
-        
-        staff_roles = discord.ui.TextInput(
-            label="Staff Roles (one per line)",
-            placeholder="Administrator\nModerator\nSupport Staff",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=500
-        )
-        
-        procedures = discord.ui.TextInput(
-            label="Key Procedures (one per line)",
-            placeholder="Handling reports\nEscalation process\nBan appeals",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=1500
-        )
-        
-        escalation_path = discord.ui.TextInput(
-            label="Escalation Path",
-            placeholder="Describe the escalation process",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=500
-        )
-        
-        async def callback(interaction: discord.Interaction):
-            form_data = {
-                "server_name": server_name.value,
-                "staff_roles": [r.strip() for r in staff_roles.value.split("\n") if r.strip()],
-                "procedures": [p.strip() for p in procedures.value.split("\n") if p.strip()],
-                "escalation_path": escalation_path.value
-            }
-            await self._process_form(interaction, "staff_sops", form_data)
-        
-        modal = DynamicModal(title="Generate Staff SOPs", callback_func=callback)
-        modal.add_item(server_name)
-        modal.add_item(staff_roles)
-        modal.add_item(procedures)
-        modal.add_item(escalation_path)
-        return modal
-    
-    def _get_moderation_modal(self) -> discord.ui.Modal:
-        """Modal for Moderation Guidelines."""
-        server_name = discord.ui.TextInput(
-            label="Server Name",
-            placeholder="Enter your server name",
-            required=True,
-            max_length=100
-        )
-        
-        moderation_actions = discord.ui.TextInput(
-            label="Moderation Actions (one per line)",
-            placeholder="Warning\nMute\nKick\nBan",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=500
-        )
-        
-        warning_system = discord.ui.TextInput(
-            label="Warning System",
-            placeholder="Describe the warning system",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=500
-        )
-        
-        ban_criteria = discord.ui.TextInput(
-            label="Ban Criteria",
-            placeholder="Describe when bans are issued",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=500
-        )
-        
-        async def callback(interaction: discord.Interaction):
-            form_data = {
-                "server_name": server_name.value,
-                "moderation_actions": [a.strip() for a in moderation_actions.value.split("\n") if a.strip()],
-                "warning_system": warning_system.value,
-                "ban_criteria": ban_criteria.value
-            }
-            await self._process_form(interaction, "moderation_guidelines", form_data)
-        
-        modal = DynamicModal(title="Generate Moderation Guidelines", callback_func=callback)
-        modal.add_item(server_name)
-        modal.add_item(moderation_actions)
-        modal.add_item(warning_system)
-        modal.add_item(ban_criteria)
-        return modal
-    
-    def _get_appeal_modal(self) -> discord.ui.Modal:
-        """Modal for Appeal Process."""
-        server_name = discord.ui.TextInput(
-            label="Server Name",
-            placeholder="Enter your server name",
-            required=True,
-            max_length=100
-        )
-        
-        appeal_requirements = discord.ui.TextInput(
-            label="Appeal Requirements",
-            placeholder="What information is needed for appeals",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=500
-        )
-        
-        review_process = discord.ui.TextInput(
-            label="Review Process",
-            placeholder="How appeals are reviewed",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=500
-        )
-        
-        timelines = discord.ui.TextInput(
-            label="Timelines",
-            placeholder="Response time, review duration, etc.",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=500
-        )
-        
-        contact_info = discord.ui.TextInput(
-            label="Contact Information",
-            placeholder="How to submit appeals",
-            required=False,
-            max_length=200
-        )
-        
-        async def callback(interaction: discord.Interaction):
-            form_data = {
-                "server_name": server_name.value,
-                "appeal_requirements": appeal_requirements.value,
-                "review_process": review_process.value,
-                "timelines": timelines.value,
-                "contact_info": contact_info.value or "Contact server administrators"
-            }
-            await self._process_form(interaction, "appeal_process", form_data)
-        
-        modal = DynamicModal(title="Generate Appeal Process", callback_func=callback)
-        modal.add_item(server_name)
-        modal.add_item(appeal_requirements)
-        modal.add_item(review_process)
-        modal.add_item(timelines)
-        modal.add_item(contact_info)
-        return modal
-    
-    def _get_generic_modal(self) -> discord.ui.Modal:
-        """Generic modal for unknown document types."""
-        server_name = discord.ui.TextInput(
-            label="Server Name",
-            placeholder="Enter your server name",
-            required=True,
-            max_length=100
-        )
-        
-        content = discord.ui.TextInput(
-            label="Content",
-            placeholder="Enter document content",
-            style=discord.TextStyle.paragraph,
-            required=True,
-            max_length=2000
+    def _get_form_modal(self, document_type: str, defaults: Optional[Dict[str, str]] = None,
+                        export_format: str = DEFAULT_EXPORT_FORMAT,
+                        previous: Optional[Dict[str, str]] = None,
+                        session: Optional[FormSession] = None, edit: bool = False) -> discord.ui.Modal:
+        """Build the modal form for a document type from its compiled spec, prefilled with `defaults`."""
+        return SchemaModal(self, self.modal_specs[document_type], defaults, export_format, previous, session, edit)
+    
+    async def _load_answers(self, guild_id: Optional[int], document_type: str, answers: Optional[str],
+                            draft: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        """
+        Find the raw answers an Edit Answers button refers to, or None if they're gone.
+        
+        Buttons from before answers were tracked carry no digest and edit the
+        user's draft. Otherwise the draft is used when it is the same answers
+        (the usual case: editing the latest document), and the history
+        database is asked for anything older.
+        """
+        if answers is None:
+            return draft
+        if draft is not None and answers_digest(document_type, draft) == answers:
+            return draft
+        if self.history is None or guild_id is None:
+            return None
+        return await asyncio.to_thread(self.history.get_answers, guild_id, answers, document_type)
+    
+    def _record_answers(self, interaction: discord.Interaction, document_type: str,
+                        answers: Dict[str, str]) -> str:
+        """Keep submitted raw answers in the history database so Edit Answers can find them; returns their digest."""
+        digest = answers_digest(document_type, answers)
+        if self.history is not None and interaction.guild_id is not None:
+            future = self._history_writer.submit(
+                self.history.save_answers, interaction.guild_id, digest, document_type, dict(answers)
+            )
+            future.add_done_callback(self._history_recorded)
+        return digest
+    
+    def _observe_form_duration(self, interaction: discord.Interaction, document_type: str):
+        """Record how long the user's form was open before it was submitted."""
+        session = self.active_forms.get(interaction.guild_id, interaction.user.id)
+        if session is not None:
+            FORM_DURATION.labels(document_type).observe(self.active_forms.age(session))
+    
+    def _history_dictionary(self, document_type: str) -> Optional[bytes]:
+        """The shipped template of a document type, which history blobs are compressed against."""
+        try:
+            return self.document_generator.templates.get(document_type).source.encode("utf-8")
+        except FileNotFoundError:
+            return None
+    
+    def _record_history(self, interaction: discord.Interaction, documents: List[Tuple[str, bytes]]):
+        """Record generated (document_type, markdown) documents in the guild's history in the background."""
+        if self.history is None or interaction.guild_id is None:
+            return
+        future = self._history_writer.submit(
+            self.history.record_many, interaction.guild_id, documents, interaction.user.id
+        )
+        future.add_done_callback(self._history_recorded)
+    
+    @staticmethod
+    def _history_recorded(future: Future):
+        """Log documents that couldn't be recorded."""
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Error recording document history: {error}")
+            ERRORS.labels("history", type(error).__name__).inc()
+    
+    async def _process_bundle(self, interaction: discord.Interaction, form_data: Dict[str, Any],
+                              export_format: str = DEFAULT_EXPORT_FORMAT):
+        """Render every document type from the shared answers and send them as one zip file."""
+        try:
+            # Rendering seven documents can take longer than the 3 second response window
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            
+            variables_by_type = build_bundle_variables(DOCUMENT_TYPES, form_data)
+            rendered = await self.render_executor.render_many(variables_by_type, interaction.guild_id)
+            self._record_history(interaction, [(document.document_type, document.data) for document in rendered])
+            
+            if export_format == DEFAULT_EXPORT_FORMAT:
+                exported = [document.data for document in rendered]
+            else:
+                exported = await asyncio.gather(
+                    *(self.export_executor.export(export_format, document.data) for document in rendered)
+                )
+            extension = EXPORTERS[export_format].extension
+            archive = await self.render_executor.build_archive([
+                (f"{document.document_type}.{extension}", data) for document, data in zip(rendered, exported)
+            ])
+            
+            file = discord.File(fp=BytesIO(archive), filename=BUNDLE_FILENAME)
+            embed = discord.Embed(
+                title="✅ Generated Compliance Bundle",
+                description=(
+                    f"All {len(variables_by_type)} documents have been generated! "
+                    "Sections marked N/A can be completed by generating that document on its own."
+                ),
+                color=discord.Color.green()
+            )
+            DOCUMENT_SIZE_BYTES.labels(BUNDLE_TYPE).observe(len(archive))
+            with RESPONSE_SEND_SECONDS.labels("bundle").time():
+                await interaction.followup.send(embed=embed, file=file, ephemeral=True)
+        
+        except RenderOverloaded:
+            REJECTED.labels("overloaded").inc()
+            await interaction.followup.send(OVERLOADED_MESSAGE, ephemeral=True)
+        except UnsupportedCharacters as e:
+            await interaction.followup.send(f"❌ {e}", ephemeral=True)
+        except Exception as e:
+            ERRORS.labels("bundle", type(e).__name__).inc()
+            await interaction.followup.send(f"❌ Error generating bundle: {str(e)}", ephemeral=True)
+        finally:
+            self.active_forms.pop(interaction.guild_id, interaction.user.id)
+    
+    @staticmethod
+    def _document_embed(document_type: str, description: str, changes: Optional[str] = None) -> discord.Embed:
+        """Create the embed sent with a generated document, listing the changed sections after an edit."""
+        embed = discord.Embed(
+            title=f"✅ Generated {document_type.replace('_', ' ').title()}",
+            description=description,
+            color=discord.Color.green()
         )
-        
-        async def callback(interaction: discord.Interaction):
-            await interaction.response.send_message("Generic document generation not yet implemented.", ephemeral=True)
-        
-        modal = DynamicModal(title="Generate Document", callback_func=callback)
-        modal.add_item(server_name)
-        modal.add_item(content)
-        return modal
+        if changes is not None:
+            embed.add_field(name="Changed sections", value=changes, inline=False)
+        return embed
+    
+    @staticmethod
+    async def _send_error(interaction: discord.Interaction, message: str):
+        """Send an ephemeral error, as a followup if the response was already sent or deferred."""
+        if interaction.response.is_done():
+            await interaction.followup.send(message, ephemeral=True)
+        else:
+            await interaction.response.send_message(message, ephemeral=True)
+    
+    async def _send_export(self, interaction: discord.Interaction, document_type: str, data: bytes,
+                           export_format: str, changes: Optional[str] = None,
+                           view: Optional[discord.ui.View] = None):
+        """Convert a rendered document to an export format in the export pool and send it as a file."""
+        exporter = EXPORTERS[export_format]
+        # Converting can take longer than the 3 second response window when the export pool is busy
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        exported = await self.export_executor.export(export_format, data)
+        
+        file = discord.File(fp=BytesIO(exported), filename=f"{document_type}.{exporter.extension}")
+        embed = self._document_embed(
+            document_type, f"Your document has been generated! Here's the {exporter.label} file:", changes
+        )
+        with RESPONSE_SEND_SECONDS.labels("export").time():
+            await interaction.followup.send(
+                embed=embed, file=file, view=view or self.get_edit_view(document_type, export_format), ephemeral=True
+            )
     
-    async def _process_form(self, interaction: discord.Interaction, document_type: str, form_data: Dict[str, Any]):
-        """Process the submitted form and generate the document."""
+    async def _process_form(self, interaction: discord.Interaction, document_type: str, form_data: Dict[str, Any],
+                            export_format: str = DEFAULT_EXPORT_FORMAT,
+                            previous_data: Optional[Dict[str, Any]] = None, answers: Optional[str] = None,
+                            edit: bool = False):
+        """
+        Process the submitted form and generate the document.
+        
+        `previous_data` holds the answers of the document being edited, if any.
+        When its render is still cached, only the placeholders whose answers
+        changed are rendered again. `answers` is the digest of the submitted
+        answers, put on the reply's Edit Answers button; `edit` says the form
+        was opened with that button.
+        """
         try:
-            # Generate the document
-            document = self.document_generator.generate_document(document_type, form_data)
+            template = self.document_generator.resolve_template(document_type, interaction.guild_id)
+            changed = None
+            if previous_data is not None:
+                changed = template.compiled.changed_placeholders(previous_data, form_data)
             
-            # Discord has a 2000 character limit for messages, so we'll send as a file if too long
-            if len(document) > 1900:  # Leave some buffer
-                # Send as a file
+            # Reuse an identical earlier render, or patch the edited one, or render and encode in the render pool
+            cache_key = make_render_key(document_type, template.version, form_data)
+            cached = self.render_cache.get(cache_key)
+            if cached is None:
+                previous = None
+                if previous_data is not None:
+                    previous = self.render_cache.peek(make_render_key(document_type, template.version, previous_data))
+                if previous is not None and previous.rendered.value_sizes is not None:
+                    rendered = self.render_executor.rerender(template, previous.rendered, form_data, changed)
+                else:
+                    rendered = await self.render_executor.render(document_type, form_data, interaction.guild_id)
+                cached = self.render_cache.put(cache_key, rendered)
+            rendered = cached.rendered
+            DOCUMENT_SIZE_BYTES.labels(document_type).observe(rendered.size)
+            self._record_history(interaction, [(document_type, rendered.data)])
+            
+            if changed is not None:
+                changes = describe_changes(template.compiled, changed, form_data)
+            else:
+                changes = EDIT_BASELINE_MISSING if edit else None
+            view = self.get_edit_view(document_type, export_format, answers)
+            if export_format != DEFAULT_EXPORT_FORMAT:
+                await self._send_export(interaction, document_type, rendered.data, export_format, changes, view)
+                return
+            
+            # Discord has a 2000 character limit for messages, so we'll send as a file if too long.
+            # The byte count is never below the character count, so this check is always safe.
+            if rendered.size > INLINE_DOCUMENT_LIMIT:
+                attachment_url = self.render_cache.get_attachment_url(cached)
+                if attachment_url:
+                    # Point at the identical document uploaded earlier
+                    embed = self._document_embed(
+                        document_type,
+                        f"Your document has been generated! Here's the markdown file:\n[{document_type}.md]({attachment_url})",
+                        changes
+                    )
+                    with RESPONSE_SEND_SECONDS.labels("link").time():
+                        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+                    return
+                
+                # Send as a file; BytesIO shares the rendered bytes rather than copying them
                 file = discord.File(
-                    fp=BytesIO(document.encode('utf-8')),
+                    fp=BytesIO(rendered.data),
                     filename=f"{document_type}.md"
                 )
-                embed = discord.Embed(
-                    title=f"✅ Generated {document_type.replace('_', ' ').title()}",
-                    description=f"Your document has been generated! Here's the markdown file:",
-                    color=discord.Color.green()
+                embed = self._document_embed(
+                    document_type, "Your document has been generated! Here's the markdown file:", changes
                 )
-                await interaction.response.send_message(embed=embed, file=file, ephemeral=True)
+                with RESPONSE_SEND_SECONDS.labels("file").time():
+                    response = await interaction.response.send_message(
+                        embed=embed, file=file, view=view, ephemeral=True
+                    )
+                
+                # Remember the upload so identical requests can link to it
+                message = response.resource if response is not None else None
+                if isinstance(message, discord.InteractionMessage) and message.attachments:
+                    self.render_cache.remember_attachment(cached, message.attachments[0].url)
             else:
                 # Send as a code block
-                embed = discord.Embed(
-                    title=f"✅ Generated {document_type.replace('_', ' ').title()}",
-                    description="Your document has been generated:",
-                    color=discord.Color.green()
-                )
-                await interaction.response.send_message(
-                    embed=embed,
-                    content=f"```markdown\n{document}\n```",
-                    ephemeral=True
-                )
-            
-            # Clean up form data
-            if interaction.user.id in self.active_forms:
-                del self.active_forms[interaction.user.id]
-        
+                embed = self._document_embed(document_type, "Your document has been generated:", changes)
+                with RESPONSE_SEND_SECONDS.labels("inline").time():
+                    await interaction.response.send_message(
+                        embed=embed,
+                        content=f"```markdown\n{rendered.text}\n```",
+                        view=view,
+                        ephemeral=True
+                    )
+        
+        except RenderOverloaded:
+            # Turn the submission away rather than queueing it behind every other render
+            REJECTED.labels("overloaded").inc()
+            await self._send_error(interaction, OVERLOADED_MESSAGE)
+        except UnsupportedCharacters as e:
+            await self._send_error(interaction, f"❌ {e}")
         except FileNotFoundError as e:
-            await interaction.response.send_message(
-                f"❌ Error: Template not found for {document_type}. Please contact the bot administrator.",
-                ephemeral=True
+            ERRORS.labels("form", type(e).__name__).inc()
+            await self._send_error(
+                interaction, f"❌ Error: Template not found for {document_type}. Please contact the bot administrator."
             )
         except Exception as e:
-            await interaction.response.send_message(
-                f"❌ Error generating document: {str(e)}",
-                ephemeral=True
-            )
+            ERRORS.labels("form", type(e).__name__).inc()
+            await self._send_error(interaction, f"❌ Error generating document: {str(e)}")
+        finally:
+            # Clean up form data whether or not generation succeeded
+            self.active_forms.pop(interaction.guild_id, interaction.user.id)
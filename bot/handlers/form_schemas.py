@@ -0,0 +1,151 @@
+"""Declarative form schemas describing the fields collected for each document type."""
+
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+DEFAULT_CONTACT = "Contact server administrators"
+
+# Pseudo document type that renders every document type from one form
+BUNDLE_TYPE = "bundle"
+
+# Discord modal limits
+MAX_MODAL_FIELDS = 5
+MAX_TITLE_LENGTH = 45
+MAX_LABEL_LENGTH = 45
+MAX_INPUT_LENGTH = 4000
+
+
+class FormField(NamedTuple):
+    """A single modal input and how its answer maps onto a template variable."""
+    
+    name: str  # Template placeholder filled by this field
+    label: str
+    placeholder: str
+    required: bool = True
+    max_length: int = 500
+    paragraph: bool = False
+    is_list: bool = False  # Split the answer into one list item per line
+    default: Optional[str] = None  # Used when an optional field is left empty
+    
+    def parse(self, raw: str) -> Any:
+        """Convert a submitted answer into a template variable value."""
+        if self.is_list:
+            return [line.strip() for line in raw.split("\n") if line.strip()]
+        if not raw and self.default is not None:
+            return self.default
+        return raw
+
+
+class FormSchema(NamedTuple):
+    """The form shown for a document type."""
+    
+    document_type: str
+    title: str
+    fields: Tuple[FormField, ...]
+    
+    def parse(self, values: Dict[str, str]) -> Dict[str, Any]:
+        """Convert submitted answers (field name -> raw text) into template variables."""
+        return {field.name: field.parse(values.get(field.name, "")) for field in self.fields}
+    
+    def validate(self, placeholders: Iterable[str]):
+        """
+        Check the schema against Discord's modal limits and the template's placeholders.
+        
+        Raises:
+            ValueError: If the schema cannot be shown or fills a placeholder the template doesn't have
+        """
+        if len(self.fields) > MAX_MODAL_FIELDS:
+            raise ValueError(f"{self.document_type}: modals can have at most {MAX_MODAL_FIELDS} fields")
+        if len(self.title) > MAX_TITLE_LENGTH:
+            raise ValueError(f"{self.document_type}: title is longer than {MAX_TITLE_LENGTH} characters")
+        
+        names = [field.name for field in self.fields]
+        if len(set(names)) != len(names):
+            raise ValueError(f"{self.document_type}: duplicate field names")
+        
+        for field in self.fields:
+            if len(field.label) > MAX_LABEL_LENGTH:
+                raise ValueError(f"{self.document_type}.{field.name}: label is longer than {MAX_LABEL_LENGTH} characters")
+            if not 0 < field.max_length <= MAX_INPUT_LENGTH:
+                raise ValueError(f"{self.document_type}.{field.name}: max_length must be between 1 and {MAX_INPUT_LENGTH}")
+        
+        unknown = set(names) - set(placeholders)
+        if unknown:
+            raise ValueError(
+                f"{self.document_type}: template has no placeholder for field(s) {', '.join(sorted(unknown))}"
+            )
+
+
+SERVER_NAME = FormField("server_name", "Server Name", "Enter your server name", max_length=100)
+
+
+def contact_field(name: str = "contact_info", label: str = "Contact Information",
+                  placeholder: str = "Email or Discord username") -> FormField:
+    """Optional contact field that falls back to the server administrators."""
+    return FormField(name, label, placeholder, required=False, max_length=200, default=DEFAULT_CONTACT)
+
+
+FORM_SCHEMAS: Dict[str, FormSchema] = {
+    "rules": FormSchema("rules", "Generate Server Rules", (
+        SERVER_NAME,
+        contact_field(placeholder="Email or Discord username for contact"),
+        FormField("rules", "Rules (one per line)", "Rule 1\nRule 2\nRule 3",
+                  max_length=2000, paragraph=True, is_list=True),
+        FormField("consequences", "Consequences for Violations", "e.g., Warning → Mute → Ban",
+                  required=False, paragraph=True,
+                  default="Violations may result in warnings, mutes, or bans at staff discretion."),
+    )),
+    "privacy_policy": FormSchema("privacy_policy", "Generate Privacy Policy", (
+        SERVER_NAME,
+        contact_field("contact_email", "Contact Email", "privacy@example.com"),
+        FormField("data_collected", "Data Collected (one per line)", "Discord username\nMessages\nUser IDs",
+                  max_length=1000, paragraph=True, is_list=True),
+        FormField("data_usage", "How Data is Used", "Describe how collected data is used",
+                  max_length=1000, paragraph=True),
+    )),
+    "terms_of_service": FormSchema("terms_of_service", "Generate Terms of Service", (
+        SERVER_NAME,
+        contact_field(),
+        FormField("prohibited_activities", "Prohibited Activities (one per line)", "Harassment\nSpam\nNSFW content",
+                  max_length=1500, paragraph=True, is_list=True),
+        FormField("user_obligations", "User Obligations", "Describe user responsibilities",
+                  max_length=1000, paragraph=True),
+    )),
+    "code_of_conduct": FormSchema("code_of_conduct", "Generate Code of Conduct", (
+        SERVER_NAME,
+        FormField("expected_behavior", "Expected Behavior (one per line)",
+                  "Be respectful\nBe inclusive\nFollow Discord ToS",
+                  max_length=1500, paragraph=True, is_list=True),
+        FormField("reporting_process", "Reporting Process", "How to report violations", paragraph=True),
+        contact_field(),
+    )),
+    "staff_sops": FormSchema("staff_sops", "Generate Staff SOPs", (
+        SERVER_NAME,
+        FormField("staff_roles", "Staff Roles (one per line)", "Administrator\nModerator\nSupport Staff",
+                  paragraph=True, is_list=True),
+        FormField("procedures", "Key Procedures (one per line)", "Handling reports\nEscalation process\nBan appeals",
+                  max_length=1500, paragraph=True, is_list=True),
+        FormField("escalation_path", "Escalation Path", "Describe the escalation process", paragraph=True),
+    )),
+    "moderation_guidelines": FormSchema("moderation_guidelines", "Generate Moderation Guidelines", (
+        SERVER_NAME,
+        FormField("moderation_actions", "Moderation Actions (one per line)", "Warning\nMute\nKick\nBan",
+                  paragraph=True, is_list=True),
+        FormField("warning_system", "Warning System", "Describe the warning system", paragraph=True),
+        FormField("ban_criteria", "Ban Criteria", "Describe when bans are issued", paragraph=True),
+    )),
+    "appeal_process": FormSchema("appeal_process", "Generate Appeal Process", (
+        SERVER_NAME,
+        FormField("appeal_requirements", "Appeal Requirements", "What information is needed for appeals",
+                  paragraph=True),
+        FormField("review_process", "Review Process", "How appeals are reviewed", paragraph=True),
+        FormField("timelines", "Timelines", "Response time, review duration, etc.", paragraph=True),
+        contact_field(placeholder="How to submit appeals"),
+    )),
+}
+
+# Shared fields collected once and used for every document in a bundle
+BUNDLE_SCHEMA = FormSchema(BUNDLE_TYPE, "Generate Compliance Bundle", (
+    SERVER_NAME,
+    contact_field(),
+    contact_field("contact_email", "Contact Email", "privacy@example.com"),
+))
@@ -0,0 +1,337 @@
+"""Content-addressed SQLite store of every document a guild generates."""
+
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # Optional; zlib is used instead
+    zstandard = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS compression_dictionaries (
+    id INTEGER PRIMARY KEY,
+    document_type TEXT NOT NULL,
+    hash BLOB NOT NULL UNIQUE,
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS document_blobs (
+    hash BLOB PRIMARY KEY,
+    codec TEXT NOT NULL,
+    dictionary_id INTEGER REFERENCES compression_dictionaries (id),
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS document_versions (
+    guild_id INTEGER NOT NULL,
+    document_type TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    hash BLOB NOT NULL,
+    created_by INTEGER,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, document_type, version)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS form_answers (
+    guild_id INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    document_type TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, digest)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS form_answers_updated_at ON form_answers (updated_at);
+"""
+
+ZSTD_LEVEL = 10
+
+# Seconds between sweeps that delete expired form answers
+PURGE_INTERVAL = 3600
+ZLIB_LEVEL = 9
+
+
+def _zstd_dictionary(dictionary: bytes):
+    return zstandard.ZstdCompressionDict(dictionary, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+
+
+def compress(data: bytes, dictionary: bytes = b"") -> Tuple[str, bytes]:
+    """
+    Compress a document with zstd if it's installed, otherwise zlib. Returns (codec, compressed).
+    
+    Text shared with `dictionary` (a similar document) compresses to a few bytes.
+    """
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL, dict_data=_zstd_dictionary(dictionary) if dictionary else None
+        )
+        return "zstd", compressor.compress(data)
+    compressor = zlib.compressobj(ZLIB_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(ZLIB_LEVEL)
+    return "zlib", compressor.compress(data) + compressor.flush()
+
+
+def decompress(codec: str, data: bytes, dictionary: bytes = b"") -> bytes:
+    """
+    Decompress a stored document with the dictionary it was compressed with.
+    
+    Raises:
+        RuntimeError: If the document was stored with zstd and zstandard isn't installed
+    """
+    if codec == "zlib":
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This document was compressed with zstd; install the zstandard package to read it")
+        decompressor = zstandard.ZstdDecompressor(dict_data=_zstd_dictionary(dictionary) if dictionary else None)
+        return decompressor.decompress(data)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+class HistoryEntry(NamedTuple):
+    """One recorded version of a guild's document."""
+    
+    version: int
+    hash: str  # SHA-256 of the document, hex
+    size: int  # Uncompressed size in bytes
+    created_by: Optional[int]
+    created_at: float
+
+
+class DocumentHistory:
+    """
+    Every generated document, versioned per (guild_id, document_type).
+    
+    Documents are stored once per SHA-256 hash as compressed blobs; versions
+    are rows in a separate index pointing at a blob. Each type's shipped
+    template, from `dictionary_source`, is its compression dictionary, so the
+    template text every document shares costs almost nothing to store. Regenerating a document
+    identical to the latest version records nothing, and returning to any
+    earlier content only adds an index row. Listing walks the index's primary
+    key newest-first, so it costs the same however many versions a guild has.
+    """
+    
+    def __init__(self, path: str, answers_ttl: float = 0,
+                 dictionary_source: Optional[Callable[[str], Optional[bytes]]] = None):
+        self.path = path
+        self.answers_ttl = answers_ttl  # Seconds form answers are kept; 0 keeps none
+        self.dictionary_source = dictionary_source  # document_type -> dictionary bytes, or None for no dictionary
+        self._last_purge = 0.0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._dictionaries: Dict[int, bytes] = {}  # Loaded on first use; never change once written
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+    
+    def _dictionary(self, dictionary_id: Optional[int]) -> bytes:
+        """Get a compression dictionary by id. Call with the lock held."""
+        if dictionary_id is None:
+            return b""
+        dictionary = self._dictionaries.get(dictionary_id)
+        if dictionary is None:
+            (dictionary,) = self._connection.execute(
+                "SELECT data FROM compression_dictionaries WHERE id = ?", (dictionary_id,)
+            ).fetchone()
+            self._dictionaries[dictionary_id] = dictionary
+        return dictionary
+    
+    def _dictionary_for(self, document_type: str) -> Tuple[Optional[int], bytes]:
+        """
+        Get the dictionary new documents of a type are compressed with. Call with the lock held.
+        
+        The dictionary comes from `dictionary_source` (the shipped template), so
+        it's the same for every guild. A changed template gets a new row; blobs
+        keep pointing at the dictionary they were compressed with.
+        """
+        dictionary = self.dictionary_source(document_type) if self.dictionary_source is not None else None
+        if not dictionary:
+            return None, b""
+        
+        # Not cached: this only runs for content the store hasn't seen, and an
+        # id inserted here is gone again if the transaction rolls back
+        digest = hashlib.sha256(dictionary).digest()
+        row = self._connection.execute(
+            "SELECT id FROM compression_dictionaries WHERE hash = ?", (digest,)
+        ).fetchone()
+        if row is not None:
+            return row[0], dictionary
+        cursor = self._connection.execute(
+            "INSERT INTO compression_dictionaries (document_type, hash, data) VALUES (?, ?, ?)",
+            (document_type, digest, dictionary)
+        )
+        return cursor.lastrowid, dictionary
+    
+    def record(self, guild_id: int, document_type: str, data: bytes,
+               created_by: Optional[int] = None) -> Tuple[int, bool]:
+        """
+        Record a generated document as the newest version.
+        
+        Returns:
+            (version, created): the new version, or the latest one if it already has this content
+        """
+        return self.record_many(guild_id, [(document_type, data)], created_by)[0]
+    
+    def record_many(self, guild_id: int, documents: Iterable[Tuple[str, bytes]],
+                    created_by: Optional[int] = None) -> List[Tuple[int, bool]]:
+        """Record several (document_type, data) documents in one transaction."""
+        documents = [(document_type, data, hashlib.sha256(data).digest()) for document_type, data in documents]
+        now = time.time()
+        results = []
+        with self._lock, self._connection:
+            for document_type, data, digest in documents:
+                latest = self._connection.execute(
+                    "SELECT version, hash FROM document_versions WHERE guild_id = ? AND document_type = ? "
+                    "ORDER BY version DESC LIMIT 1",
+                    (guild_id, document_type)
+                ).fetchone()
+                if latest is not None and latest[1] == digest:
+                    results.append((latest[0], False))
+                    continue
+                
+                # Only compress content the store hasn't seen before
+                exists = self._connection.execute(
+                    "SELECT 1 FROM document_blobs WHERE hash = ?", (digest,)
+                ).fetchone()
+                if exists is None:
+                    dictionary_id, dictionary = self._dictionary_for(document_type)
+                    codec, compressed = compress(data, dictionary)
+                    self._connection.execute(
+                        "INSERT INTO document_blobs (hash, codec, dictionary_id, size, data) VALUES (?, ?, ?, ?, ?)",
+                        (digest, codec, dictionary_id, len(data), compressed)
+                    )
+                
+                version = latest[0] + 1 if latest is not None else 1
+                self._connection.execute(
+                    "INSERT INTO document_versions (guild_id, document_type, version, hash, created_by, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (guild_id, document_type, version, digest, created_by, now)
+                )
+                results.append((version, True))
+        return results
+    
+    def save_answers(self, guild_id: int, digest: str, document_type: str, answers: Dict[str, Any]):
+        """
+        Keep the raw form answers a document was generated from, under a digest of them, for `answers_ttl` seconds.
+        
+        Submitting the same answers again restarts their time. Expired answers
+        are deleted now and then as part of a save.
+        """
+        if self.answers_ttl <= 0:
+            return
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO form_answers (guild_id, digest, document_type, answers, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (guild_id, digest) DO UPDATE SET updated_at = excluded.updated_at",
+                (guild_id, digest, document_type, json.dumps(answers, ensure_ascii=False), now)
+            )
+            if now - self._last_purge >= PURGE_INTERVAL:
+                self._connection.execute("DELETE FROM form_answers WHERE updated_at <= ?", (now - self.answers_ttl,))
+                self._last_purge = now
+    
+    def get_answers(self, guild_id: int, digest: str, document_type: str) -> Optional[Dict[str, Any]]:
+        """Get unexpired answers kept by save_answers(), or None if this guild has none under that digest."""
+        if self.answers_ttl <= 0:
+            return None
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT answers FROM form_answers "
+                "WHERE guild_id = ? AND digest = ? AND document_type = ? AND updated_at > ?",
+                (guild_id, digest, document_type, time.time() - self.answers_ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+    
+    def list_versions(self, guild_id: int, document_type: str, limit: int = 10,
+                      before: Optional[int] = None) -> List[HistoryEntry]:
+        """Get up to `limit` versions, newest first, optionally only those older than version `before`."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT v.version, v.hash, b.size, v.created_by, v.created_at FROM document_versions v "
+                "JOIN document_blobs b ON b.hash = v.hash "
+                "WHERE v.guild_id = ? AND v.document_type = ? AND v.version < ? "
+                "ORDER BY v.version DESC LIMIT ?",
+                (guild_id, document_type, before if before is not None else 2 ** 62, limit)
+            ).fetchall()
+        return [HistoryEntry(version, digest.hex(), size, created_by, created_at)
+                for version, digest, size, created_by, created_at in rows]
+    
+    def latest_version(self, guild_id: int, document_type: str) -> int:
+        """Get the newest version number, or 0 if nothing has been recorded."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT MAX(version) FROM document_versions WHERE guild_id = ? AND document_type = ?",
+                (guild_id, document_type)
+            ).fetchone()
+        return row[0] or 0
+    
+    def get(self, guild_id: int, document_type: str, version: Optional[int] = None) -> Optional[bytes]:
+        """Get a version's content (the latest if `version` is None), or None if there is no such version."""
+        with self._lock:
+            if version is None:
+                row = self._connection.execute(
+                    "SELECT b.codec, b.dictionary_id, b.data FROM document_versions v "
+                    "JOIN document_blobs b ON b.hash = v.hash "
+                    "WHERE v.guild_id = ? AND v.document_type = ? ORDER BY v.version DESC LIMIT 1",
+                    (guild_id, document_type)
+                ).fetchone()
+            else:
+                row = self._connection.execute(
+                    "SELECT b.codec, b.dictionary_id, b.data FROM document_versions v "
+                    "JOIN document_blobs b ON b.hash = v.hash "
+                    "WHERE v.guild_id = ? AND v.document_type = ? AND v.version = ?",
+                    (guild_id, document_type, version)
+                ).fetchone()
+            if row is None:
+                return None
+            codec, dictionary_id, data = row
+            dictionary = self._dictionary(dictionary_id)
+        return decompress(codec, data, dictionary)
+    
+    def diff(self, guild_id: int, document_type: str, old_version: int, new_version: int,
+             context: int = 3) -> Optional[str]:
+        """
+        Get a unified diff between two versions.
+        
+        Returns:
+            The diff ("" if the versions are identical), or None if either version doesn't exist
+        """
+        old = self.get(guild_id, document_type, old_version)
+        new = self.get(guild_id, document_type, new_version)
+        if old is None or new is None:
+            return None
+        if old == new:
+            return ""
+        return "".join(difflib.unified_diff(
+            old.decode("utf-8").splitlines(keepends=True),
+            new.decode("utf-8").splitlines(keepends=True),
+            fromfile=f"{document_type} v{old_version}",
+            tofile=f"{document_type} v{new_version}",
+            n=context
+        ))
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get version and blob counts and stored bytes before and after compression."""
+        with self._lock:
+            (versions,) = self._connection.execute("SELECT COUNT(*) FROM document_versions").fetchone()
+            blobs, raw, stored = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM document_blobs"
+            ).fetchone()
+        return {"versions": versions, "blobs": blobs, "raw_bytes": raw, "stored_bytes": stored}
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,72 @@
+"""Cache of static response embeds, built once and served pre-serialized."""
+
+import logging
+from typing import Any, Callable, Dict, Tuple
+import discord
+from bot.handlers.document_types import DocumentTypeRegistry
+from bot.handlers.template_cache import TemplateCache
+
+logger = logging.getLogger(__name__)
+
+
+class StaticEmbed(discord.Embed):
+    """
+    An embed whose serialized form is computed once.
+    
+    discord.py calls `to_dict()` on every send; this returns the cached payload
+    instead of walking the embed's fields again. Don't modify a StaticEmbed after
+    creating it.
+    """
+    
+    __slots__ = ("_payload",)
+    
+    @classmethod
+    def freeze(cls, embed: discord.Embed) -> "StaticEmbed":
+        """Serialize an embed once and wrap the result."""
+        payload = embed.to_dict()
+        frozen = cls.from_dict(payload)
+        frozen._payload = payload
+        return frozen
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return self._payload
+
+
+class PayloadCache:
+    """
+    Static embeds that depend only on the document-type registry and template set.
+    
+    Each payload is built by its registered builder on first use and rebuilt only
+    after the registry's revision or the template cache's generation changes.
+    """
+    
+    def __init__(self, registry: DocumentTypeRegistry, templates: TemplateCache):
+        self.registry = registry
+        self.templates = templates
+        self.builds = 0
+        self._builders: Dict[str, Callable[[], discord.Embed]] = {}
+        self._payloads: Dict[str, StaticEmbed] = {}
+        self._key: Tuple[int, int] = self._current_key()
+    
+    def _current_key(self) -> Tuple[int, int]:
+        return (self.registry.revision, self.templates.generation)
+    
+    def register(self, name: str, builder: Callable[[], discord.Embed]):
+        """Register (or replace) the builder for a payload."""
+        self._builders[name] = builder
+        self._payloads.pop(name, None)
+    
+    def get(self, name: str) -> StaticEmbed:
+        """Get a payload, rebuilding it if its inputs changed."""
+        key = self._current_key()
+        if key != self._key:
+            self._payloads.clear()
+            self._key = key
+        
+        payload = self._payloads.get(name)
+        if payload is None:
+            payload = StaticEmbed.freeze(self._builders[name]())
+            self._payloads[name] = payload
+            self.builds += 1
+            logger.debug(f"Built {name} payload")
+        return payload
@@ -0,0 +1,132 @@
+"""SQLite store of documents published to guild channels, so they can be updated in place."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS publications (
+    guild_id INTEGER NOT NULL,
+    document_type TEXT NOT NULL,
+    channel_id INTEGER NOT NULL,
+    message_ids TEXT NOT NULL,
+    chunk_hashes TEXT NOT NULL,
+    variables TEXT NOT NULL,
+    published_by INTEGER,
+    published_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, document_type, channel_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS publications_by_type ON publications (document_type, guild_id);
+"""
+
+COLUMNS = "guild_id, document_type, channel_id, message_ids, chunk_hashes, variables, published_by, published_at"
+
+
+class Publication(NamedTuple):
+    """A document posted to a channel as one or more messages."""
+    
+    guild_id: int
+    document_type: str
+    channel_id: int
+    message_ids: List[int]  # In posting order
+    chunk_hashes: List[str]  # SHA-256 of each message's content, to skip unchanged messages on update
+    variables: Dict[str, Any]  # Answers the document was rendered from
+    published_by: Optional[int] = None
+    published_at: float = 0.0
+
+
+def _publication(row) -> Publication:
+    guild_id, document_type, channel_id, message_ids, chunk_hashes, variables, published_by, published_at = row
+    return Publication(
+        guild_id, document_type, channel_id, json.loads(message_ids), json.loads(chunk_hashes),
+        json.loads(variables), published_by, published_at
+    )
+
+
+class PublicationStore:
+    """Published documents keyed by (guild_id, document_type, channel_id), indexed by document type."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+    
+    def get(self, guild_id: int, document_type: str, channel_id: int) -> Optional[Publication]:
+        """Get a publication, or None if the document isn't published in that channel."""
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {COLUMNS} FROM publications WHERE guild_id = ? AND document_type = ? AND channel_id = ?",
+                (guild_id, document_type, channel_id)
+            ).fetchone()
+        return _publication(row) if row is not None else None
+    
+    def list_guild(self, guild_id: int, document_type: Optional[str] = None) -> List[Publication]:
+        """Get a guild's publications, optionally of one document type."""
+        query = f"SELECT {COLUMNS} FROM publications WHERE guild_id = ?"
+        params = [guild_id]
+        if document_type is not None:
+            query += " AND document_type = ?"
+            params.append(document_type)
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [_publication(row) for row in rows]
+    
+    def list_document_type(self, document_type: str, guild_ids: Optional[Iterable[int]] = None) -> List[Publication]:
+        """Get every publication of a document type, optionally only in some guilds."""
+        with self._lock:
+            if guild_ids is None:
+                rows = self._connection.execute(
+                    f"SELECT {COLUMNS} FROM publications WHERE document_type = ?", (document_type,)
+                ).fetchall()
+            else:
+                rows = []
+                for guild_id in guild_ids:
+                    rows.extend(self._connection.execute(
+                        f"SELECT {COLUMNS} FROM publications WHERE document_type = ? AND guild_id = ?",
+                        (document_type, guild_id)
+                    ).fetchall())
+        return [_publication(row) for row in rows]
+    
+    def save(self, publication: Publication):
+        """Store a publication, replacing any earlier one of the same document in the same channel."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO publications ({COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    publication.guild_id, publication.document_type, publication.channel_id,
+                    json.dumps(publication.message_ids), json.dumps(publication.chunk_hashes),
+                    json.dumps(publication.variables, ensure_ascii=False, default=str),
+                    publication.published_by, publication.published_at or time.time()
+                )
+            )
+    
+    def delete(self, guild_id: int, document_type: str, channel_id: int) -> bool:
+        """Forget a publication. Returns False if there was none."""
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM publications WHERE guild_id = ? AND document_type = ? AND channel_id = ?",
+                (guild_id, document_type, channel_id)
+            )
+        return cursor.rowcount > 0
+    
+    def count(self) -> int:
+        """Get the number of publications."""
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM publications").fetchone()
+        return count
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,387 @@
+"""Rate-limit-aware scheduler for Discord REST calls, with per-route buckets and an injectable sender."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Mapping, NamedTuple, Optional, Tuple
+import discord
+from bot.handlers.rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Give up on a request after this many rate-limited or unavailable responses
+MAX_RETRIES = 5
+
+# Added to every reset time to absorb clock skew between Discord and the bot
+RESET_MARGIN = 0.05
+
+# Statuses worth retrying after a short wait
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Idle buckets are pruned once more than this many are tracked
+MAX_BUCKETS = 10000
+
+# Key of the single bucket in the global limiter
+GLOBAL_KEY = "global"
+
+
+class APIRequest(NamedTuple):
+    """A REST call: method, route template, route parameters and JSON body."""
+    
+    method: str
+    route: str  # e.g. "/channels/{channel_id}/messages"
+    params: Dict[str, Any]
+    payload: Optional[Dict[str, Any]] = None
+    
+    @property
+    def path(self) -> str:
+        return self.route.format(**self.params)
+    
+    @property
+    def major(self) -> Any:
+        """The route parameter Discord keeps separate limits for (channel, guild or webhook)."""
+        params = self.params
+        return params.get("channel_id") or params.get("guild_id") or params.get("webhook_id")
+    
+    @property
+    def route_key(self) -> Tuple[str, str, Any]:
+        """Requests with the same key share a queue and are sent in order."""
+        return (self.method, self.route, self.major)
+
+
+class APIResponse(NamedTuple):
+    """A REST response; header names are lower-case."""
+    
+    status: int
+    headers: Mapping[str, str]
+    data: Any
+    
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+
+Sender = Callable[[APIRequest], Awaitable[APIResponse]]
+
+
+class HTTPSender:
+    """
+    Sends requests through the bot's discord.py HTTP client.
+    
+    They share the client's session, User-Agent and rate-limit state, so
+    publishing waits behind the same buckets and global lock as everything
+    else the bot sends. The client retries 429s itself; errors it raises are
+    turned back into responses for the scheduler.
+    """
+    
+    def __init__(self, http: discord.http.HTTPClient):
+        self.http = http
+    
+    async def __call__(self, request: APIRequest) -> APIResponse:
+        route = discord.http.Route(request.method, request.route, **request.params)
+        # The client sends a JSON body whenever `json` is passed at all, even for None
+        kwargs = {"json": request.payload} if request.payload is not None else {}
+        try:
+            data = await self.http.request(route, **kwargs)
+        except discord.RateLimited as e:
+            # Only raised when the wait would exceed the client's max_ratelimit_timeout
+            return APIResponse(429, {"retry-after": str(e.retry_after)}, {"retry_after": e.retry_after})
+        except discord.HTTPException as e:
+            headers = {name.lower(): value for name, value in e.response.headers.items()}
+            return APIResponse(e.status, headers, {"code": e.code, "message": e.text})
+        return APIResponse(200, {}, data)
+
+
+class RouteBucket:
+    """What Discord last said about a rate-limit bucket."""
+    
+    __slots__ = ("limit", "remaining", "reset_at")
+    
+    def __init__(self):
+        # Until the first response arrives, send one request at a time
+        self.limit = 1
+        self.remaining = 1
+        self.reset_at = 0.0
+
+
+class _Operation:
+    """A queued request and the future its response is delivered to."""
+    
+    __slots__ = ("request", "future")
+    
+    def __init__(self, request: APIRequest, future: "asyncio.Future[APIResponse]"):
+        self.request = request
+        self.future = future
+
+
+class SchedulerStats:
+    """Counters for a PublishScheduler."""
+    
+    __slots__ = ("submitted", "sent", "rate_limited", "retried", "coalesced", "failed", "wait_seconds")
+    
+    def __init__(self):
+        self.submitted = 0
+        self.sent = 0
+        self.rate_limited = 0  # 429 responses, which proactive limiting should keep at zero
+        self.retried = 0
+        self.coalesced = 0  # Edits folded into an edit of the same message that was still queued
+        self.failed = 0
+        self.wait_seconds = 0.0  # Time spent waiting for buckets to reset
+
+
+class PublishScheduler:
+    """
+    Queues Discord REST calls and sends them without tripping rate limits.
+    
+    Requests are queued per route and major parameter (so per channel for
+    message routes) and each queue is sent in order, one request at a time.
+    Queues for different channels run concurrently, so publishing to many
+    guilds at once is spread over every channel's bucket, up to `concurrency`
+    requests in flight and `global_limit` requests per second overall.
+    
+    Bucket state comes from Discord's `X-RateLimit-*` headers: a bucket with
+    no requests left waits for its reset instead of sending and getting a
+    429. Routes that share a bucket (per `X-RateLimit-Bucket`) share its
+    state. 429s that still happen are retried after `Retry-After`, and a
+    global 429 pauses every queue.
+    
+    An edit to a message that is still waiting in the queue is replaced by
+    the newer one rather than sent twice.
+    """
+    
+    def __init__(self, sender: Sender, concurrency: int = 8, global_limit: float = 40,
+                 clock: Callable[[], float] = time.monotonic):
+        self.sender = sender
+        self.concurrency = max(1, concurrency)
+        self._clock = clock
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._global = RateLimiter(max(1, int(global_limit)), 1.0, clock=clock) if global_limit > 0 else None
+        self._global_reset_at = 0.0  # Set by a global 429
+        
+        self._bucket_names: Dict[Tuple[str, str], Hashable] = {}  # (method, route) -> X-RateLimit-Bucket
+        self._discovering: Dict[Tuple[str, str], asyncio.Event] = {}  # Routes with a first request in flight
+        self._buckets: Dict[Tuple[Hashable, Any], RouteBucket] = {}  # (bucket name, major) -> state
+        self._queues: Dict[Tuple[str, str, Any], Deque[_Operation]] = {}
+        self._workers: Dict[Tuple[str, str, Any], "asyncio.Task[None]"] = {}
+        self._queued_edits: Dict[str, _Operation] = {}  # path -> PATCH not yet sent
+        self.stats = SchedulerStats()
+    
+    @property
+    def pending(self) -> int:
+        """Requests queued or in flight."""
+        return sum(len(queue) for queue in self._queues.values())
+    
+    def submit(self, request: APIRequest) -> "asyncio.Future[APIResponse]":
+        """Queue a request behind earlier ones on the same route and get a future for its response."""
+        self.stats.submitted += 1
+        if request.method == "PATCH":
+            queued = self._queued_edits.get(request.path)
+            if queued is not None:
+                # Only the newest content matters; both callers get its response
+                queued.request = request
+                self.stats.coalesced += 1
+                return queued.future
+        
+        operation = _Operation(request, asyncio.get_running_loop().create_future())
+        if request.method == "PATCH":
+            self._queued_edits[request.path] = operation
+        
+        key = request.route_key
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._workers[key] = asyncio.create_task(self._drain(key, queue))
+        queue.append(operation)
+        return operation.future
+    
+    async def request(self, request: APIRequest) -> APIResponse:
+        """Queue a request and wait for its response."""
+        return await self.submit(request)
+    
+    async def join(self):
+        """Wait until every queued request has been sent."""
+        while self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+    
+    async def _drain(self, key: Tuple[str, str, Any], queue: Deque[_Operation]):
+        """Send a route's queued requests in order until the queue is empty."""
+        try:
+            while queue:
+                operation = queue[0]
+                if self._queued_edits.get(operation.request.path) is operation:
+                    del self._queued_edits[operation.request.path]
+                if operation.future.cancelled():
+                    queue.popleft()
+                    continue
+                
+                try:
+                    response = await self._send(operation.request)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.stats.failed += 1
+                    queue.popleft()
+                    if not operation.future.done():
+                        operation.future.set_exception(e)
+                    continue
+                
+                queue.popleft()
+                if not response.ok:
+                    self.stats.failed += 1
+                if not operation.future.done():
+                    operation.future.set_result(response)
+        finally:
+            del self._queues[key]
+            del self._workers[key]
+            for operation in queue:
+                if not operation.future.done():
+                    operation.future.cancel()
+            if len(self._buckets) > MAX_BUCKETS:
+                self._prune_buckets()
+    
+    def _bucket(self, request: APIRequest) -> RouteBucket:
+        """Get the state of the bucket a request is limited by."""
+        name = self._bucket_names.get((request.method, request.route), (request.method, request.route))
+        key = (name, request.major)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = RouteBucket()
+        return bucket
+    
+    async def _wait_for_bucket(self, request: APIRequest) -> RouteBucket:
+        """Wait until a request's bucket has a request left and take it."""
+        while True:
+            bucket = self._bucket(request)
+            now = self._clock()
+            if bucket.remaining <= 0 and now >= bucket.reset_at:
+                bucket.remaining = bucket.limit
+            if bucket.remaining > 0:
+                bucket.remaining -= 1
+                return bucket
+            delay = bucket.reset_at - now
+            self.stats.wait_seconds += delay
+            await asyncio.sleep(delay)
+    
+    async def _wait_for_global(self):
+        """Wait for the global limit, including any pause a global 429 asked for."""
+        while True:
+            now = self._clock()
+            delay = self._global_reset_at - now
+            if self._global is not None:
+                delay = max(delay, self._global.retry_after(GLOBAL_KEY))
+            if delay <= 0:
+                if self._global is not None:
+                    self._global.consume(GLOBAL_KEY)
+                return
+            await asyncio.sleep(delay)
+    
+    async def _discover(self, request: APIRequest) -> Optional[asyncio.Event]:
+        """
+        Hold a request while another one on its route finds out which bucket the route is in.
+        
+        Returns an event to set once the response arrives if this request is
+        the one finding out, so the first burst on a route can't overrun a
+        bucket it shares with routes already in use.
+        """
+        route = (request.method, request.route)
+        while route not in self._bucket_names:
+            discovery = self._discovering.get(route)
+            if discovery is None:
+                discovery = self._discovering[route] = asyncio.Event()
+                return discovery
+            await discovery.wait()
+        return None
+    
+    async def _send(self, request: APIRequest) -> APIResponse:
+        """Send a request once its buckets allow it, retrying 429s and transient server errors."""
+        retries = 0
+        while True:
+            discovery = await self._discover(request)
+            try:
+                bucket = await self._wait_for_bucket(request)
+                await self._wait_for_global()
+                async with self._slots:
+                    response = await self.sender(request)
+                self.stats.sent += 1
+                bucket = self._update_bucket(request, bucket, response.headers)
+            finally:
+                if discovery is not None:
+                    del self._discovering[(request.method, request.route)]
+                    discovery.set()
+            
+            if response.status == 429:
+                self.stats.rate_limited += 1
+                data = response.data if isinstance(response.data, dict) else {}
+                retry_after = float(response.headers.get("retry-after") or data.get("retry_after") or 1)
+                if data.get("global") or response.headers.get("x-ratelimit-global"):
+                    # Every queue pauses, so this says nothing about the request itself; retry it however often it takes
+                    now = self._clock()
+                    if self._global_reset_at <= now:
+                        logger.warning(f"Hit the global rate limit; pausing requests for {retry_after:.2f}s")
+                    self._global_reset_at = max(self._global_reset_at, now + retry_after)
+                    self.stats.retried += 1
+                    continue
+                bucket.remaining = 0
+                bucket.reset_at = max(bucket.reset_at, self._clock() + retry_after + RESET_MARGIN)
+            elif response.status in RETRY_STATUSES:
+                await asyncio.sleep(retries + 1)
+            else:
+                return response
+            
+            if retries == MAX_RETRIES:
+                logger.warning(f"Giving up on {request.method} {request.path} after {MAX_RETRIES} retries")
+                return response
+            retries += 1
+            self.stats.retried += 1
+    
+    def _update_bucket(self, request: APIRequest, bucket: RouteBucket, headers: Mapping[str, str]) -> RouteBucket:
+        """Record a response's rate-limit headers, moving the route to its named bucket once Discord names it."""
+        route = (request.method, request.route)
+        name = headers.get("x-ratelimit-bucket")
+        if name is not None:
+            if self._bucket_names.get(route) != name:
+                self._buckets.pop((route, request.major), None)
+                self._bucket_names[route] = name
+                bucket = self._buckets.setdefault((name, request.major), bucket)
+        elif route not in self._bucket_names:
+            self._bucket_names[route] = route  # Unnamed; the route is its own bucket
+        
+        remaining = headers.get("x-ratelimit-remaining")
+        if remaining is not None:
+            bucket.limit = int(headers.get("x-ratelimit-limit", bucket.limit))
+            bucket.remaining = int(remaining)
+            bucket.reset_at = self._clock() + float(headers.get("x-ratelimit-reset-after", 0)) + RESET_MARGIN
+        return bucket
+    
+    def _prune_buckets(self):
+        """Forget buckets that have reset, since a fresh bucket starts from the same state."""
+        now = self._clock()
+        for key in [key for key, bucket in self._buckets.items() if bucket.reset_at <= now]:
+            del self._buckets[key]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request, retry and wait counters."""
+        stats = self.stats
+        return {
+            "pending": self.pending,
+            "routes": len(self._queues),
+            "buckets": len(self._buckets),
+            "submitted": stats.submitted,
+            "sent": stats.sent,
+            "rate_limited": stats.rate_limited,
+            "retried": stats.retried,
+            "coalesced": stats.coalesced,
+            "failed": stats.failed,
+            "wait_seconds": stats.wait_seconds,
+        }
+    
+    async def close(self):
+        """Cancel queued requests and close the sender."""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        close = getattr(self.sender, "close", None)
+        if close is not None:
+            await close()
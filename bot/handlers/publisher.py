@@ -0,0 +1,329 @@
+"""Posts documents into guild channels as message-sized chunks and keeps them up to date."""
+
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from bot.handlers.publication_store import Publication, PublicationStore
+from bot.handlers.publish_scheduler import APIRequest, APIResponse, PublishScheduler
+from bot.handlers.render_executor import RenderedDocument, RenderExecutor, RenderOverloaded
+from bot.handlers.template_engine import HEADING_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Discord's limit on message content, in characters
+MESSAGE_LIMIT = 2000
+
+# Message flag that stops links in a document from unfurling into embeds
+SUPPRESS_EMBEDS = 1 << 2
+
+# Places to break a section that doesn't fit in one message, best first
+BREAKS = ("\n\n", "\n", " ")
+
+MESSAGES_ROUTE = "/channels/{channel_id}/messages"
+MESSAGE_ROUTE = "/channels/{channel_id}/messages/{message_id}"
+
+# Seconds a republish waits before retrying a render the pool turned away
+OVERLOAD_RETRY_DELAY = 1.0
+
+# Discord error codes for a channel or message that no longer exists
+UNKNOWN_CHANNEL = 10003
+UNKNOWN_MESSAGE = 10008
+
+
+def _pieces(text: str, limit: int, breaks: Tuple[str, ...] = BREAKS) -> List[str]:
+    """Split text into pieces of at most `limit` characters at the best break that works."""
+    if len(text) <= limit:
+        return [text]
+    if not breaks:
+        return [text[start:start + limit] for start in range(0, len(text), limit)]
+    separator, rest = breaks[0], breaks[1:]
+    parts = text.split(separator)
+    pieces = []
+    for index, part in enumerate(parts):
+        if index < len(parts) - 1:
+            part += separator
+        pieces.extend(_pieces(part, limit, rest))
+    return pieces
+
+
+def split_sections(markdown: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Split a document into messages of at most `limit` characters.
+    
+    Messages break at markdown headings: whole sections are packed into each
+    message, and a section is only split (at paragraphs, then lines, then
+    words) when it doesn't fit in a message on its own.
+    """
+    starts = [match.start() for match in HEADING_PATTERN.finditer(markdown)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    sections = [markdown[start:end] for start, end in zip(starts, starts[1:] + [len(markdown)])]
+    
+    chunks = []
+    current = ""
+    for section in sections:
+        if current and len(current) + len(section) > limit:
+            chunks.append(current)
+            current = ""
+        for piece in _pieces(section, limit):
+            if current and len(current) + len(piece) > limit:
+                chunks.append(current)
+                current = ""
+            current += piece
+    chunks.append(current)
+    
+    # Discord trims messages and refuses empty ones
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+def chunk_hash(chunk: str) -> str:
+    """Hash a message's content to tell whether an update changes it."""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+def message_payload(content: str) -> Dict[str, Any]:
+    """A message body that never pings anyone mentioned in the document."""
+    return {"content": content, "allowed_mentions": {"parse": []}, "flags": SUPPRESS_EMBEDS}
+
+
+def error_code(response: APIResponse) -> int:
+    """Get the Discord error code of a failed response, or 0."""
+    return response.data.get("code", 0) if isinstance(response.data, dict) else 0
+
+
+class PublishError(RuntimeError):
+    """Raised when Discord refuses to post, edit or delete a published document's messages."""
+    
+    def __init__(self, response: APIResponse):
+        message = response.data.get("message") if isinstance(response.data, dict) else None
+        super().__init__(message or f"HTTP {response.status}")
+        self.status = response.status
+        self.code = error_code(response)
+
+
+class PublishResult(NamedTuple):
+    """What publishing or updating a document did to its messages."""
+    
+    publication: Publication
+    posted: int
+    edited: int
+    deleted: int
+    unchanged: int
+    
+    @property
+    def changed(self) -> bool:
+        return bool(self.posted or self.edited or self.deleted)
+
+
+class RepublishResult(NamedTuple):
+    """Totals for updating every publication of a document type."""
+    
+    publications: int
+    updated: int
+    unchanged: int
+    failed: int
+    removed: int  # Forgotten because their channel no longer exists
+
+
+class Publisher:
+    """
+    Publishes documents to channels and updates them when their template changes.
+    
+    A publication remembers its message ids, a hash of each message and the
+    answers it was rendered from. Publishing again, or republishing after a
+    template update, re-renders the document, edits only the messages whose
+    text changed, posts extra messages if it grew and deletes surplus ones if
+    it shrank. Every request goes through the PublishScheduler, so updating
+    thousands of guilds at once is spread over their channels' rate limits.
+    """
+    
+    def __init__(self, render_executor: RenderExecutor, store: PublicationStore, scheduler: PublishScheduler,
+                 owns_guild: Optional[Callable[[int], bool]] = None, render_concurrency: int = 4):
+        """
+        Args:
+            render_executor: Pool documents are rendered in
+            store: Where publications are kept
+            scheduler: Sends the REST calls
+            owns_guild: Whether this process should republish a guild's documents (cluster workers share the store)
+            render_concurrency: Republish renders in flight at once
+        """
+        self.render_executor = render_executor
+        self.store = store
+        self.scheduler = scheduler
+        self.owns_guild = owns_guild or (lambda guild_id: True)
+        self.render_concurrency = max(1, render_concurrency)
+        self._tasks: Set["asyncio.Task[RepublishResult]"] = set()
+    
+    async def publish(self, guild_id: int, channel_id: int, document_type: str, variables: Dict[str, Any],
+                      published_by: Optional[int] = None) -> PublishResult:
+        """
+        Render a document and post it to a channel, or update it in place if it's already there.
+        
+        Raises:
+            RenderOverloaded: If the render pool is full
+            PublishError: If Discord refuses a request
+        """
+        rendered = await self.render_executor.render(document_type, variables, guild_id)
+        existing = await asyncio.to_thread(self.store.get, guild_id, document_type, channel_id)
+        publication = Publication(guild_id, document_type, channel_id, [], [], variables, published_by, time.time())
+        return await self._update(existing, publication, rendered.text)
+    
+    async def unpublish(self, guild_id: int, document_type: str, channel_id: int) -> bool:
+        """Delete a published document's messages and forget it. Returns False if it wasn't published there."""
+        publication = await asyncio.to_thread(self.store.get, guild_id, document_type, channel_id)
+        if publication is None:
+            return False
+        await self._delete_messages(channel_id, publication.message_ids)
+        await asyncio.to_thread(self.store.delete, guild_id, document_type, channel_id)
+        return True
+    
+    def _request(self, method: str, channel_id: int, message_id: Optional[int] = None,
+                 content: Optional[str] = None) -> "asyncio.Future[APIResponse]":
+        """Queue a message request with the scheduler."""
+        if message_id is None:
+            request = APIRequest(method, MESSAGES_ROUTE, {"channel_id": channel_id}, message_payload(content))
+        else:
+            request = APIRequest(
+                method, MESSAGE_ROUTE, {"channel_id": channel_id, "message_id": message_id},
+                message_payload(content) if content is not None else None
+            )
+        return self.scheduler.submit(request)
+    
+    async def _delete_messages(self, channel_id: int, message_ids: Iterable[int]):
+        """Delete messages, ignoring ones that are already gone."""
+        responses = await asyncio.gather(
+            *(self._request("DELETE", channel_id, message_id) for message_id in message_ids)
+        )
+        for response in responses:
+            if not response.ok and response.status != 404:
+                raise PublishError(response)
+    
+    async def _update(self, existing: Optional[Publication], publication: Publication, text: str) -> PublishResult:
+        """Bring a channel's messages in line with a newly rendered document and store the result."""
+        chunks = split_sections(text)
+        hashes = [chunk_hash(chunk) for chunk in chunks]
+        old_ids = existing.message_ids if existing is not None else []
+        old_hashes = existing.chunk_hashes if existing is not None else []
+        channel_id = publication.channel_id
+        
+        # Queue everything at once; posts share a route, so they're sent (and shown) in order
+        edits: List[Tuple[int, "asyncio.Future[APIResponse]"]] = []
+        posts: List["asyncio.Future[APIResponse]"] = []
+        unchanged = 0
+        for index, chunk in enumerate(chunks):
+            if index >= len(old_ids):
+                posts.append(self._request("POST", channel_id, content=chunk))
+            elif old_hashes[index] == hashes[index]:
+                unchanged += 1
+            else:
+                edits.append((index, self._request("PATCH", channel_id, old_ids[index], chunk)))
+        surplus = old_ids[len(chunks):]
+        deletes = [self._request("DELETE", channel_id, message_id) for message_id in surplus]
+        
+        edit_responses = await asyncio.gather(*(future for _, future in edits))
+        post_responses = await asyncio.gather(*posts)
+        delete_responses = await asyncio.gather(*deletes)
+        posted_ids = [int(response.data["id"]) for response in post_responses if response.ok]
+        
+        failures = [response for response in (*edit_responses, *post_responses) if not response.ok]
+        failures += [response for response in delete_responses if not response.ok and response.status != 404]
+        if failures:
+            if all(error_code(response) == UNKNOWN_MESSAGE for response in failures):
+                # Someone deleted some of the messages; post the whole document again so it stays in order
+                await self._delete_messages(channel_id, [*old_ids[:len(chunks)], *posted_ids])
+                return await self._update(None, publication, text)
+            # Don't leave half a document behind
+            if posted_ids:
+                await asyncio.gather(*(self._request("DELETE", channel_id, message_id) for message_id in posted_ids))
+            raise PublishError(failures[0])
+        
+        publication = publication._replace(message_ids=[*old_ids[:len(chunks)], *posted_ids], chunk_hashes=hashes)
+        await asyncio.to_thread(self.store.save, publication)
+        return PublishResult(publication, len(posted_ids), len(edits), len(surplus), unchanged)
+    
+    async def _render(self, publication: Publication) -> RenderedDocument:
+        """Render a publication's document, waiting for room in the pool rather than giving up."""
+        while True:
+            try:
+                return await self.render_executor.render(
+                    publication.document_type, publication.variables, publication.guild_id
+                )
+            except RenderOverloaded:
+                await asyncio.sleep(OVERLOAD_RETRY_DELAY)
+    
+    async def republish(self, document_type: str, guild_ids: Optional[Iterable[int]] = None) -> RepublishResult:
+        """
+        Re-render and update every publication of a document type, optionally only in some guilds.
+        
+        Renders are limited to `render_concurrency` at a time; the resulting
+        requests for every guild are queued together and the scheduler spreads
+        them over each channel's rate limit.
+        """
+        publications = await asyncio.to_thread(self.store.list_document_type, document_type, guild_ids)
+        publications = [publication for publication in publications if self.owns_guild(publication.guild_id)]
+        renders = asyncio.Semaphore(self.render_concurrency)
+        
+        async def update(publication: Publication) -> PublishResult:
+            async with renders:
+                rendered = await self._render(publication)
+            return await self._update(publication, publication, rendered.text)
+        
+        results = await asyncio.gather(*(update(publication) for publication in publications), return_exceptions=True)
+        updated = unchanged = failed = removed = 0
+        for publication, result in zip(publications, results):
+            if isinstance(result, PublishResult):
+                if result.changed:
+                    updated += 1
+                else:
+                    unchanged += 1
+            elif isinstance(result, PublishError) and result.code == UNKNOWN_CHANNEL:
+                await asyncio.to_thread(
+                    self.store.delete, publication.guild_id, publication.document_type, publication.channel_id
+                )
+                removed += 1
+            else:
+                failed += 1
+                logger.error(
+                    f"Error republishing {document_type} in guild {publication.guild_id} "
+                    f"channel {publication.channel_id}: {result}"
+                )
+        
+        if publications:
+            logger.info(
+                f"Republished {document_type}: {updated} updated, {unchanged} unchanged, "
+                f"{failed} failed, {removed} removed"
+            )
+        return RepublishResult(len(publications), updated, unchanged, failed, removed)
+    
+    def schedule_republish(self, document_type: str,
+                           guild_ids: Optional[Iterable[int]] = None) -> "asyncio.Task[RepublishResult]":
+        """Republish a document type in the background."""
+        task = asyncio.create_task(self.republish(document_type, list(guild_ids) if guild_ids is not None else None))
+        self._tasks.add(task)
+        task.add_done_callback(self._republished)
+        return task
+    
+    def _republished(self, task: "asyncio.Task[RepublishResult]"):
+        """Log a background republish that failed outright."""
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error republishing documents: {task.exception()}")
+    
+    def watch_templates(self, templates, loop: asyncio.AbstractEventLoop):
+        """Republish documents whose built-in template the TemplateCache reloads (not ones it removed)."""
+        def changed(document_types: List[str]):
+            available = set(templates.document_types())
+            for document_type in document_types:
+                if document_type in available:
+                    loop.call_soon_threadsafe(self.schedule_republish, document_type)
+        templates.add_listener(changed)
+    
+    async def close(self):
+        """Cancel background republishes and close the scheduler."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.scheduler.close()
+        self.store.close()
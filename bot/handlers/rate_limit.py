@@ -0,0 +1,104 @@
+"""Token-bucket rate limits for document generation, per user and per guild."""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional
+
+
+class TokenBucket:
+    """Tokens left in a bucket and when it was last refilled."""
+    
+    __slots__ = ("tokens", "updated")
+    
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by id: `limit` requests in a burst, refilled at `limit` per `period` seconds.
+    
+    Buckets are kept in least-recently-used order and capped at `max_keys`; an
+    evicted bucket starts full again, which only ever errs towards allowing.
+    """
+    
+    def __init__(self, limit: int, period: float, max_keys: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.limit = limit
+        self.period = period
+        self.rate = limit / period if limit > 0 and period > 0 else 0.0
+        self.max_keys = max(1, max_keys)
+        self._clock = clock
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+    
+    def __len__(self) -> int:
+        return len(self._buckets)
+    
+    def _bucket(self, key: Hashable, now: float) -> TokenBucket:
+        """Get a key's bucket, refilled up to now."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.limit, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            bucket.tokens = min(self.limit, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+        return bucket
+    
+    def retry_after(self, key: Hashable) -> float:
+        """Seconds until a key has a token available, or 0 if it has one now."""
+        if not self.enabled:
+            return 0.0
+        bucket = self._bucket(key, self._clock())
+        if bucket.tokens >= 1:
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+    
+    def consume(self, key: Hashable):
+        """Take a token from a key's bucket. Call retry_after() first."""
+        if self.enabled:
+            self._bucket(key, self._clock()).tokens -= 1
+
+
+class RateLimited(NamedTuple):
+    """Why a request was refused: the limit that was hit and when to retry."""
+    
+    scope: str  # "user" or "guild"
+    retry_after: float
+
+
+class GenerateRateLimiter:
+    """Per-user and per-guild limits on starting document generation."""
+    
+    def __init__(self, user_limit: int, user_period: float, guild_limit: int, guild_period: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.users = RateLimiter(user_limit, user_period, clock=clock)
+        self.guilds = RateLimiter(guild_limit, guild_period, clock=clock)
+    
+    def hit(self, guild_id: Optional[int], user_id: int) -> Optional[RateLimited]:
+        """
+        Take a token from both the user's and the guild's bucket.
+        
+        Returns:
+            None if the request is allowed, otherwise the limit that refused it.
+            A refused request takes no tokens from either bucket.
+        """
+        retry_after = self.users.retry_after(user_id)
+        if retry_after:
+            return RateLimited("user", retry_after)
+        
+        if guild_id is not None:
+            retry_after = self.guilds.retry_after(guild_id)
+            if retry_after:
+                return RateLimited("guild", retry_after)
+            self.guilds.consume(guild_id)
+        
+        self.users.consume(user_id)
+        return None
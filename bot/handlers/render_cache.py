@@ -0,0 +1,137 @@
+"""Content-addressed LRU cache of rendered documents and their uploaded attachments."""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+from bot.handlers.render_executor import RenderedDocument
+
+# Used when an attachment URL doesn't say when it expires
+DEFAULT_ATTACHMENT_TTL = 12 * 60 * 60
+
+# Stop reusing an attachment URL this long before it expires
+ATTACHMENT_EXPIRY_MARGIN = 10 * 60
+
+
+def make_render_key(document_type: str, template_version: str, variables: Dict[str, Any]) -> str:
+    """Hash a document type, template version and form data into a cache key."""
+    payload = json.dumps(
+        [document_type, template_version, variables],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def attachment_expiry(url: str, now: float) -> float:
+    """Get when a Discord CDN attachment URL stops working (from its `ex` parameter)."""
+    expires = parse_qs(urlsplit(url).query).get("ex")
+    if expires:
+        try:
+            return int(expires[0], 16)
+        except ValueError:
+            pass
+    return now + DEFAULT_ATTACHMENT_TTL
+
+
+class CachedRender:
+    """A rendered document and, once uploaded, the URL of its attachment."""
+    
+    __slots__ = ("key", "rendered", "attachment_url", "attachment_expires_at")
+    
+    def __init__(self, key: str, rendered: RenderedDocument):
+        self.key = key
+        self.rendered = rendered
+        self.attachment_url: Optional[str] = None
+        self.attachment_expires_at = 0.0
+
+
+class RenderCache:
+    """
+    LRU cache of rendered documents keyed by a hash of their inputs.
+    
+    Repeat requests with identical answers skip rendering, and for documents
+    sent as files they can link the earlier upload instead of uploading again.
+    """
+    
+    def __init__(self, max_entries: int = 256, clock: Callable[[], float] = time.time):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, CachedRender]" = OrderedDict()
+        
+        # Lifetime counters
+        self.hits = 0
+        self.misses = 0
+        self.attachment_reuses = 0
+        self.render_bytes_saved = 0
+        self.upload_bytes_saved = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: str) -> Optional[CachedRender]:
+        """Get a cached render, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.render_bytes_saved += len(entry.rendered.data)
+        return entry
+    
+    def peek(self, key: str) -> Optional[CachedRender]:
+        """Get a cached render without counting a lookup or refreshing its position."""
+        return self._entries.get(key)
+    
+    def put(self, key: str, rendered: RenderedDocument) -> CachedRender:
+        """Cache a newly rendered document."""
+        entry = CachedRender(key, rendered)
+        if self.max_entries <= 0:
+            return entry
+        
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+    
+    def get_attachment_url(self, entry: CachedRender) -> Optional[str]:
+        """Get a still-valid attachment URL for a cached render, counting the saved upload."""
+        if entry.attachment_url is None:
+            return None
+        if entry.attachment_expires_at - ATTACHMENT_EXPIRY_MARGIN <= self._clock():
+            entry.attachment_url = None
+            return None
+        
+        self.attachment_reuses += 1
+        self.upload_bytes_saved += len(entry.rendered.data)
+        return entry.attachment_url
+    
+    def remember_attachment(self, entry: CachedRender, url: str):
+        """Remember where a cached render was uploaded."""
+        entry.attachment_url = url
+        entry.attachment_expires_at = attachment_expiry(url, self._clock())
+    
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit-ratio and bytes-saved counters."""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hit_ratio,
+            "attachment_reuses": self.attachment_reuses,
+            "render_bytes_saved": self.render_bytes_saved,
+            "upload_bytes_saved": self.upload_bytes_saved,
+        }
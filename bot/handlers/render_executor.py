@@ -0,0 +1,291 @@
+"""Executor-backed rendering that keeps template work off the event loop."""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bot.handlers.bundle import build_bundle_archive
+from bot.handlers.document_generator import DocumentGenerator, Template
+from bot.handlers.template_engine import CompiledTemplate
+from bot.handlers.template_store import GuildTemplateStore
+from bot.metrics import RENDER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+class RenderOverloaded(RuntimeError):
+    """Raised instead of queueing a render when too many are already in flight."""
+
+
+class RenderedDocument:
+    """A document rendered to UTF-8 bytes, with the size of each value filled into it."""
+    
+    __slots__ = ("document_type", "data", "render_time", "value_sizes")
+    
+    def __init__(self, document_type: str, data: bytes, render_time: float,
+                 value_sizes: Optional[Dict[str, int]] = None):
+        self.document_type = document_type
+        self.data = data
+        self.render_time = render_time
+        self.value_sizes = value_sizes  # placeholder -> encoded size, for incremental re-renders
+    
+    @property
+    def size(self) -> int:
+        """Exact size of the encoded document in bytes."""
+        return len(self.data)
+    
+    @property
+    def text(self) -> str:
+        """The document decoded back to a str."""
+        return self.data.decode("utf-8")
+
+
+def _render(template: CompiledTemplate, document_type: str, variables: Dict[str, Any]) -> RenderedDocument:
+    """Render a document straight to UTF-8 bytes."""
+    start = time.perf_counter()
+    data, value_sizes = template.render_sized(variables)
+    return RenderedDocument(document_type, data, time.perf_counter() - start, value_sizes)
+
+
+# Each worker process keeps its own generator, template cache and store connection
+_worker_generator: Optional[DocumentGenerator] = None
+
+
+def _init_worker(template_store_path: Optional[str]):
+    """Create the generator used by a process pool worker."""
+    global _worker_generator
+    store = GuildTemplateStore(template_store_path) if template_store_path else None
+    _worker_generator = DocumentGenerator(store)
+
+
+def _render_in_worker(document_type: str, guild_id: Optional[int], template_version: str,
+                      variables: Dict[str, Any]) -> RenderedDocument:
+    """Render a document inside a process pool worker."""
+    generator = _worker_generator
+    try:
+        stale = generator.resolve_template(document_type, guild_id).version != template_version
+    except FileNotFoundError:
+        stale = True
+    if stale:
+        # The parent saw a newer template or override than this worker has
+        generator.templates.refresh()
+        if guild_id is not None:
+            generator.invalidate_overrides(guild_id)
+    
+    template = generator.get_template(document_type, guild_id)
+    return _render(template, document_type, variables)
+
+
+class RenderStats:
+    """Queue depth and latency counters for a RenderExecutor."""
+    
+    __slots__ = ("submitted", "completed", "failed", "total_latency", "max_latency",
+                 "last_latency", "total_render_time", "max_queue_depth", "rejected", "incremental")
+    
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+        self.total_render_time = 0.0
+        self.max_queue_depth = 0
+        self.rejected = 0
+        self.incremental = 0
+
+
+class RenderExecutor:
+    """
+    Runs template rendering in a thread or process pool.
+    
+    Latency covers the whole round-trip from submission to result, including
+    time spent waiting for a free worker. Queue depth is the number of renders
+    waiting for a worker. With `max_in_flight` set, renders beyond that many
+    are refused with RenderOverloaded rather than queued.
+    """
+    
+    def __init__(self, document_generator: DocumentGenerator, mode: str = "thread", max_workers: int = 4,
+                 max_in_flight: int = 0):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown render executor mode: {mode} (expected one of {', '.join(EXECUTOR_MODES)})")
+        
+        self.document_generator = document_generator
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_in_flight = max_in_flight
+        self.stats = RenderStats()
+        self._executor: Optional[Executor] = None
+    
+    def _get_executor(self) -> Executor:
+        """Create the pool on first use."""
+        if self._executor is None:
+            if self.mode == "process":
+                store = self.document_generator.template_store
+                # Spawn rather than fork: the bot runs an event loop and helper threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(store.path if store else None,)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="render")
+        return self._executor
+    
+    @property
+    def in_flight(self) -> int:
+        """Number of renders submitted but not finished."""
+        return self.stats.submitted - self.stats.completed - self.stats.failed
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of renders waiting for a free worker."""
+        return max(0, self.in_flight - self.max_workers)
+    
+    def _admit(self, count: int = 1):
+        """Refuse new renders that would go over max_in_flight."""
+        if self.max_in_flight and self.in_flight + count > self.max_in_flight:
+            self.stats.rejected += 1
+            raise RenderOverloaded(f"{self.in_flight} renders in flight (limit {self.max_in_flight})")
+    
+    def _submit(self, document_type: str, template: Template, variables: Dict[str, Any],
+                guild_id: Optional[int]) -> "asyncio.Future[RenderedDocument]":
+        """Hand a render to the pool and count it as in flight."""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        
+        # Process workers use the version to detect reloads
+        if self.mode == "process":
+            future = loop.run_in_executor(
+                executor, _render_in_worker, document_type, guild_id, template.version, variables
+            )
+        else:
+            future = loop.run_in_executor(executor, _render, template.compiled, document_type, variables)
+        
+        stats = self.stats
+        stats.submitted += 1
+        stats.max_queue_depth = max(stats.max_queue_depth, self.queue_depth)
+        return future
+    
+    async def _wait(self, document_type: str, future: "asyncio.Future[RenderedDocument]") -> RenderedDocument:
+        """Wait for a submitted render and record its latency."""
+        stats = self.stats
+        start = time.perf_counter()
+        
+        try:
+            rendered = await future
+        except BaseException:
+            # Cancelled waits count too, so in_flight never drifts upwards
+            stats.failed += 1
+            raise
+        
+        latency = time.perf_counter() - start
+        stats.completed += 1
+        stats.total_latency += latency
+        stats.total_render_time += rendered.render_time
+        stats.last_latency = latency
+        stats.max_latency = max(stats.max_latency, latency)
+        RENDER_SECONDS.labels(document_type).observe(rendered.render_time)
+        
+        logger.debug(
+            f"Rendered {document_type} in {rendered.render_time * 1000:.2f}ms "
+            f"(latency {latency * 1000:.2f}ms, queue depth {self.queue_depth})"
+        )
+        return rendered
+    
+    async def render(self, document_type: str, variables: Dict[str, Any],
+                     guild_id: Optional[int] = None) -> RenderedDocument:
+        """
+        Render a document in the pool and wait for the result.
+        
+        Raises:
+            RenderOverloaded: If max_in_flight renders are already running or queued
+        """
+        self._admit()
+        template = self.document_generator.resolve_template(document_type, guild_id)  # Fail fast on unknown types
+        return await self._wait(document_type, self._submit(document_type, template, variables, guild_id))
+    
+    def rerender(self, template: Template, previous: RenderedDocument, variables: Dict[str, Any],
+                 changed: Iterable[str]) -> RenderedDocument:
+        """
+        Re-render only the changed placeholders of an earlier render of `template`.
+        
+        This formats a handful of values and joins the document back together,
+        so it runs on the calling thread rather than waiting for a pool worker.
+        """
+        document_type = previous.document_type
+        start = time.perf_counter()
+        data, value_sizes = template.compiled.rerender(previous.data, previous.value_sizes, variables, changed)
+        rendered = RenderedDocument(document_type, data, time.perf_counter() - start, value_sizes)
+        self.stats.incremental += 1
+        RENDER_SECONDS.labels(document_type).observe(rendered.render_time)
+        return rendered
+    
+    async def render_many(self, variables_by_type: Dict[str, Dict[str, Any]],
+                          guild_id: Optional[int] = None) -> List[RenderedDocument]:
+        """
+        Render several documents concurrently.
+        
+        Raises:
+            RenderOverloaded: If all of the documents don't fit under max_in_flight
+        """
+        # Admit and submit every document at once, so a bundle is never half rendered
+        self._admit(len(variables_by_type))
+        templates = {
+            document_type: self.document_generator.resolve_template(document_type, guild_id)
+            for document_type in variables_by_type
+        }
+        futures = [
+            (document_type, self._submit(document_type, templates[document_type], variables, guild_id))
+            for document_type, variables in variables_by_type.items()
+        ]
+        return list(await asyncio.gather(*(self._wait(document_type, future) for document_type, future in futures)))
+    
+    async def build_archive(self, documents: List[Tuple[str, bytes]]) -> bytes:
+        """Pack (filename, data) pairs into a zip archive in the pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), build_bundle_archive, documents)
+    
+    async def render_bundle(self, variables_by_type: Dict[str, Dict[str, Any]],
+                            guild_id: Optional[int] = None) -> bytes:
+        """
+        Render several documents concurrently and pack them into one zip archive.
+        
+        Raises:
+            RenderOverloaded: If the whole bundle doesn't fit under max_in_flight
+        """
+        rendered = await self.render_many(variables_by_type, guild_id)
+        return await self.build_archive([(f"{document.document_type}.md", document.data) for document in rendered])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get a snapshot of queue depth and latency figures."""
+        stats = self.stats
+        completed = stats.completed or 1
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": stats.max_queue_depth,
+            "submitted": stats.submitted,
+            "completed": stats.completed,
+            "failed": stats.failed,
+            "rejected": stats.rejected,
+            "incremental": stats.incremental,
+            "max_in_flight": self.max_in_flight,
+            "avg_latency_ms": stats.total_latency / completed * 1000,
+            "max_latency_ms": stats.max_latency * 1000,
+            "last_latency_ms": stats.last_latency * 1000,
+            "avg_render_ms": stats.total_render_time / completed * 1000,
+        }
+    
+    def shutdown(self):
+        """Shut down the pool without waiting for queued renders."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,193 @@
+"""Precomputed prefix and n-gram index for fast, typo-tolerant autocomplete."""
+
+import re
+from collections import OrderedDict
+from typing import Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+# Match tiers, best first
+EXACT, PREFIX, TOKEN_PREFIX, SUBSTRING, FUZZY = range(5)
+
+# Minimum trigram similarity for a fuzzy match
+FUZZY_THRESHOLD = 0.4
+
+
+def normalize(text: str) -> str:
+    """Lowercase text and collapse underscores, punctuation and spaces into single spaces."""
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Get the padded character trigrams of each word in text."""
+    grams = set()
+    for token in text.split():
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """Check whether two words differ by at most one insertion, deletion, substitution or swap."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    
+    if len(a) == len(b):
+        # Substitution, or swap of two adjacent characters
+        return a[i + 1:] == b[i + 1:] or (
+            i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+        )
+    return a[i:] == b[i + 1:]  # Insertion into the shorter word
+
+
+def deletions(word: str) -> Set[str]:
+    """Get a word and every string one deletion after its first character away from it."""
+    return {word} | {word[:i] + word[i + 1:] for i in range(1, len(word))}
+
+
+class _Entry(Generic[T]):
+    """An indexed item and its precomputed search forms."""
+    
+    __slots__ = ("position", "payload", "texts", "tokens", "grams")
+    
+    def __init__(self, position: int, payload: T, texts: Tuple[str, ...]):
+        self.position = position
+        self.payload = payload
+        self.texts = texts
+        self.tokens = tuple(sorted({token for text in texts for token in text.split()}))
+        self.grams = trigrams(" ".join(texts))
+
+
+class SearchIndex(Generic[T]):
+    """
+    Immutable search index over (search texts, payload) items.
+    
+    Results are ranked exact > prefix > word prefix > substring > fuzzy, then by
+    catalog order. Each query's results are cached, and since Discord sends one
+    autocomplete request per keystroke the cache covers every typed prefix.
+    """
+    
+    def __init__(self, items: Iterable[Tuple[Iterable[str], T]], limit: int = 25, cache_size: int = 1024):
+        self.limit = limit
+        self.cache_size = cache_size
+        self._entries: List[_Entry[T]] = [
+            _Entry(position, payload, self._search_texts(texts))
+            for position, (texts, payload) in enumerate(items)
+        ]
+        
+        # prefix of any word -> entries, 1-2 character substring -> entries, trigram -> entries,
+        # and each 3+ character word prefix and its one-deletion variants -> entries. Two
+        # words with the same first letter and within one edit always share a variant, so
+        # typo candidates are a few lookups instead of every entry with that first letter.
+        self._prefixes: Dict[str, Set[int]] = {}
+        self._short_substrings: Dict[str, Set[int]] = {}
+        self._grams: Dict[str, Set[int]] = {}
+        self._edits: Dict[str, Set[int]] = {}
+        for entry in self._entries:
+            for token in entry.tokens:
+                for end in range(1, len(token) + 1):
+                    self._prefixes.setdefault(token[:end], set()).add(entry.position)
+                for end in range(3, len(token) + 1):
+                    for variant in deletions(token[:end]):
+                        self._edits.setdefault(variant, set()).add(entry.position)
+            for text in entry.texts:
+                for start in range(len(text)):
+                    for end in (start + 1, start + 2):
+                        if end <= len(text):
+                            self._short_substrings.setdefault(text[start:end], set()).add(entry.position)
+            for gram in entry.grams:
+                self._grams.setdefault(gram, set()).add(entry.position)
+        
+        self._cache: "OrderedDict[str, List[T]]" = OrderedDict()
+        self._default = [entry.payload for entry in self._entries[:limit]]
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    @staticmethod
+    def _search_texts(texts: Iterable[str]) -> Tuple[str, ...]:
+        """Normalize an item's texts and add acronyms of multi-word ones (e.g. "tos")."""
+        normalized = [normalize(text) for text in texts]
+        for text in list(normalized):
+            words = text.split()
+            if len(words) > 1:
+                normalized.append("".join(word[0] for word in words))
+        return tuple(dict.fromkeys(normalized))
+    
+    def search(self, query: str) -> List[T]:
+        """Get the best matching payloads for a query, at most `limit` of them."""
+        normalized = normalize(query)
+        if not normalized:
+            return self._default
+        
+        results = self._cache.get(normalized)
+        if results is not None:
+            self._cache.move_to_end(normalized)
+            return results
+        
+        results = self._search(normalized)
+        self._cache[normalized] = results
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return results
+    
+    def _candidates(self, query: str, tokens: List[str], grams: Set[str]) -> Set[int]:
+        """Collect entries that could possibly match, using the indexes."""
+        candidates: Set[int] = set()
+        for token in tokens:
+            candidates |= self._prefixes.get(token, set())
+        for gram in grams:
+            candidates |= self._grams.get(gram, set())
+        if len(query) < 3:
+            # Too short for trigrams to find substrings
+            candidates |= self._short_substrings.get(query, set())
+        for token in tokens:
+            # Typo tolerance for words whose trigrams were mangled
+            if len(token) >= 3:
+                for variant in deletions(token):
+                    candidates |= self._edits.get(variant, set())
+        return candidates
+    
+    def _score(self, entry: _Entry[T], query: str, tokens: List[str], grams: Set[str]) -> Optional[Tuple[int, float, int]]:
+        """Rank an entry against a query, or None if it doesn't match."""
+        if query in entry.texts:
+            return (EXACT, 0.0, entry.position)
+        if any(text.startswith(query) for text in entry.texts):
+            return (PREFIX, 0.0, entry.position)
+        if all(any(word.startswith(token) for word in entry.tokens) for token in tokens):
+            return (TOKEN_PREFIX, 0.0, entry.position)
+        if any(query in text for text in entry.texts):
+            return (SUBSTRING, 0.0, entry.position)
+        
+        similarity = 2 * len(grams & entry.grams) / (len(grams) + len(entry.grams)) if grams else 0.0
+        close_words = all(
+            any(within_one_edit(token, word[:len(token) + 1]) or within_one_edit(token, word[:len(token)])
+                for word in entry.tokens)
+            for token in tokens if len(token) >= 3
+        ) and any(len(token) >= 3 for token in tokens)
+        if similarity >= FUZZY_THRESHOLD or close_words:
+            return (FUZZY, -similarity, entry.position)
+        return None
+    
+    def _search(self, query: str) -> List[T]:
+        tokens = query.split()
+        grams = trigrams(query)
+        scored = []
+        for position in self._candidates(query, tokens, grams):
+            entry = self._entries[position]
+            score = self._score(entry, query, tokens, grams)
+            if score is not None:
+                scored.append((score, entry))
+        
+        scored.sort(key=lambda item: item[0])
+        return [entry.payload for _, entry in scored[:self.limit]]
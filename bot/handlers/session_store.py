@@ -0,0 +1,132 @@
+"""Bounded, expiring store for in-progress form sessions."""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+SessionKey = Tuple[Optional[int], int]  # (guild_id, user_id); guild_id is None in DMs
+
+
+class FormSession:
+    """State for one user's in-progress form in one guild."""
+    
+    __slots__ = ("guild_id", "user_id", "document_type", "data", "created_at", "expires_at")
+    
+    def __init__(self, guild_id: Optional[int], user_id: int, document_type: str,
+                 data: Dict[str, Any], created_at: float, expires_at: float):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.document_type = document_type
+        self.data = data
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+
+class SessionStore:
+    """
+    Form sessions keyed by (guild, user) with TTL expiry and an LRU size cap.
+    
+    Every access pushes a session's expiry forward and moves it to the back,
+    so sessions stay ordered by expiry and expired ones are purged from the
+    front without scanning the whole store.
+    """
+    
+    def __init__(self, ttl: float = 300, max_size: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._clock = clock
+        self._sessions: "OrderedDict[SessionKey, FormSession]" = OrderedDict()
+        
+        # Lifetime counters
+        self.started = 0
+        self.completed = 0
+        self.expired = 0
+        self.evicted = 0
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def start(self, guild_id: Optional[int], user_id: int, document_type: str,
+              data: Optional[Dict[str, Any]] = None) -> FormSession:
+        """Start (or restart) a form session for a user in a guild."""
+        now = self._clock()
+        self._purge_expired(now)
+        
+        key = (guild_id, user_id)
+        self._sessions.pop(key, None)
+        session = FormSession(guild_id, user_id, document_type, data or {}, now, now + self.ttl)
+        self._sessions[key] = session
+        self.started += 1
+        
+        while len(self._sessions) > self.max_size:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        
+        return session
+    
+    def get(self, guild_id: Optional[int], user_id: int) -> Optional[FormSession]:
+        """Get a live session and extend its expiry, or None if there is none."""
+        key = (guild_id, user_id)
+        session = self._sessions.get(key)
+        if session is None:
+            return None
+        
+        now = self._clock()
+        if session.expires_at <= now:
+            del self._sessions[key]
+            self.expired += 1
+            return None
+        
+        session.expires_at = now + self.ttl
+        self._sessions.move_to_end(key)
+        return session
+    
+    def pop(self, guild_id: Optional[int], user_id: int) -> Optional[FormSession]:
+        """Remove and return a session once its form has been handled."""
+        session = self._sessions.pop((guild_id, user_id), None)
+        if session is None:
+            return None
+        if session.expires_at <= self._clock():
+            self.expired += 1
+            return None
+        self.completed += 1
+        return session
+    
+    def expire(self, session: FormSession) -> bool:
+        """Drop a session whose form timed out, unless the user has started another form since."""
+        key = (session.guild_id, session.user_id)
+        if self._sessions.get(key) is not session:
+            return False
+        del self._sessions[key]
+        self.expired += 1
+        return True
+    
+    def age(self, session: FormSession) -> float:
+        """Seconds since a session was started."""
+        return self._clock() - session.created_at
+    
+    def purge_expired(self) -> int:
+        """Drop every expired session and return how many were removed."""
+        return self._purge_expired(self._clock())
+    
+    def _purge_expired(self, now: float) -> int:
+        removed = 0
+        sessions = self._sessions
+        while sessions:
+            key, session = next(iter(sessions.items()))
+            if session.expires_at > now:
+                break
+            del sessions[key]
+            removed += 1
+        self.expired += removed
+        return removed
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get live, expired and evicted session counts."""
+        return {
+            "live": len(self._sessions),
+            "started": self.started,
+            "completed": self.completed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,147 @@
+"""In-memory template cache with file-change invalidation."""
+
+import hashlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from bot.handlers.template_engine import CompiledTemplate, compile_template
+from bot.metrics import TEMPLATE_LOAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateEntry:
+    """A loaded template and the file state it was loaded from."""
+    
+    __slots__ = ("document_type", "path", "mtime_ns", "size", "source", "compiled", "version")
+    
+    def __init__(self, document_type: str, path: Path, mtime_ns: int, size: int, source: str):
+        self.document_type = document_type
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.source = source
+        self.compiled: CompiledTemplate = compile_template(source)
+        self.version = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
+
+class TemplateCache:
+    """
+    Loads every template in a directory once and serves them from memory.
+    
+    Entries are reloaded when a file's mtime or size changes. Call refresh()
+    directly or start the background watcher to pick up edits without a restart.
+    """
+    
+    def __init__(self, templates_dir: Path):
+        self.templates_dir = Path(templates_dir)
+        self._entries: Dict[str, TemplateEntry] = {}
+        self.generation = 0  # bumped whenever the template set or any template changes
+        self._refresh_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self.refresh()
+    
+    def get(self, document_type: str) -> TemplateEntry:
+        """Get the cached entry for a document type."""
+        entry = self._entries.get(document_type)
+        if entry is None:
+            raise FileNotFoundError(f"Template not found: {self.templates_dir / f'{document_type}.md'}")
+        return entry
+    
+    def document_types(self) -> List[str]:
+        """Get the document types that currently have a template."""
+        return list(self._entries)
+    
+    def add_listener(self, callback: Callable[[List[str]], None]):
+        """
+        Call `callback` with the changed document types whenever a refresh reloads templates.
+        
+        Callbacks run on the thread that refreshed (usually the watcher), and
+        not for the initial load.
+        """
+        self._listeners.append(callback)
+    
+    def refresh(self) -> List[str]:
+        """
+        Re-scan the templates directory and reload changed files.
+        
+        Returns:
+            Document types that were added, changed or removed
+        """
+        with self._refresh_lock:
+            current = self._entries
+            entries: Dict[str, TemplateEntry] = {}
+            changed = []
+            
+            paths = sorted(self.templates_dir.glob("*.md")) if self.templates_dir.is_dir() else []
+            for path in paths:
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue  # Removed between glob and stat
+                
+                document_type = path.stem
+                entry = current.get(document_type)
+                if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                    entries[document_type] = entry
+                    continue
+                
+                start = time.perf_counter()
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        source = f.read()
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.error(f"Error loading template {path}: {e}")
+                    if entry is not None:
+                        entries[document_type] = entry  # Keep serving the last good version
+                    continue
+                
+                entries[document_type] = TemplateEntry(
+                    document_type, path, stat.st_mtime_ns, stat.st_size, source
+                )
+                TEMPLATE_LOAD_SECONDS.labels("file").observe(time.perf_counter() - start)
+                changed.append(document_type)
+            
+            changed.extend(document_type for document_type in current if document_type not in entries)
+            
+            reloaded = bool(changed and current)
+            if changed:
+                # Swap the whole mapping so readers never see a partial update
+                self._entries = entries
+                self.generation += 1
+                if reloaded:
+                    logger.info(f"Reloaded templates: {', '.join(sorted(changed))}")
+        
+        if reloaded:
+            for listener in self._listeners:
+                try:
+                    listener(sorted(changed))
+                except Exception as e:
+                    logger.error(f"Error in template listener: {e}")
+        return changed
+    
+    def start_watcher(self, interval: float):
+        """Start a background thread that calls refresh() every `interval` seconds."""
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        
+        self._stop_watching.clear()
+        
+        def watch():
+            while not self._stop_watching.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Error refreshing templates: {e}")
+        
+        self._watcher = threading.Thread(target=watch, name="template-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_watcher(self):
+        """Stop the background watcher if it is running."""
+        self._stop_watching.set()
+        self._watcher = None
@@ -0,0 +1,268 @@
+"""Template compiler that parses templates once and renders them with a single join."""
+
+import re
+from itertools import accumulate
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+# Anything wrapped in braces inside a template is a placeholder
+PLACEHOLDER_PATTERN = re.compile(r"\{([^}]+)\}")
+
+# Markdown headings start the sections reported when an edit changes a document
+HEADING_PATTERN = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t]*#*[ \t]*$", re.MULTILINE)
+
+# Title for placeholders that come before the first heading
+PREAMBLE_TITLE = "Beginning of document"
+
+# Text used for placeholders that have no value
+MISSING_VALUE = "N/A"
+
+
+def format_value(value: Any) -> str:
+    """Convert a variable value to the text inserted into a document."""
+    if value is None:
+        return MISSING_VALUE
+    if isinstance(value, list):
+        return "\n".join(f"- {item}" for item in value) if value else "None"
+    return str(value)
+
+
+class Segment(NamedTuple):
+    """A piece of a compiled template: literal text or a placeholder name."""
+    
+    text: str
+    placeholder: Optional[str] = None
+
+
+class Section(NamedTuple):
+    """A markdown heading in a template and the position in the source where its section starts."""
+    
+    title: str  # Heading text, which may contain placeholders
+    level: int
+    start: int
+
+
+def _format_title(title: str, variables: Dict[str, Any]) -> str:
+    """Fill the placeholders in a heading."""
+    return PLACEHOLDER_PATTERN.sub(
+        lambda match: format_value(variables[match.group(1)]) if match.group(1) in variables else MISSING_VALUE,
+        title
+    )
+
+
+class CompiledTemplate:
+    """
+    A template parsed into literal and placeholder segments.
+    
+    Compiling also builds a dependency index from each placeholder to the
+    segments it fills and the sections those segments are in, so an edited
+    document only re-renders the placeholders whose values changed.
+    """
+    
+    __slots__ = ("source", "segments", "placeholders", "dependencies", "sections", "segment_sections",
+                 "_parts", "_byte_parts", "_slots", "_slot_names", "_slot_literal_offsets", "_slot_dependencies")
+    
+    def __init__(self, source: str):
+        self.source = source
+        self.segments: Tuple[Segment, ...] = tuple(self._parse(source))
+        self.placeholders = frozenset(
+            segment.placeholder for segment in self.segments if segment.placeholder is not None
+        )
+        
+        # placeholder -> indexes of the segments it fills
+        dependencies: Dict[str, List[int]] = {}
+        for index, segment in enumerate(self.segments):
+            if segment.placeholder is not None:
+                dependencies.setdefault(segment.placeholder, []).append(index)
+        self.dependencies: Dict[str, Tuple[int, ...]] = {
+            name: tuple(indexes) for name, indexes in dependencies.items()
+        }
+        
+        # Section each segment starts in, or -1 before the first heading
+        self.sections: Tuple[Section, ...] = tuple(
+            Section(match.group(2), len(match.group(1)), match.start())
+            for match in HEADING_PATTERN.finditer(source)
+        )
+        segment_sections = []
+        section, position = -1, 0
+        for segment in self.segments:
+            while section + 1 < len(self.sections) and self.sections[section + 1].start <= position:
+                section += 1
+            segment_sections.append(section)
+            position += len(segment.text)
+        self.segment_sections: Tuple[int, ...] = tuple(segment_sections)
+        
+        # Render buffer template and the positions that get filled on each render
+        self._parts: List[str] = [segment.text for segment in self.segments]
+        self._byte_parts: List[bytes] = [segment.text.encode("utf-8") for segment in self.segments]
+        self._slots: Tuple[Tuple[int, str], ...] = tuple(
+            (index, segment.placeholder)
+            for index, segment in enumerate(self.segments)
+            if segment.placeholder is not None
+        )
+        
+        # Per slot: its placeholder, the literal bytes before it and, per placeholder, the slots it fills
+        self._slot_names: Tuple[str, ...] = tuple(name for _, name in self._slots)
+        literal_sizes = [0] * (len(self._slots) + 1)
+        slot = 0
+        for index, segment in enumerate(self.segments):
+            if segment.placeholder is None:
+                literal_sizes[slot] += len(self._byte_parts[index])
+            else:
+                slot += 1
+        self._slot_literal_offsets: Tuple[int, ...] = tuple(accumulate(literal_sizes))
+        slot_dependencies: Dict[str, List[int]] = {}
+        for slot, name in enumerate(self._slot_names):
+            slot_dependencies.setdefault(name, []).append(slot)
+        self._slot_dependencies: Dict[str, Tuple[int, ...]] = {
+            name: tuple(slots) for name, slots in slot_dependencies.items()
+        }
+    
+    @staticmethod
+    def _parse(source: str) -> List[Segment]:
+        """Split the template source into segments."""
+        segments = []
+        position = 0
+        
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            if match.start() > position:
+                segments.append(Segment(source[position:match.start()]))
+            segments.append(Segment(match.group(0), match.group(1)))
+            position = match.end()
+        
+        if position < len(source):
+            segments.append(Segment(source[position:]))
+        
+        return segments
+    
+    def render(self, variables: Dict[str, Any]) -> str:
+        """
+        Render the template with the given variables.
+        
+        Values are inserted as-is, so braces inside user input are never
+        treated as placeholders. Placeholders without a value become "N/A".
+        
+        Args:
+            variables: Dictionary of variable names and values to substitute
+        
+        Returns:
+            Rendered document as string
+        """
+        parts = self._parts.copy()
+        formatted: Dict[str, str] = {}
+        
+        for index, name in self._slots:
+            text = formatted.get(name)
+            if text is None:
+                text = format_value(variables[name]) if name in variables else MISSING_VALUE
+                formatted[name] = text
+            parts[index] = text
+        
+        return "".join(parts)
+    
+    def render_bytes(self, variables: Dict[str, Any]) -> bytes:
+        """
+        Render the template straight to UTF-8 bytes.
+        
+        Literal segments are encoded once at compile time and each variable is
+        encoded once per render, so the full document is never built as a str.
+        This is `render_sized` without the sizes, so the two can't disagree
+        about what a document looks like.
+        
+        Args:
+            variables: Dictionary of variable names and values to substitute
+        
+        Returns:
+            Rendered document as UTF-8 encoded bytes
+        """
+        return self.render_sized(variables)[0]
+    
+    def render_sized(self, variables: Dict[str, Any]) -> Tuple[bytes, Dict[str, int]]:
+        """
+        Render the template to UTF-8 bytes and report each placeholder's encoded size.
+        
+        The sizes locate every filled-in value in the document, which is all
+        `rerender` needs to reuse the values that didn't change.
+        
+        Returns:
+            (document, sizes): the rendered document and placeholder -> value size in bytes
+        """
+        parts = self._byte_parts.copy()
+        encoded: Dict[str, bytes] = {}
+        
+        for index, name in self._slots:
+            data = encoded.get(name)
+            if data is None:
+                text = format_value(variables[name]) if name in variables else MISSING_VALUE
+                data = text.encode("utf-8")
+                encoded[name] = data
+            parts[index] = data
+        
+        return b"".join(parts), {name: len(data) for name, data in encoded.items()}
+    
+    def changed_placeholders(self, old: Dict[str, Any], new: Dict[str, Any]) -> FrozenSet[str]:
+        """Get the placeholders whose values differ between two sets of variables."""
+        return frozenset(name for name in self.placeholders if old.get(name) != new.get(name))
+    
+    def rerender(self, previous: bytes, sizes: Dict[str, int], variables: Dict[str, Any],
+                 changed: Iterable[str]) -> Tuple[bytes, Dict[str, int]]:
+        """
+        Re-render a document produced by `render_sized`, formatting only the changed placeholders.
+        
+        Unchanged values are never formatted or encoded again: the new document
+        is the previous one with only the changed values spliced in, so the join
+        has two parts per changed value however long the template is.
+        
+        Args:
+            previous: Document rendered from this template
+            sizes: Value sizes returned with `previous`
+            variables: New variables
+            changed: Placeholders whose values differ from the ones `previous` was rendered with
+        
+        Returns:
+            (document, sizes), as returned by `render_sized`
+        """
+        encoded: Dict[str, bytes] = {}
+        for name in changed:
+            if name in self.dependencies:
+                text = format_value(variables[name]) if name in variables else MISSING_VALUE
+                encoded[name] = text.encode("utf-8")
+        if not encoded:
+            return previous, sizes
+        
+        # Each slot starts after the literal text and the previous values before it
+        value_ends = list(accumulate(map(sizes.__getitem__, self._slot_names)))
+        slots = sorted(slot for name in encoded for slot in self._slot_dependencies[name])
+        
+        view = memoryview(previous)
+        parts = []
+        position = 0
+        for slot in slots:
+            name = self._slot_names[slot]
+            start = self._slot_literal_offsets[slot] + (value_ends[slot - 1] if slot else 0)
+            parts.append(view[position:start])
+            parts.append(encoded[name])
+            position = start + sizes[name]
+        parts.append(view[position:])
+        
+        sizes = dict(sizes)
+        sizes.update((name, len(data)) for name, data in encoded.items())
+        return b"".join(parts), sizes
+    
+    def changed_sections(self, changed: Iterable[str]) -> List[int]:
+        """Get the indexes of the sections, in document order, that contain any of the changed placeholders."""
+        return sorted({
+            self.segment_sections[index]
+            for name in changed
+            for index in self.dependencies.get(name, ())
+        })
+    
+    def section_title(self, section: int, variables: Dict[str, Any]) -> str:
+        """Get a section's heading with its placeholders filled in."""
+        if section < 0:
+            return PREAMBLE_TITLE
+        return _format_title(self.sections[section].title, variables)
+
+
+def compile_template(source: str) -> CompiledTemplate:
+    """Compile template source into a reusable CompiledTemplate."""
+    return CompiledTemplate(source)
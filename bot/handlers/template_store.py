@@ -0,0 +1,131 @@
+"""SQLite store for per-guild template overrides."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Set, Tuple
+from bot.handlers.template_engine import CompiledTemplate, compile_template
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_templates (
+    guild_id INTEGER NOT NULL,
+    document_type TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created_by INTEGER,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, document_type, version)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS guild_template_active (
+    guild_id INTEGER NOT NULL,
+    document_type TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, document_type)
+) WITHOUT ROWID;
+"""
+
+
+class GuildTemplate:
+    """A guild's override of a built-in template."""
+    
+    __slots__ = ("guild_id", "document_type", "revision", "source", "compiled", "version")
+    
+    def __init__(self, guild_id: int, document_type: str, revision: int, source: str):
+        self.guild_id = guild_id
+        self.document_type = document_type
+        self.revision = revision  # Per-guild version number in the store
+        self.source = source
+        self.compiled: CompiledTemplate = compile_template(source)
+        self.version = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
+
+class GuildTemplateStore:
+    """
+    Versioned per-guild template overrides indexed by (guild_id, document_type, version).
+    
+    Every upload is kept as a new version; the active version of each
+    (guild, document type) pair is tracked separately so resets keep history.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+    
+    def guild_ids(self) -> Set[int]:
+        """Get every guild that has at least one active override."""
+        with self._lock:
+            rows = self._connection.execute("SELECT DISTINCT guild_id FROM guild_template_active").fetchall()
+        return {guild_id for (guild_id,) in rows}
+    
+    def has_overrides(self, guild_id: int) -> bool:
+        """Check whether a guild has any active override."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM guild_template_active WHERE guild_id = ? LIMIT 1", (guild_id,)
+            ).fetchone()
+        return row is not None
+    
+    def get_active(self, guild_id: int, document_type: str) -> Optional[GuildTemplate]:
+        """Get a guild's active override for a document type, if any."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT t.version, t.content FROM guild_template_active a "
+                "JOIN guild_templates t USING (guild_id, document_type, version) "
+                "WHERE a.guild_id = ? AND a.document_type = ?",
+                (guild_id, document_type)
+            ).fetchone()
+        if row is None:
+            return None
+        return GuildTemplate(guild_id, document_type, row[0], row[1])
+    
+    def save(self, guild_id: int, document_type: str, content: str, created_by: Optional[int] = None) -> int:
+        """Store a new override version and make it active. Returns the new version number."""
+        with self._lock, self._connection:
+            (latest,) = self._connection.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM guild_templates WHERE guild_id = ? AND document_type = ?",
+                (guild_id, document_type)
+            ).fetchone()
+            version = latest + 1
+            self._connection.execute(
+                "INSERT INTO guild_templates (guild_id, document_type, version, content, created_by, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (guild_id, document_type, version, content, created_by, time.time())
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO guild_template_active (guild_id, document_type, version) VALUES (?, ?, ?)",
+                (guild_id, document_type, version)
+            )
+        return version
+    
+    def reset(self, guild_id: int, document_type: str) -> bool:
+        """Go back to the built-in template. Returns False if there was no active override."""
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM guild_template_active WHERE guild_id = ? AND document_type = ?",
+                (guild_id, document_type)
+            )
+        return cursor.rowcount > 0
+    
+    def list_versions(self, guild_id: int, document_type: str) -> List[Tuple[int, float, Optional[int]]]:
+        """Get (version, created_at, created_by) for every stored version, newest first."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT version, created_at, created_by FROM guild_templates "
+                "WHERE guild_id = ? AND document_type = ? ORDER BY version DESC",
+                (guild_id, document_type)
+            ).fetchall()
+    
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
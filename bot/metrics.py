@@ -0,0 +1,388 @@
+"""Prometheus-style counters, gauges and histograms with an optional /metrics endpoint.
+
+Metrics are created through a MetricsRegistry. When the registry is disabled
+every metric is a shared no-op object, so instrumented code costs one or two
+empty method calls and nothing is stored.
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from config.config import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Default histogram buckets for durations, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Timer:
+    """Context manager that observes the time spent inside it."""
+    
+    __slots__ = ("_histogram", "_start")
+    
+    def __init__(self, histogram: "_HistogramValue"):
+        self._histogram = histogram
+    
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+    
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue:
+    __slots__ = ("value", "_function", "_lock")
+    
+    def __init__(self):
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+    
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+    
+    def set_function(self, function: Callable[[], float]):
+        """Read the gauge from `function` whenever metrics are collected."""
+        self._function = function
+    
+    def get(self) -> float:
+        return self._function() if self._function is not None else self.value
+
+
+class _HistogramValue:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+    
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # The last slot is the +Inf bucket
+        self._sum = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+    
+    def time(self) -> _Timer:
+        """Time a block of code: `with histogram.time(): ...`"""
+        return _Timer(self)
+    
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Metric:
+    """A named metric with zero or more labels; each label combination has its own value."""
+    
+    type = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[Any, ...], Any] = {}
+        self._lock = threading.Lock()
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def labels(self, *values):
+        """Get the value for a combination of label values, creating it on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+    
+    def collect(self) -> List[str]:
+        """Format every value in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for values, child in list(self._children.items()):
+            self._collect_child(lines, _format_labels(self.labelnames, values), values, child)
+        return lines
+    
+    def _collect_child(self, lines: List[str], labels: str, values: Tuple[Any, ...], child):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+    
+    type = "counter"
+    
+    def _new_child(self) -> _CounterValue:
+        return _CounterValue()
+    
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+    
+    def _collect_child(self, lines, labels, values, child):
+        lines.append(f"{self.name}{labels} {_format_value(child.value)}")
+
+
+class Gauge(Metric):
+    """A value that can go up and down, or be read from a function."""
+    
+    type = "gauge"
+    
+    def _new_child(self) -> _GaugeValue:
+        return _GaugeValue()
+    
+    def set(self, value: float):
+        self.labels().set(value)
+    
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+    
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+    
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+    
+    def _collect_child(self, lines, labels, values, child):
+        lines.append(f"{self.name}{labels} {_format_value(child.get())}")
+
+
+class Histogram(Metric):
+    """Counts observations into cumulative buckets, with their sum and count."""
+    
+    type = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+    
+    def observe(self, value: float):
+        self.labels().observe(value)
+    
+    def time(self) -> _Timer:
+        return self.labels().time()
+    
+    def _collect_child(self, lines, labels, values, child):
+        counts, total = child.snapshot()
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            bucket_labels = _format_labels(self.labelnames + ("le",), values + (_format_value(bound),))
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+
+
+class _NoOpMetric:
+    """Stands in for every metric of a disabled registry."""
+    
+    __slots__ = ()
+    
+    def labels(self, *values):
+        return self
+    
+    def inc(self, amount: float = 1.0):
+        pass
+    
+    def dec(self, amount: float = 1.0):
+        pass
+    
+    def set(self, value: float):
+        pass
+    
+    def set_function(self, function: Callable[[], float]):
+        pass
+    
+    def observe(self, value: float):
+        pass
+    
+    def time(self):
+        return self
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoOpMetric()
+
+
+class MetricsRegistry:
+    """Creates metrics and renders them for scraping."""
+    
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Metric] = {}
+    
+    def _register(self, metric: Metric):
+        if not self.enabled:
+            return _NOOP
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self) -> str:
+        """Get every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves a registry on http://host:port/metrics from the running event loop."""
+    
+    def __init__(self, registry: MetricsRegistry, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+    
+    async def start(self):
+        """Start listening. Does nothing if the registry is disabled."""
+        if not self.registry.enabled or self._runner is not None:
+            return
+        
+        from aiohttp import web  # Only needed when metrics are enabled
+        
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+    
+    async def _handle(self, request):
+        from aiohttp import web
+        return web.Response(body=self.registry.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+    
+    async def stop(self):
+        """Stop listening."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+# Metrics are only collected when there is an endpoint to serve them
+METRICS = MetricsRegistry(enabled=METRICS_PORT > 0)
+
+GENERATE_INVOCATIONS = METRICS.counter(
+    "compliance_generate_invocations_total",
+    "Document generation commands and buttons used, by entry point and document type.",
+    ("source", "document_type")
+)
+FORM_DURATION = METRICS.histogram(
+    "compliance_form_duration_seconds",
+    "Time from opening a form to submitting it.",
+    ("document_type",),
+    buckets=(1, 5, 10, 20, 30, 60, 120, 180, 300, 600)
+)
+TEMPLATE_LOAD_SECONDS = METRICS.histogram(
+    "compliance_template_load_seconds",
+    "Time to read and compile a template, by source (file or guild override).",
+    ("source",)
+)
+RENDER_SECONDS = METRICS.histogram(
+    "compliance_render_seconds",
+    "Time spent rendering a document in the render pool.",
+    ("document_type",)
+)
+EXPORT_SECONDS = METRICS.histogram(
+    "compliance_export_seconds",
+    "Time to convert a document to an export format in the export pool, including queueing.",
+    ("format",)
+)
+RESPONSE_SEND_SECONDS = METRICS.histogram(
+    "compliance_response_send_seconds",
+    "Time to send a generated document to Discord, by response kind.",
+    ("kind",)
+)
+DOCUMENT_SIZE_BYTES = METRICS.histogram(
+    "compliance_document_size_bytes",
+    "Size of generated documents (and bundle archives) in bytes.",
+    ("document_type",),
+    buckets=(256, 512, 1024, 1900, 4096, 8192, 16384, 65536, 262144, 1048576)
+)
+ERRORS = METRICS.counter(
+    "compliance_errors_total",
+    "Errors by pipeline stage and exception type.",
+    ("stage", "error")
+)
+REJECTED = METRICS.counter(
+    "compliance_rejected_total",
+    "Requests turned away by rate limits (user, guild) or render admission control (overloaded).",
+    ("reason",)
+)
+ACTIVE_FORMS = METRICS.gauge(
+    "compliance_active_forms",
+    "Forms opened and not yet submitted or expired."
+)
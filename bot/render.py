@@ -0,0 +1,252 @@
+"""
+Render documents from JSON answer files without connecting to Discord.
+
+Usage:
+    python -m bot.render answers/ -o output/
+    python -m bot.render answers.jsonl -o output/ --workers 8
+    python -m bot.render answers.jsonl -o output/ --format pdf
+    cat answers.jsonl | python -m bot.render - -o output/
+
+Each record is a JSON object: {"document_type": "rules", "answers": {...}, "name": "optional"}.
+Answers are the raw form answers (list fields may be newline-separated text or
+JSON lists) and go through the same form schemas as the bot. This module does
+not import discord, so it starts quickly.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+from bot.handlers import render_executor
+from bot.handlers.exporters import DEFAULT_EXPORT_FORMAT, EXPORTERS, export_document
+from bot.handlers.form_schemas import FORM_SCHEMAS
+from bot.handlers.render_executor import _init_worker
+from config.config import GUILD_TEMPLATES_DB
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE_FILENAME_CHARACTERS = re.compile(r"[^\w.-]+")
+
+# File names remembered to keep output names unique; past this, names get the record's position instead
+MAX_TRACKED_FILENAMES = 100000
+
+# (name, document type, variables, output path) of a document to render
+Job = Tuple[str, str, Dict[str, Any], str]
+
+
+class RecordError(ValueError):
+    """A record that can't be rendered."""
+
+
+def parse_record(record: Any) -> Tuple[str, Dict[str, Any]]:
+    """
+    Validate a record and convert its answers into template variables.
+    
+    Raises:
+        RecordError: If the record is malformed or names an unknown document type
+    """
+    if not isinstance(record, dict):
+        raise RecordError("record must be a JSON object")
+    
+    document_type = record.get("document_type")
+    schema = FORM_SCHEMAS.get(document_type)
+    if schema is None:
+        raise RecordError(f"unknown document type: {document_type!r}")
+    
+    answers = record.get("answers", {})
+    if not isinstance(answers, dict):
+        raise RecordError("answers must be a JSON object")
+    
+    # Text answers are parsed like form input; anything else (e.g. JSON lists) is used as-is
+    raw = {name: value for name, value in answers.items() if isinstance(value, str)}
+    variables = schema.parse(raw)
+    variables.update({name: value for name, value in answers.items() if not isinstance(value, str)})
+    return document_type, variables
+
+
+def iter_records(source: str) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (name, record) pairs from a directory of .json files, a JSONL file, or "-" for stdin.
+    
+    Records are read lazily so memory use doesn't grow with the input size.
+    Unparseable records are yielded as RecordError instances.
+    """
+    if source != "-" and os.path.isdir(source):
+        for path in sorted(Path(source).glob("*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    record = json.load(file)
+            except ValueError as e:
+                record = RecordError(f"invalid JSON: {e}")
+            yield path.stem, record
+        return
+    
+    stream = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = RecordError(f"invalid JSON: {e}")
+            
+            name = f"{line_number:06d}"
+            if isinstance(record, dict):
+                name = str(record.get("name") or f"{name}_{record.get('document_type', 'document')}")
+            yield name, record
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def output_filename(name: str, used: Set[str], extension: str = "md") -> str:
+    """Make a safe, unique file name for a record."""
+    base = _UNSAFE_FILENAME_CHARACTERS.sub("_", name).strip("._") or "document"
+    filename = f"{base}.{extension}"
+    counter = 1
+    while filename in used:
+        counter += 1
+        filename = f"{base}_{counter}.{extension}"
+    used.add(filename)
+    return filename
+
+
+def _render_batch(batch: List[Job], guild_id: Optional[int],
+                  export_format: str = DEFAULT_EXPORT_FORMAT) -> List[Tuple[str, Union[int, str]]]:
+    """
+    Render a batch of documents in a worker, convert them to the export format and write them to disk.
+    
+    Returns:
+        (name, bytes written) for each rendered document, or (name, error message) for failures
+    """
+    results = []
+    generator = render_executor._worker_generator
+    for name, document_type, variables, path in batch:
+        try:
+            data = generator.generate_document_bytes(document_type, variables, guild_id)
+            if export_format != DEFAULT_EXPORT_FORMAT:
+                data = export_document(export_format, data)
+            with open(path, "wb") as file:
+                file.write(data)
+            results.append((name, len(data)))
+        except Exception as e:
+            results.append((name, str(e)))
+    return results
+
+
+def render_all(source: str, output_dir: str, workers: int, window: int, batch_size: int = 32,
+               guild_id: Optional[int] = None, template_store_path: Optional[str] = None,
+               export_format: str = DEFAULT_EXPORT_FORMAT) -> Tuple[int, int, int]:
+    """
+    Render every record from a source into output_dir across a process pool.
+    
+    Records are sent to workers in batches to amortize inter-process overhead.
+    At most `window` batches are queued at a time, and workers write their
+    output directly, so memory stays bounded for any input size. Output names
+    are de-duplicated for the first `MAX_TRACKED_FILENAMES` files; after that
+    each name ends with the record's position in the input instead.
+    
+    Returns:
+        (documents rendered, records failed, bytes written)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rendered = failed = written = 0
+    used_filenames: Set[str] = set()
+    pending: Set[Future] = set()
+    batch: List[Job] = []
+    
+    def collect(done):
+        nonlocal rendered, failed, written
+        for future in done:
+            pending.discard(future)
+            for name, result in future.result():
+                if isinstance(result, int):
+                    written += result
+                    rendered += 1
+                else:
+                    failed += 1
+                    logger.error(f"{name}: {result}")
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(template_store_path,)) as executor:
+        def submit():
+            pending.add(executor.submit(_render_batch, batch.copy(), guild_id, export_format))
+            batch.clear()
+            if len(pending) >= window:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        
+        extension = EXPORTERS[export_format].extension
+        for position, (name, record) in enumerate(iter_records(source), start=1):
+            try:
+                if isinstance(record, RecordError):
+                    raise record
+                document_type, variables = parse_record(record)
+            except RecordError as e:
+                failed += 1
+                logger.error(f"{name}: {e}")
+                continue
+            
+            if len(used_filenames) < MAX_TRACKED_FILENAMES:
+                filename = output_filename(name, used_filenames, extension)
+            else:
+                # Too many names to remember; the position keeps this one unique
+                filename = output_filename(f"{name}_{position}", set(), extension)
+            path = os.path.join(output_dir, filename)
+            batch.append((name, document_type, variables, path))
+            if len(batch) >= batch_size:
+                submit()
+        
+        if batch:
+            submit()
+        collect(wait(pending).done)
+    
+    return rendered, failed, written
+
+
+def main(argv=None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m bot.render", description="Render documents from JSON answer files.")
+    parser.add_argument("source", help='directory of .json files, a .jsonl file, or "-" to read JSONL from stdin')
+    parser.add_argument("-o", "--output", default="output", help="directory to write documents to (default: output)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--batch-size", type=int, default=32, help="documents sent to a worker at a time (default: 32)")
+    parser.add_argument("--window", type=int, default=None,
+                        help="maximum batches queued at once (default: 4 per worker)")
+    parser.add_argument("-f", "--format", dest="export_format", choices=list(EXPORTERS), default=DEFAULT_EXPORT_FORMAT,
+                        help=f"output format (default: {DEFAULT_EXPORT_FORMAT})")
+    parser.add_argument("--guild-id", type=int, default=None, help="use this server's template overrides")
+    args = parser.parse_args(argv)
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    workers = max(1, args.workers)
+    window = max(1, args.window or workers * 4)
+    template_store_path = GUILD_TEMPLATES_DB if args.guild_id is not None and os.path.exists(GUILD_TEMPLATES_DB) else None
+    
+    start = time.perf_counter()
+    rendered, failed, written = render_all(
+        args.source, args.output, workers, window, max(1, args.batch_size), args.guild_id, template_store_path,
+        args.export_format
+    )
+    elapsed = time.perf_counter() - start
+    
+    rate = rendered / elapsed if elapsed else 0.0
+    logger.info(
+        f"Rendered {rendered} document(s) ({written / 1024:.1f} KiB) in {elapsed:.2f}s "
+        f"with {workers} worker(s): {rate:.1f} docs/sec"
+    )
+    if failed:
+        logger.error(f"{failed} record(s) failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
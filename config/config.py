@@ -24,3 +24,106 @@ DOCUMENT_TYPES = {
 
 # Template Directory
 TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "bot", "templates")
+
+# Directory for the bot's local databases
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data"))
+
+# SQLite database holding per-guild template overrides
+GUILD_TEMPLATES_DB = os.path.join(DATA_DIR, "guild_templates.db")
+
+# Last synced slash command fingerprints, used to skip unchanged syncs on startup
+COMMAND_SYNC_STATE = os.path.join(DATA_DIR, "command_sync.json")
+
+# Sync slash commands on startup even if they haven't changed
+FORCE_COMMAND_SYNC = os.getenv("FORCE_COMMAND_SYNC", "false").lower() in ("1", "true", "yes")
+
+# Comma-separated guild ids to sync commands to instead of globally (for development)
+DEV_GUILD_IDS = [int(guild_id) for guild_id in os.getenv("DEV_GUILD_IDS", "").split(",") if guild_id.strip()]
+
+# Keep every generated document per guild so earlier versions can be listed, fetched and compared
+DOCUMENT_HISTORY = os.getenv("DOCUMENT_HISTORY", "true").lower() in ("1", "true", "yes")
+
+# SQLite database holding the document history
+DOCUMENT_HISTORY_DB = os.path.join(DATA_DIR, "document_history.db")
+
+# Seconds the raw answers behind each recorded document are kept for its Edit Answers button; 0 keeps none
+FORM_ANSWERS_TTL = float(os.getenv("FORM_ANSWERS_TTL", "604800"))
+
+# SQLite database holding the documents posted to channels with /publish
+PUBLICATIONS_DB = os.path.join(DATA_DIR, "publications.db")
+
+# Update published documents when their template changes (built-in or the server's own)
+AUTO_REPUBLISH = os.getenv("AUTO_REPUBLISH", "true").lower() in ("1", "true", "yes")
+
+# Publishing requests in flight at once, and sent per second across every channel (split between cluster workers)
+PUBLISH_CONCURRENCY = int(os.getenv("PUBLISH_CONCURRENCY", "8"))
+PUBLISH_GLOBAL_LIMIT = float(os.getenv("PUBLISH_GLOBAL_LIMIT", "40"))
+
+# Number of (guild, document type) override lookups kept in memory
+GUILD_TEMPLATE_CACHE_SIZE = int(os.getenv("GUILD_TEMPLATE_CACHE_SIZE", "1024"))
+
+# How often (in seconds) to check templates for changes; 0 disables hot reload
+TEMPLATE_RELOAD_INTERVAL = float(os.getenv("TEMPLATE_RELOAD_INTERVAL", "5"))
+
+# Pool used to render documents off the event loop: "thread" or "process"
+RENDER_EXECUTOR = os.getenv("RENDER_EXECUTOR", "thread")
+
+# Number of render workers in the pool
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "4"))
+
+# Number of worker processes converting documents to HTML, plain text and PDF
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+
+# Number of converted documents kept, keyed by format and document content (0 disables)
+EXPORT_CACHE_SIZE = int(os.getenv("EXPORT_CACHE_SIZE", "128"))
+
+# Seconds before an unsubmitted form (its session and modal) expires
+FORM_SESSION_TTL = float(os.getenv("FORM_SESSION_TTL", "300"))
+
+# Maximum number of in-progress forms kept in memory
+FORM_SESSION_MAX_SIZE = int(os.getenv("FORM_SESSION_MAX_SIZE", "10000"))
+
+# SQLite database holding each user's last form answers, used to prefill forms after a restart
+FORM_DRAFTS_DB = os.path.join(DATA_DIR, "form_drafts.db")
+
+# Seconds a user's last form answers are kept for prefilling; 0 disables drafts
+FORM_DRAFT_TTL = float(os.getenv("FORM_DRAFT_TTL", "604800"))
+
+# Seconds saved drafts are batched in memory before being written to the database
+DRAFT_FLUSH_INTERVAL = float(os.getenv("DRAFT_FLUSH_INTERVAL", "1"))
+
+# Number of rendered documents kept for repeat requests with identical answers (0 disables)
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "256"))
+
+# Port for the Prometheus /metrics endpoint (0 disables metrics entirely)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Address the metrics endpoint listens on; keep it local unless a scraper needs remote access
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Generate requests a user may make in a burst, refilled over the period in seconds (0 disables)
+GENERATE_USER_LIMIT = int(os.getenv("GENERATE_USER_LIMIT", "5"))
+GENERATE_USER_PERIOD = float(os.getenv("GENERATE_USER_PERIOD", "60"))
+
+# Generate requests a whole guild may make in a burst, refilled over the period in seconds (0 disables)
+GENERATE_GUILD_LIMIT = int(os.getenv("GENERATE_GUILD_LIMIT", "30"))
+GENERATE_GUILD_PERIOD = float(os.getenv("GENERATE_GUILD_PERIOD", "60"))
+
+# Renders allowed in flight at once; submissions beyond this are turned away (0 disables)
+MAX_INFLIGHT_RENDERS = int(os.getenv("MAX_INFLIGHT_RENDERS", "64"))
+
+# Slash-only mode: no prefix commands, minimal gateway intents and no message or member caches
+SLASH_ONLY = os.getenv("SLASH_ONLY", "false").lower() in ("1", "true", "yes")
+
+# How often (in seconds) to log the gateway event rate and memory use; 0 disables
+GATEWAY_STATS_INTERVAL = float(os.getenv("GATEWAY_STATS_INTERVAL", "300"))
+
+# Worker processes to run the bot's shards in; 0 runs a single unsharded process
+CLUSTER_WORKERS = int(os.getenv("CLUSTER_WORKERS", "0"))
+
+# Total shards split across cluster workers; 0 uses the count Discord recommends
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+
+# Seconds between worker heartbeats, and without one before a worker is restarted
+CLUSTER_HEARTBEAT_INTERVAL = float(os.getenv("CLUSTER_HEARTBEAT_INTERVAL", "10"))
+CLUSTER_HEARTBEAT_TIMEOUT = float(os.getenv("CLUSTER_HEARTBEAT_TIMEOUT", "60"))
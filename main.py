@@ -4,7 +4,7 @@ import asyncio
 import logging
 import sys
 from bot.bot import create_bot
-from config.config import DISCORD_BOT_TOKEN
+from config.config import CLUSTER_WORKERS, DISCORD_BOT_TOKEN, SHARD_COUNT
 
 # Set up logging
 logging.basicConfig(
@@ -25,6 +25,16 @@ def main():
         logger.error("Please create a .env file with your bot token.")
         sys.exit(1)
     
+    if CLUSTER_WORKERS > 0:
+        # Run shards in supervised worker processes instead of this one
+        from bot.cluster import run_cluster
+        try:
+            run_cluster(DISCORD_BOT_TOKEN, CLUSTER_WORKERS, SHARD_COUNT)
+        except Exception as e:
+            logger.error(f"Error running cluster: {e}")
+            sys.exit(1)
+        return
+    
     # Create and run the bot
     bot = create_bot()
     